@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+前端资源打包
+主页原来从cdn.jsdelivr.net加载Bootstrap、bootstrap-icons、animate.css和clipboard.js，
+CDN较慢或被屏蔽时页面无法正常显示。这里把这些资源下载到本地缓存(results/cache/vendor/，只下载一次)，
+下载是单独的步骤(vendor_assets / --download)，生成页面时的打包只读取缓存，不访问网络；
+打包时按生成的页面删除没有用到的CSS规则，压缩后合并为一个CSS和一个JS文件，
+文件名带内容指纹(web/assets/app.<指纹>.css)，可以长期缓存。
+资源清单 web/assets/manifest.json 由site_renderer读取；清单不存在或本地文件加载失败时页面回退到CDN
+
+CSS规则的保留方式与PurgeCSS相同: 选择器中的类名、ID和标签名都出现在页面(包括月度存档分片)、
+内联脚本或打包的JS中时保留，因此由JS动态添加的类名(show、collapsing等)不会被误删
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from urllib.parse import urljoin, urlsplit
+import requests
+import site_renderer
+
+logger = logging.getLogger("asset_pipeline")
+
+WEB_DIR = "web"
+ASSET_DIR = "assets"
+VENDOR_DIR = "results/cache/vendor"
+MANIFEST = site_renderer.ASSET_MANIFEST
+DOWNLOAD_TIMEOUT = 30
+
+# 按页面中的引用顺序排列
+CSS_ASSETS = (
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css",
+    "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/bootstrap-icons.css",
+    "https://cdn.jsdelivr.net/npm/animate.css@4.1.1/animate.min.css",
+)
+JS_ASSETS = (
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js",
+    "https://cdn.jsdelivr.net/npm/clipboard@2.0.11/dist/clipboard.min.js",
+)
+
+COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+STRING_PATTERN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+URL_PATTERN = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""")
+SOURCE_MAP_PATTERN = re.compile(r"^\s*//# sourceMappingURL=.*$", re.MULTILINE)
+WORD_PATTERN = re.compile(r"[A-Za-z_][\w-]*")
+# 选择器中的伪类参数(:not(...)、:nth-child(...))、属性选择器和伪元素不参与匹配
+PSEUDO_ARGUMENT_PATTERN = re.compile(r"::?[\w-]+\([^()]*\)")
+ATTRIBUTE_PATTERN = re.compile(r"\[[^\]]*\]")
+PSEUDO_PATTERN = re.compile(r"::?[\w-]+")
+SELECTOR_TOKEN_PATTERN = re.compile(r"([.#]?)(-?[A-Za-z_][\w-]*)")
+KEYFRAMES_PATTERN = re.compile(r"^@(?:-webkit-)?keyframes\s+(\S+)")
+FONT_FAMILY_PATTERN = re.compile(r"font-family\s*:\s*([^;}]+)")
+# 内部可以嵌套普通规则的@规则
+GROUP_RULES = ("@media", "@supports", "@layer", "@container")
+
+
+def vendor_path(url, vendor_dir=VENDOR_DIR):
+    """
+    第三方资源在本地缓存中的路径，文件名带URL的哈希前缀，不同版本的同名文件不会互相覆盖
+    """
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12] + "-" + os.path.basename(urlsplit(url).path)
+    return os.path.join(vendor_dir, name)
+
+
+def read_vendor(url, vendor_dir=VENDOR_DIR):
+    """
+    读取本地缓存的第三方资源，不访问网络，缓存中没有时抛出FileNotFoundError
+
+    返回:
+    bytes: 文件内容
+    """
+    with open(vendor_path(url, vendor_dir), "rb") as f:
+        return f.read()
+
+
+def css_references(url, css):
+    """
+    CSS中url(...)引用的文件(字体等)的完整URL，data: URI除外
+    """
+    references = []
+    for match in URL_PATTERN.finditer(css):
+        reference = match.group(2).strip()
+        if not reference.startswith("data:"):
+            references.append(urljoin(url, reference))
+    return references
+
+
+def missing_vendor(vendor_dir=VENDOR_DIR):
+    """
+    检查本地缓存中缺少的第三方资源，CSS缺少时无法得知其中引用的文件，只报告CSS本身
+
+    返回:
+    list: 缺少的URL
+    """
+    missing = [url for url in CSS_ASSETS + JS_ASSETS if not os.path.exists(vendor_path(url, vendor_dir))]
+    for url in CSS_ASSETS:
+        if url not in missing:
+            css = COMMENT_PATTERN.sub("", read_vendor(url, vendor_dir).decode("utf-8"))
+            missing += [reference for reference in css_references(url, css)
+                        if not os.path.exists(vendor_path(reference, vendor_dir))]
+    return missing
+
+
+def vendor_assets(vendor_dir=VENDOR_DIR):
+    """
+    从CDN下载本地缓存中缺少的第三方资源(包括CSS中引用的字体)，已缓存的文件不再下载
+
+    这是打包中唯一访问网络的步骤，生成页面时只读取缓存，缓存不完整时跳过打包
+
+    返回:
+    list: 本次下载的URL
+    """
+    downloaded = []
+    # 缺少的CSS下载后才能知道其中引用了哪些文件，所以下载后再检查一次
+    missing = missing_vendor(vendor_dir)
+    while missing:
+        for url in dict.fromkeys(missing):
+            logger.info(f"下载 {url}")
+            response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            path = vendor_path(url, vendor_dir)
+            os.makedirs(vendor_dir, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(response.content)
+            os.replace(path + ".tmp", path)
+            downloaded.append(url)
+        missing = missing_vendor(vendor_dir)
+    return downloaded
+
+
+def _scan(css, i, stops):
+    """
+    从位置i开始查找第一个不在字符串中的stops字符的位置，找不到时返回len(css)
+    """
+    quote = None
+    while i < len(css):
+        c = css[i]
+        if quote:
+            if c == "\\":
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c in stops:
+            return i
+        i += 1
+    return i
+
+
+def _block_end(css, i):
+    """
+    返回从i(左花括号之后)开始的块对应右花括号的位置
+    """
+    depth = 1
+    while True:
+        i = _scan(css, i, "{}")
+        if i >= len(css):
+            return i
+        depth += 1 if css[i] == "{" else -1
+        if not depth:
+            return i
+        i += 1
+
+
+def parse_css(css, i=0):
+    """
+    把CSS解析为节点列表(已删除注释):
+    ("rule", 选择器或@规则前缀, 块内容)、("group", @media等前缀, 子节点列表)、("statement", @charset等语句)
+
+    返回:
+    tuple: (节点列表, 结束位置)
+    """
+    nodes = []
+    while i < len(css):
+        j = _scan(css, i, "{};")
+        prelude = css[i:j].strip()
+        if j >= len(css) or css[j] == "}":
+            return nodes, j + 1
+        if css[j] == ";":
+            if prelude:
+                nodes.append(("statement", prelude))
+            i = j + 1
+        elif prelude and prelude.split(None, 1)[0].lower() in GROUP_RULES:
+            children, i = parse_css(css, j + 1)
+            nodes.append(("group", prelude, children))
+        else:
+            end = _block_end(css, j + 1)
+            nodes.append(("rule", prelude, css[j + 1:end]))
+            i = end + 1
+    return nodes, i
+
+
+def split_selectors(selector):
+    """
+    按顶层逗号拆分选择器列表(:is(a, b)中的逗号不拆分)
+    """
+    parts = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(selector):
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif c == "," and not depth:
+            parts.append(selector[start:i].strip())
+            start = i + 1
+    parts.append(selector[start:].strip())
+    return [part for part in parts if part]
+
+
+def selector_used(selector, used):
+    """
+    判断选择器中的类名、ID和标签名是否都出现在页面中，包含转义字符的选择器一律保留
+    """
+    if "\\" in selector:
+        return True
+    previous = None
+    while previous != selector:
+        previous = selector
+        selector = PSEUDO_ARGUMENT_PATTERN.sub("", selector)
+    selector = PSEUDO_PATTERN.sub("", ATTRIBUTE_PATTERN.sub("", selector))
+    return all(name in used for _, name in SELECTOR_TOKEN_PATTERN.findall(selector))
+
+
+def purge(nodes, used):
+    """
+    删除没有用到的规则，规则中部分选择器没有用到时只保留用到的选择器
+
+    @keyframes和@font-face先全部保留，由prune_unreferenced按保留下来的规则再清理
+    """
+    kept = []
+    for node in nodes:
+        if node[0] == "group":
+            children = purge(node[2], used)
+            if children:
+                kept.append(("group", node[1], children))
+        elif node[0] == "rule" and not node[1].startswith("@"):
+            selectors = [selector for selector in split_selectors(node[1]) if selector_used(selector, used)]
+            if selectors:
+                kept.append(("rule", ",".join(selectors), node[2]))
+        else:
+            kept.append(node)
+    return kept
+
+
+def _walk_rules(nodes):
+    for node in nodes:
+        if node[0] == "group":
+            yield from _walk_rules(node[2])
+        elif node[0] == "rule":
+            yield node
+
+
+def prune_unreferenced(nodes):
+    """
+    删除没有被保留下来的规则引用的@keyframes动画和@font-face字体
+    """
+    bodies = " ".join(node[2] for node in _walk_rules(nodes) if not node[1].startswith("@"))
+    words = set(WORD_PATTERN.findall(bodies))
+    families = set()
+    for match in FONT_FAMILY_PATTERN.findall(bodies):
+        families.update(name.replace("!important", "").strip().strip("\"'") for name in match.split(","))
+
+    def referenced(node):
+        if node[0] != "rule":
+            return True
+        keyframes = KEYFRAMES_PATTERN.match(node[1])
+        if keyframes:
+            return keyframes.group(1) in words
+        if node[1].lower().startswith("@font-face"):
+            family = FONT_FAMILY_PATTERN.search(node[2])
+            return not family or family.group(1).strip().strip("\"'") in families
+        return True
+
+    def prune(nodes):
+        kept = []
+        for node in nodes:
+            if node[0] == "group":
+                children = prune(node[2])
+                if children:
+                    kept.append(("group", node[1], children))
+            elif referenced(node):
+                kept.append(node)
+        return kept
+
+    return prune(nodes)
+
+
+def _minify_outside_strings(text, pattern):
+    parts = STRING_PATTERN.split(text)
+    return "".join(part if index % 2 else pattern(part) for index, part in enumerate(parts))
+
+
+def _minify_selector(text):
+    text = re.sub(r"\s+", " ", text).strip()
+    return re.sub(r"\s*([>+~,])\s*", r"\1", text)
+
+
+def _minify_body(text):
+    text = re.sub(r"\s+", " ", text).strip()
+    return re.sub(r"\s*([:;,{}])\s*", r"\1", text)
+
+
+def minify_css(nodes):
+    """
+    把节点列表输出为压缩的CSS，字符串(content、data URI等)保持原样
+    """
+    output = []
+    for node in nodes:
+        if node[0] == "statement":
+            output.append(_minify_outside_strings(node[1], _minify_selector) + ";")
+        elif node[0] == "group":
+            output.append(_minify_outside_strings(node[1], _minify_selector) + "{" + minify_css(node[2]) + "}")
+        else:
+            body = _minify_outside_strings(node[2], _minify_body).rstrip(";")
+            output.append(_minify_outside_strings(node[1], _minify_selector) + "{" + body + "}")
+    return "".join(output)
+
+
+def fingerprinted(name, content):
+    """
+    带内容指纹的文件名，例如 app.css -> app.1a2b3c4d5e.css
+    """
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{extension}"
+
+
+def used_words(web_dir=WEB_DIR, scripts=""):
+    """
+    收集页面中出现的全部单词(类名、ID、标签名、内联脚本中的字符串)
+
+    参数:
+    web_dir (str): 网站目录，扫描其中全部HTML和JS文件(包括月度存档分片和搜索客户端，不包括资源目录)
+    scripts (str): 打包的JS，其中动态添加的类名也视为用到
+    """
+    words = set(WORD_PATTERN.findall(scripts))
+    for root, directories, names in os.walk(web_dir):
+        if root == web_dir and ASSET_DIR in directories:
+            directories.remove(ASSET_DIR)
+        for name in names:
+            if name.endswith((".html", ".js")):
+                with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                    words.update(WORD_PATTERN.findall(f.read()))
+    # 页面根元素的规则总是保留
+    words.update(("html", "body"))
+    return words
+
+
+def bundle_css(used, vendor_dir=VENDOR_DIR):
+    """
+    读取缓存的CSS，清理、压缩并合并，CSS中引用的字体等文件复制到资源目录并使用带指纹的文件名
+
+    返回:
+    tuple: (合并后的CSS字节, {文件名: 内容} 被引用的文件)
+    """
+    files = {}
+    nodes = []
+    for url in CSS_ASSETS:
+        css = COMMENT_PATTERN.sub("", read_vendor(url, vendor_dir).decode("utf-8"))
+
+        def localize(match):
+            reference = match.group(2).strip()
+            if reference.startswith("data:"):
+                return match.group(0)
+            content = read_vendor(urljoin(url, reference), vendor_dir)
+            name = fingerprinted(os.path.basename(urlsplit(reference).path), content)
+            files[name] = content
+            return f'url("{name}")'
+
+        css = URL_PATTERN.sub(localize, css)
+        nodes.extend(parse_css(css)[0])
+    nodes = prune_unreferenced(purge(nodes, used))
+    # @charset只能出现在文件开头，合并后统一去掉(内容全部为UTF-8)
+    nodes = [node for node in nodes if not (node[0] == "statement" and node[1].lower().startswith("@charset"))]
+    return minify_css(nodes).encode("utf-8"), files
+
+
+def bundle_js(vendor_dir=VENDOR_DIR):
+    """
+    合并JS，第三方文件已经是压缩版本，只去掉source map引用
+    """
+    scripts = [SOURCE_MAP_PATTERN.sub("", read_vendor(url, vendor_dir).decode("utf-8")).strip() for url in JS_ASSETS]
+    # 每个文件以分号结尾，避免合并后与下一个文件的开头连成一条语句
+    return "".join(script if script.endswith(";") else script + ";\n" for script in scripts).encode("utf-8")
+
+
+def build_assets(web_dir=WEB_DIR, vendor_dir=VENDOR_DIR):
+    """
+    生成资源文件和清单，清单内容没有变化时不改动任何文件
+
+    只保留本次和上一次清单引用的文件，已经打开的旧页面仍然可以加载上一版资源。
+    只使用本地缓存，缓存不完整时跳过打包(先运行 vendor_assets 下载)，页面继续使用原来的资源或回退到CDN
+
+    返回:
+    dict: 资源清单 {"css": 路径, "js": 路径, "files": [文件名, ...], "bytes": {文件名: 字节数}}，跳过打包时返回None
+    """
+    missing = missing_vendor(vendor_dir)
+    if missing:
+        logger.warning(f"本地缓存缺少 {len(missing)} 个第三方资源，跳过打包(运行 python asset_pipeline.py --download 下载)")
+        return None
+
+    asset_dir = os.path.join(web_dir, ASSET_DIR)
+    manifest_path = os.path.join(web_dir, MANIFEST)
+    previous = site_renderer.read_json(manifest_path) or {}
+
+    js = bundle_js(vendor_dir)
+    css, files = bundle_css(used_words(web_dir, js.decode("utf-8")), vendor_dir)
+    css_name = fingerprinted("app.css", css)
+    js_name = fingerprinted("app.js", js)
+    files[css_name] = css
+    files[js_name] = js
+
+    os.makedirs(asset_dir, exist_ok=True)
+    for name, content in files.items():
+        path = os.path.join(asset_dir, name)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+
+    manifest = {
+        "css": f"{ASSET_DIR}/{css_name}",
+        "js": f"{ASSET_DIR}/{js_name}",
+        "files": sorted(files),
+        "bytes": {name: len(content) for name, content in sorted(files.items())}
+    }
+    keep = set(manifest["files"]) | set(previous.get("files", ())) | {os.path.basename(MANIFEST)}
+    for name in os.listdir(asset_dir):
+        if name not in keep and not name.endswith((".gz", ".br")):
+            os.remove(os.path.join(asset_dir, name))
+    site_renderer.write_if_changed(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="打包前端资源")
+    parser.add_argument("--web", default=WEB_DIR, help="网站目录(扫描其中已生成的页面)")
+    parser.add_argument("--vendor", default=VENDOR_DIR, help="第三方资源缓存目录")
+    parser.add_argument("--download", action="store_true", help="只从CDN下载缓存中缺少的第三方资源，不打包")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.download:
+        downloaded = vendor_assets(args.vendor)
+        print(f"下载 {len(downloaded)} 个文件到 {args.vendor}")
+    else:
+        manifest = build_assets(args.web, args.vendor)
+        for name, size in (manifest or {}).get("bytes", {}).items():
+            print(f"- {ASSET_DIR}/{name}: {size / 1024:.1f} KB")
+    logger.info(f"耗时 {time.perf_counter() - start:.2f} 秒")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+BestClash订阅
+订阅地址固定，只检查GitHub链接是否可访问并保存链接信息
+"""
+
+import os
+import json
+import logging
+import requests
+from datetime import datetime
+
+logger = logging.getLogger("bestclash_scraper")
+
+GITHUB_URL = "https://raw.githubusercontent.com/PuddinCat/BestClash/refs/heads/main/proxies.yaml"
+MIRROR_URL = "https://ghfile.geekertao.top/https://github.com/PuddinCat/BestClash/blob/main/proxies.yaml"
+RESULTS_DIR = "results/bestclash"
+
+
+def scrape_bestclash():
+    """
+    获取BestClash的订阅链接和信息
+
+    返回:
+    dict: 包含订阅链接和信息的字典，保存失败时返回None
+    """
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+    }
+
+    result = {
+        "github_link": GITHUB_URL,
+        "mirror_link": MIRROR_URL,
+        "scrape_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "source_url": "https://github.com/PuddinCat/BestClash",
+        "description": "免费Clash代理！自动从网上爬取最快的代理，每30分钟更新！"
+    }
+
+    # 检查链接是否可访问
+    try:
+        response = requests.get(GITHUB_URL, headers=headers, timeout=10)
+        response.raise_for_status()
+        logger.info("GitHub链接可访问")
+    except Exception:
+        logger.warning("GitHub链接不可访问，建议使用国内镜像")
+
+    try:
+        save_result(result)
+        return result
+    except Exception as e:
+        logger.exception(f"保存BestClash订阅时出错: {e}")
+        return None
+
+
+def save_result(result):
+    """
+    保存结果到JSON和文本文件，并更新最新链接
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    json_filename = f"{RESULTS_DIR}/bestclash_{timestamp}.json"
+    with open(json_filename, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    txt_filename = f"{RESULTS_DIR}/bestclash_{timestamp}.txt"
+    with open(txt_filename, "w", encoding="utf-8") as f:
+        f.write(f"BestClash 免费Clash代理\n")
+        f.write(f"更新频率: 每30分钟\n")
+        f.write(f"爬取时间: {result['scrape_time']}\n")
+        f.write(f"来源: {result['source_url']}\n\n")
+        f.write("GitHub 订阅链接:\n")
+        f.write(f"{result['github_link']}\n\n")
+        f.write("国内镜像 订阅链接:\n")
+        f.write(f"{result['mirror_link']}\n")
+
+    latest_txt = f"{RESULTS_DIR}/bestclash_latest.txt"
+    with open(latest_txt, "w", encoding="utf-8") as f:
+        f.write(result["github_link"])
+
+    logger.info(f"结果保存到: {json_filename}")
+    logger.info(f"结果保存到: {txt_filename}")
+    logger.info(f"最新订阅链接保存到: {latest_txt}")
+    return json_filename, txt_filename
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    result = scrape_bestclash()
+    if result:
+        print(f"GitHub 订阅链接: {result['github_link']}")
+        print(f"国内镜像 订阅链接: {result['mirror_link']}")
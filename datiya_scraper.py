@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import requests
-from bs4 import BeautifulSoup
 import re
 import json
 import os
 from datetime import datetime, timedelta
+from html_backend import make_soup, tags_filter
+
+# 只构建标题、节点概览所在的标题/段落及其后的列表
+DATIYA_FILTER = tags_filter("h1", "h2", "h3", "h4", "h5", "h6", "p", "strong", "b", "ul")
+NODES_INFO_PATTERN = re.compile('今日节点概览')
 
 def scrape_datiya(date=None):
     """
@@ -41,11 +45,14 @@ def scrape_datiya(date=None):
         response.raise_for_status()  # 检查请求是否成功
         html_content = response.text
         
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # 只解析需要的元素，页面结构变化导致找不到时再完整解析
+        soup = make_soup(html_content, parse_only=DATIYA_FILTER)
+        if not soup.find('h1') or not soup.find(string=NODES_INFO_PATTERN):
+            soup = make_soup(html_content)
         
         # 查找标题
-        title = soup.find('h1').text.strip() if soup.find('h1') else "未找到标题"
+        title_element = soup.find('h1')
+        title = title_element.text.strip() if title_element else "未找到标题"
         
         # 查找更新时间
         update_time_pattern = re.compile(r'更新时间.*?(\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2})')
@@ -61,7 +68,7 @@ def scrape_datiya(date=None):
         
         # 获取节点概览信息
         nodes_info = {}
-        nodes_info_section = soup.find(string=re.compile('今日节点概览'))
+        nodes_info_section = soup.find(string=NODES_INFO_PATTERN)
         if nodes_info_section and nodes_info_section.parent:
             info_section = nodes_info_section.parent.find_next('ul')
             if info_section:
@@ -94,6 +101,29 @@ def scrape_datiya(date=None):
         print(f"发生错误: {e}")
         return None
 
+def daily_record(date, node_count, result):
+    """
+    将某天的爬取结果整理为web/data.json中的记录
+
+    参数:
+    date (str): 日期，格式为YYYYMMDD
+    node_count (int): 从GitHub获取的预期节点数
+    result (dict): scrape_datiya的返回值
+
+    返回:
+    dict: data.json中该日期的记录
+    """
+    return {
+        "date": f"{date[:4]}-{date[4:6]}-{date[6:8]}",
+        "title": result["title"],
+        "update_time": result["update_time"],
+        "clash_links": result["clash_links"],
+        "v2ray_links": result["v2ray_links"],
+        "nodes_info": result["nodes_info"],
+        "expected_node_count": node_count,  # 从GitHub获取的预期节点数
+        "scrape_time": result["scrape_time"]
+    }
+
 def save_result(result):
     """
     将爬取结果保存到文件
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Atom/RSS订阅源
+每次生成页面时把本地数据快照与上一次的状态比较，每个有意义的变化生成一个条目:
+- 新的datiya日期
+- 某个来源的订阅内容发生变化(订阅链接或爬取结果的指纹变化，忽略爬取时间)
+- 最近一天的节点数变化较大(来自节点历史库)
+
+条目追加到 results/cache/feed_entries.json 并只保留最近FEED_ENTRIES个，输出 web/feed.xml(Atom)和 web/rss.xml(RSS 2.0)。
+没有新条目时文件内容完全不变，客户端可以用条件请求轮询这两个小文件，不需要下载整个主页
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from xml.sax.saxutils import escape
+import site_renderer
+import static_api
+import node_history
+
+logger = logging.getLogger("feed_builder")
+
+WEB_DIR = "web"
+ATOM_FILE = "feed.xml"
+RSS_FILE = "rss.xml"
+STATE_PATH = "results/cache/feed_state.json"
+ENTRIES_PATH = "results/cache/feed_entries.json"
+FEED_ENTRIES = 50
+FEED_TITLE = "Clash/V2Ray 免费节点订阅更新"
+# 站点地址，例如 https://用户名.github.io/项目名称/web/，为空时条目使用相对链接
+SITE_URL = os.environ.get("SITE_URL", "")
+# 每次爬取都会变化的字段，不计入来源指纹
+VOLATILE_SOURCE_KEYS = ("scrape_time",)
+# 节点数变化至少达到这个比例(或日期变化)才生成条目
+NODE_DELTA_RATIO = 0.1
+
+
+def source_signature(snapshot, source):
+    """
+    来源订阅内容的指纹，没有数据时返回None
+    """
+    document = static_api.source_document(snapshot, source)
+    data = document["data"]
+    if data is None and not document["links"]:
+        return None
+    if isinstance(data, dict):
+        data = {key: value for key, value in data.items() if key not in VOLATILE_SOURCE_KEYS}
+    return static_api.etag(static_api.encode({"links": document["links"], "data": data}))
+
+
+def latest_node_count(db_path=node_history.DB_PATH):
+    """
+    最近一天出现的节点数
+
+    返回:
+    tuple: (日期, 节点数)，节点历史库不存在时返回(None, None)
+    """
+    if not os.path.exists(db_path):
+        return None, None
+    conn = node_history.connect(db_path)
+    try:
+        row = conn.execute("""
+            SELECT day, COUNT(*) FROM node_days WHERE day = (SELECT MAX(day) FROM node_days) GROUP BY day
+        """).fetchone()
+    finally:
+        conn.close()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def detect_changes(snapshot, state, db_path=node_history.DB_PATH, now=None):
+    """
+    比较快照与上一次的状态
+
+    参数:
+    snapshot (site_renderer.Snapshot): 渲染快照
+    state (dict): 上一次的状态 {"dates": [...], "sources": {来源: 指纹}, "nodes": [日期, 节点数]}
+    db_path (str): 节点历史库路径
+    now (datetime, optional): 条目时间
+
+    返回:
+    tuple: (新条目列表(新的在前), 新状态)
+    """
+    updated = (now or datetime.now()).astimezone().isoformat(timespec="seconds")
+    entries = []
+    dates = site_renderer.date_keys(snapshot.results)
+    known = set(state.get("dates", ()))
+    # 按时间顺序生成，最后整体反转为新的在前
+    for date in reversed(dates):
+        if date in known:
+            continue
+        result = snapshot.results[date]
+        clash = len(result.get("clash_links") or [])
+        v2ray = len(result.get("v2ray_links") or [])
+        nodes = site_renderer.node_count(result.get("nodes_info"))
+        entries.append({
+            "id": f"date:{date}",
+            "title": f"新日期 {date}: {result.get('title') or 'datiya每日节点'}",
+            "summary": f"Clash订阅 {clash} 个，V2Ray订阅 {v2ray} 个" + (f"，{nodes} 个节点" if nodes else ""),
+            "link": f"index.html#card-{date}",
+            "updated": updated
+        })
+
+    sources = {}
+    for source in site_renderer.SOURCES:
+        signature = source_signature(snapshot, source)
+        sources[source] = signature
+        if signature and signature != state.get("sources", {}).get(source):
+            links = static_api.source_document(snapshot, source)["links"]
+            summary = "、".join(f"{key}: {value}" for key, value in sorted(links.items()))
+            if source == "v2rayc":
+                groups = site_renderer.v2rayc_groups(snapshot.sources.get("v2rayc_data") or {})
+                summary = "、".join(f"{label} {len(group)} 个" for _, label, _, group in groups)
+            entries.append({
+                "id": f"source:{source}:{signature}",
+                "title": f"{source} 订阅已更新",
+                "summary": summary or "订阅内容发生变化",
+                "link": f"index.html#{source}",
+                "updated": updated
+            })
+
+    day, count = latest_node_count(db_path)
+    nodes = state.get("nodes")
+    if day and (not nodes or nodes[0] != day or abs(count - nodes[1]) >= max(1, nodes[1] * NODE_DELTA_RATIO)):
+        delta = f"(较上次 {count - nodes[1]:+d})" if nodes else ""
+        entries.append({
+            "id": f"nodes:{day}:{count}",
+            "title": f"{day} 出现 {count} 个节点{delta}",
+            "summary": f"节点历史库中 {day} 出现的节点数为 {count}{delta}",
+            "link": "index.html#stats",
+            "updated": updated
+        })
+        nodes = [day, count]
+
+    entries.reverse()
+    return entries, {"dates": dates, "sources": sources, "nodes": nodes}
+
+
+def _absolute(link, site_url):
+    return site_url.rstrip("/") + "/" + link if site_url else link
+
+
+def render_atom(entries, site_url=SITE_URL):
+    """
+    生成Atom订阅源，feed的更新时间为最新条目的时间(没有新条目时内容不变)
+    """
+    updated = entries[0]["updated"] if entries else "1970-01-01T00:00:00+00:00"
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"  <title>{escape(FEED_TITLE)}</title>",
+        f'  <link href="{escape(_absolute("index.html", site_url))}"/>',
+        f'  <link rel="self" href="{escape(_absolute(ATOM_FILE, site_url))}"/>',
+        f"  <id>{escape(_absolute('', site_url) or 'urn:free-nodes:feed')}</id>",
+        f"  <updated>{updated}</updated>"
+    ]
+    for entry in entries:
+        lines += [
+            "  <entry>",
+            f"    <title>{escape(entry['title'])}</title>",
+            f"    <id>urn:free-nodes:{escape(entry['id'])}</id>",
+            f'    <link href="{escape(_absolute(entry["link"], site_url))}"/>',
+            f"    <updated>{entry['updated']}</updated>",
+            f"    <summary>{escape(entry['summary'])}</summary>",
+            "  </entry>"
+        ]
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def render_rss(entries, site_url=SITE_URL):
+    """
+    生成RSS 2.0订阅源
+    """
+    def rfc822(timestamp):
+        return datetime.fromisoformat(timestamp).strftime("%a, %d %b %Y %H:%M:%S %z")
+
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<rss version="2.0">',
+        "  <channel>",
+        f"    <title>{escape(FEED_TITLE)}</title>",
+        f"    <link>{escape(_absolute('index.html', site_url))}</link>",
+        f"    <description>{escape(FEED_TITLE)}</description>"
+    ]
+    if entries:
+        lines.append(f"    <lastBuildDate>{rfc822(entries[0]['updated'])}</lastBuildDate>")
+    for entry in entries:
+        lines += [
+            "    <item>",
+            f"      <title>{escape(entry['title'])}</title>",
+            f"      <link>{escape(_absolute(entry['link'], site_url))}</link>",
+            f'      <guid isPermaLink="false">urn:free-nodes:{escape(entry["id"])}</guid>',
+            f"      <pubDate>{rfc822(entry['updated'])}</pubDate>",
+            f"      <description>{escape(entry['summary'])}</description>",
+            "    </item>"
+        ]
+    lines += ["  </channel>", "</rss>"]
+    return "\n".join(lines) + "\n"
+
+
+def build_feeds(snapshot, web_dir=WEB_DIR, state_path=STATE_PATH, entries_path=ENTRIES_PATH,
+                db_path=node_history.DB_PATH, limit=FEED_ENTRIES, site_url=SITE_URL):
+    """
+    检测变化、追加条目并生成订阅源
+
+    返回:
+    int: 新增的条目数
+    """
+    state = site_renderer.read_json(state_path) or {}
+    new_entries, state = detect_changes(snapshot, state, db_path)
+    entries = site_renderer.read_json(entries_path) or []
+    if new_entries:
+        # 同一变化(例如删除后又恢复的日期)只保留最新的条目
+        ids = {entry["id"] for entry in new_entries}
+        entries = (new_entries + [entry for entry in entries if entry["id"] not in ids])[:limit]
+        site_renderer.write_if_changed(entries_path, json.dumps(entries, ensure_ascii=False, indent=2))
+    site_renderer.write_if_changed(os.path.join(web_dir, ATOM_FILE), render_atom(entries, site_url))
+    site_renderer.write_if_changed(os.path.join(web_dir, RSS_FILE), render_rss(entries, site_url))
+    site_renderer.write_if_changed(state_path, json.dumps(state, ensure_ascii=False, sort_keys=True))
+    return len(new_entries)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="生成Atom/RSS订阅源")
+    parser.add_argument("--data", default=site_renderer.DATA_PATH, help="按日期保存的爬取结果JSON文件")
+    parser.add_argument("--results", default=site_renderer.RESULTS_DIR, help="各来源结果目录")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--web", default=WEB_DIR, help="网站目录")
+    parser.add_argument("--limit", type=int, default=FEED_ENTRIES, help="最多保留的条目数")
+    parser.add_argument("--site-url", default=SITE_URL, help="站点地址，用于生成绝对链接")
+
+    args = parser.parse_args()
+
+    snapshot = site_renderer.load_snapshot(results_dir=args.results, data_path=args.data)
+    added = build_feeds(snapshot, args.web, db_path=args.db, limit=args.limit, site_url=args.site_url)
+    print(f"- 新增 {added} 个条目: {os.path.join(args.web, ATOM_FILE)}, {os.path.join(args.web, RSS_FILE)}")
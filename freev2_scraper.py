@@ -7,13 +7,13 @@ FreeV2.net 订阅链接爬虫
 """
 
 import requests
-from bs4 import BeautifulSoup
 import re
 import json
 import os
 import time
 import logging
 from datetime import datetime
+from html_backend import make_soup, tags_filter
 
 # 配置日志
 logging.basicConfig(
@@ -27,6 +27,9 @@ logging.basicConfig(
 
 logger = logging.getLogger("freev2_scraper")
 
+# 只构建订阅按钮、脚本、链接以及站点信息所在的元素
+FREEV2_FILTER = tags_filter("a", "button", "script", "main", "p", data_clipboard_text=True, class_="hero-body")
+
 def scrape_freev2():
     """
     爬取 FreeV2.net 网站的订阅链接
@@ -51,55 +54,63 @@ def scrape_freev2():
             f.write(response.text)
         logger.info("已保存HTML内容到debug_freev2.html文件")
         
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # 只构建提取订阅链接和站点信息需要的元素
+        soup = make_soup(response.text, parse_only=FREEV2_FILTER)
+        
+        # 遍历一次元素树，按各查找策略需要的元素分类收集
+        clipboard_elements = []
+        copy_candidates = []
+        scripts = []
+        anchors = []
+        for element in soup.find_all(True):
+            if element.has_attr('data-clipboard-text'):
+                clipboard_elements.append(element)
+            if element.name == 'script':
+                scripts.append(element)
+            elif element.name in ('a', 'button'):
+                copy_candidates.append(element)
+                if element.name == 'a':
+                    anchors.append(element)
         
-        # 优先查找class为btn的元素
         subscription_link = None
         
         # 直接查找带有data-clipboard-text属性的元素
-        clipboard_elements = soup.find_all(attrs={"data-clipboard-text": True})
-        
-        if clipboard_elements:
-            for element in clipboard_elements:
-                clipboard_text = element.get('data-clipboard-text')
-                if clipboard_text and (clipboard_text.startswith('http') or clipboard_text.startswith('vmess:')):
-                    subscription_link = clipboard_text
-                    logger.info(f"从data-clipboard-text属性中找到订阅链接: {subscription_link}")
-                    break
+        for element in clipboard_elements:
+            clipboard_text = element.get('data-clipboard-text')
+            if clipboard_text and (clipboard_text.startswith('http') or clipboard_text.startswith('vmess:')):
+                subscription_link = clipboard_text
+                logger.info(f"从data-clipboard-text属性中找到订阅链接: {subscription_link}")
+                break
         
         # 如果没有找到，尝试其他方法
         if not subscription_link:
             # 尝试查找class为btn的元素
-            btn_elements = soup.find_all(class_='btn')
-            for btn in btn_elements:
+            for btn in clipboard_elements:
                 clipboard_text = btn.get('data-clipboard-text')
-                if clipboard_text:
+                if 'btn' in btn.get('class', []) and clipboard_text:
                     subscription_link = clipboard_text
                     logger.info(f"从btn元素的data-clipboard-text属性中找到订阅链接: {subscription_link}")
                     break
         
         # 尝试多种方式查找"立即复制"按钮
         if not subscription_link:
-            copy_button = soup.find('a', string='立即复制')
+            copy_button = next((el for el in copy_candidates if el.name == 'a' and el.string == '立即复制'), None)
             
             if not copy_button:
-                copy_button = soup.find('button', string='立即复制')
+                copy_button = next((el for el in copy_candidates if el.name == 'button' and el.string == '立即复制'), None)
             
             if not copy_button:
-                # 尝试查找包含"复制"文本的任何元素
-                copy_buttons = soup.find_all(string=lambda text: text and ('复制' in text or '立即复制' in text))
-                for text in copy_buttons:
-                    parent = text.parent
-                    if parent.get('data-clipboard-text'):
-                        copy_button = parent
+                # 尝试查找直接包含"复制"文本且带有data-clipboard-text属性的元素
+                for element in clipboard_elements:
+                    if any('复制' in text for text in element.find_all(string=True, recursive=False)):
+                        copy_button = element
                         break
             
             if not copy_button:
                 # 尝试查找class中包含button或btn的元素
-                buttons = soup.find_all(['button', 'a'], class_=lambda c: c and ('button' in c.lower() or 'btn' in c.lower()))
-                for btn in buttons:
-                    if btn.text and '复制' in btn.text:
+                for btn in copy_candidates:
+                    classes = " ".join(btn.get('class', [])).lower()
+                    if ('button' in classes or 'btn' in classes) and btn.text and '复制' in btn.text:
                         copy_button = btn
                         break
             
@@ -115,8 +126,6 @@ def scrape_freev2():
         # 如果仍然没有找到链接，尝试执行JavaScript获取
         if not subscription_link:
             logger.info("尝试通过脚本标签查找订阅链接")
-            # 查找页面中的所有脚本标签
-            scripts = soup.find_all('script')
             
             # 在脚本中搜索可能的订阅链接
             for script in scripts:
@@ -141,7 +150,7 @@ def scrape_freev2():
             all_links = []
             
             # 查找所有a标签的href属性
-            for a in soup.find_all('a'):
+            for a in anchors:
                 href = a.get('href')
                 if href and (href.startswith('http') or href.startswith('vmess:') or href.startswith('ss:')):
                     all_links.append(href)
@@ -197,6 +206,9 @@ def scrape_freev2():
         
         # 如果没有找到段落，尝试提取div文本
         if not info_text:
+            if info_section is soup:
+                # 过滤后的元素树中没有普通div，需要完整解析
+                info_section = make_soup(response.text)
             for div in info_section.find_all('div'):
                 if div.text.strip() and len(div.text.strip()) < 200:  # 避免提取过长的文本
                     info_text += div.text.strip() + "\n"
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+离线GeoIP/ASN查询
+从本地CSV/TSV地址段数据库(或MaxMind MMDB)查询节点IP所属的国家和运营商，
+不访问网络。地址段按起始地址排序后存入紧凑数组，用二分查找定位，
+重复的服务器命中LRU缓存；域名服务器可以选择经过带缓存的解析器
+"""
+
+import os
+import csv
+import json
+import time
+import socket
+import random
+import logging
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from collections import namedtuple
+
+logger = logging.getLogger("geoip")
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+# 默认在geoip/目录下查找数据库，支持多个文件(例如国家库和ASN库)合并使用
+GEOIP_DIR = "geoip"
+DATABASE_EXTENSIONS = (".csv", ".tsv", ".mmdb")
+DNS_CACHE_FILE = "results/cache/dns.json"
+DNS_CACHE_TTL = 24 * 3600
+
+# starts/ends: 地址段起止(整数)，values: 每个地址段在labels中的下标
+# IPv4使用array存储，IPv6地址超过64位，使用列表
+RangeTable = namedtuple("RangeTable", ["starts", "ends", "values", "labels"])
+GeoInfo = namedtuple("GeoInfo", ["country", "asn", "org"])
+EMPTY = GeoInfo("", "", "")
+
+
+def ip_to_int(ip):
+    """
+    将IP地址字符串转换为(版本, 整数)，不是IP地址时返回None
+    """
+    for family, version in ((socket.AF_INET, 4), (socket.AF_INET6, 6)):
+        try:
+            return version, int.from_bytes(socket.inet_pton(family, ip), "big")
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def _parse_range(first, second):
+    """
+    解析地址段，支持 CIDR 或 起始地址+结束地址 两种写法
+
+    返回:
+    tuple: (版本, 起始整数, 结束整数, 是否占用了第二列)
+    """
+    if "/" in first:
+        address, prefix = first.split("/", 1)
+        parsed = ip_to_int(address)
+        if not parsed:
+            return None
+        version, start = parsed
+        host_bits = (32 if version == 4 else 128) - int(prefix)
+        return version, start, start | ((1 << host_bits) - 1), False
+    start, end = ip_to_int(first), ip_to_int(second)
+    if not start or not end or start[0] != end[0]:
+        return None
+    return start[0], start[1], end[1], True
+
+
+def _parse_fields(fields):
+    """
+    从地址段之后的字段中识别国家代码、ASN和运营商名称
+    """
+    country = asn = org = ""
+    for field in fields:
+        field = field.strip()
+        if not field or field in ("-", "None", "ZZ"):
+            continue
+        if not country and len(field) == 2 and field.isalpha() and field.isupper():
+            country = field
+        elif not asn and (field.isdigit() or (field.upper().startswith("AS") and field[2:].isdigit())):
+            asn = field.upper() if not field.isdigit() else f"AS{field}"
+            asn = "" if asn == "AS0" else asn
+        elif not org:
+            org = field
+    return GeoInfo(country, asn, org)
+
+
+def flatten_ranges(ranges):
+    """
+    将可能嵌套或重叠的地址段展开为互不重叠的区间，二分查找只需要比较一个候选
+
+    重叠部分使用起始地址更大的地址段(嵌套时就是更具体的地址段)的结果
+
+    参数:
+    ranges (list): [(起始整数, 结束整数, GeoInfo), ...]
+
+    返回:
+    list: 按起始地址排序、互不重叠的 [(起始整数, 结束整数, GeoInfo), ...]
+    """
+    flat = []
+    # 尚未结束的外层地址段 [(结束整数, GeoInfo), ...]，pos为下一个输出区间的起点
+    stack = []
+    pos = 0
+    for start, end, info in sorted(ranges, key=lambda r: (r[0], -r[1])):
+        while stack and stack[-1][0] < start:
+            outer_end, outer_info = stack.pop()
+            if pos <= outer_end:
+                flat.append((pos, outer_end, outer_info))
+                pos = outer_end + 1
+        if stack and pos < start:
+            flat.append((pos, start - 1, stack[-1][1]))
+        stack.append((end, info))
+        pos = start
+    while stack:
+        outer_end, outer_info = stack.pop()
+        if pos <= outer_end:
+            flat.append((pos, outer_end, outer_info))
+            pos = outer_end + 1
+    return flat
+
+
+def load_range_table(path):
+    """
+    加载CSV/TSV地址段数据库
+
+    支持的行格式(第一行为表头时自动跳过):
+    - 起始IP,结束IP,国家[,ASN,运营商]  (db-ip lite等)
+    - 起始IP\\t结束IP\\tASN\\t国家\\t运营商  (iptoasn等)
+    - CIDR,国家[,ASN,运营商]
+
+    参数:
+    path (str): 数据库文件路径
+
+    返回:
+    dict: {4: RangeTable, 6: RangeTable}
+    """
+    delimiter = "\t" if path.endswith(".tsv") else ","
+    rows = {4: [], 6: []}
+    with open(path, "r", encoding="utf-8", errors="ignore", newline="") as f:
+        for fields in csv.reader(f, delimiter=delimiter):
+            if len(fields) < 2:
+                continue
+            parsed = _parse_range(fields[0].strip(), fields[1].strip())
+            if not parsed:
+                continue
+            version, start, end, used_second = parsed
+            rows[version].append((start, end, _parse_fields(fields[2 if used_second else 1:])))
+
+    tables = {}
+    for version, ranges in rows.items():
+        ranges = flatten_ranges(ranges)
+        label_index = {}
+        values = array("I")
+        for _, _, info in ranges:
+            values.append(label_index.setdefault(info, len(label_index)))
+        labels = list(label_index)
+        starts = [r[0] for r in ranges]
+        ends = [r[1] for r in ranges]
+        if version == 4:
+            starts, ends = array("I", starts), array("I", ends)
+        tables[version] = RangeTable(starts, ends, values, labels)
+    logger.info(f"已加载GeoIP数据库 {path}: IPv4 {len(rows[4])} 段，IPv6 {len(rows[6])} 段")
+    return tables
+
+
+def lookup_range(table, value):
+    """
+    在地址段表中二分查找
+
+    返回:
+    GeoInfo: 查询结果，未命中时返回EMPTY
+    """
+    if table is None or not table.starts:
+        return EMPTY
+    i = bisect_right(table.starts, value) - 1
+    if i >= 0 and value <= table.ends[i]:
+        return table.labels[table.values[i]]
+    return EMPTY
+
+
+def find_databases(directory=GEOIP_DIR):
+    """
+    查找目录下的GeoIP数据库文件
+    """
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(DATABASE_EXTENSIONS)]
+
+
+def make_lookup(paths, cache_size=65536):
+    """
+    加载一个或多个数据库并返回带LRU缓存的查询函数
+
+    多个数据库的结果按字段合并，前面的数据库优先。例如国家库和ASN库可以同时使用。
+
+    参数:
+    paths (list): 数据库文件路径
+    cache_size (int): LRU缓存大小
+
+    返回:
+    callable: lookup(ip) -> GeoInfo，没有可用数据库时返回None
+    """
+    sources = []
+    for path in paths:
+        if path.endswith(".mmdb"):
+            if maxminddb is None:
+                logger.warning(f"未安装maxminddb，跳过 {path}")
+                continue
+            sources.append(("mmdb", maxminddb.open_database(path)))
+        else:
+            sources.append(("ranges", load_range_table(path)))
+    if not sources:
+        return None
+
+    @lru_cache(maxsize=cache_size)
+    def lookup(ip):
+        parsed = ip_to_int(ip)
+        if not parsed:
+            return EMPTY
+        version, value = parsed
+        country = asn = org = ""
+        for kind, source in sources:
+            if kind == "mmdb":
+                record = source.get(ip) or {}
+                info = GeoInfo(
+                    (record.get("country") or record.get("registered_country") or {}).get("iso_code", ""),
+                    f"AS{record['autonomous_system_number']}" if record.get("autonomous_system_number") else "",
+                    record.get("autonomous_system_organization", "")
+                )
+            else:
+                info = lookup_range(source.get(version), value)
+            country, asn, org = country or info.country, asn or info.asn, org or info.org
+            if country and asn and org:
+                break
+        return GeoInfo(country, asn, org)
+
+    return lookup
+
+
+def load_dns_cache(path=DNS_CACHE_FILE):
+    """
+    读取域名解析缓存 {域名: [IP, 解析时间]}
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_dns_cache(cache, path=DNS_CACHE_FILE):
+    """
+    保存域名解析缓存
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def resolve_host(host, cache, ttl=DNS_CACHE_TTL):
+    """
+    解析域名，优先使用缓存(包括解析失败的结果，避免反复解析)
+
+    参数:
+    host (str): 域名
+    cache (dict): 解析缓存，会被原地更新
+    ttl (int): 缓存有效期(秒)
+
+    返回:
+    str: IP地址，解析失败时返回空字符串
+    """
+    entry = cache.get(host)
+    if entry and time.time() - entry[1] < ttl:
+        return entry[0]
+    try:
+        ip = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)[0][4][0]
+    except (OSError, UnicodeError):
+        ip = ""
+    cache[host] = [ip, int(time.time())]
+    return ip
+
+
+def enrich_history(db_path=None, paths=None, resolve=False, refresh=False):
+    """
+    为节点历史库中的节点写入国家、ASN和运营商
+
+    参数:
+    db_path (str, optional): 节点历史库路径
+    paths (list, optional): GeoIP数据库文件，默认为geoip/目录下的全部数据库
+    resolve (bool): 是否解析域名服务器(需要网络，默认关闭)
+    refresh (bool): 是否重新查询已有结果的节点，默认只查询新节点
+
+    返回:
+    int: 更新的节点数
+    """
+    import node_history
+
+    lookup = make_lookup(paths if paths is not None else find_databases())
+    if lookup is None:
+        logger.info("未找到GeoIP数据库，跳过节点地区标注")
+        return 0
+
+    conn = node_history.connect(db_path or node_history.DB_PATH)
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(nodes)")}
+        for column in ("country", "asn", "org"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE nodes ADD COLUMN {column} TEXT")
+
+        query = "SELECT fp, server FROM nodes" + ("" if refresh else " WHERE country IS NULL")
+        dns_cache = load_dns_cache() if resolve else None
+        start = time.perf_counter()
+        updates = []
+        for fp, server in conn.execute(query).fetchall():
+            ip = server
+            if ip_to_int(server) is None:
+                ip = resolve_host(server, dns_cache) if resolve else ""
+            if not ip:
+                # 没有解析的域名保持NULL，之后使用 --resolve 时还会被选中
+                continue
+            info = lookup(ip)
+            # 空字符串表示已经查询过但没有结果，下次增量更新时不再重复查询
+            updates.append((info.country, info.asn, info.org, fp))
+        with conn:
+            conn.executemany("UPDATE nodes SET country = ?, asn = ?, org = ? WHERE fp = ?", updates)
+        if resolve:
+            save_dns_cache(dns_cache)
+        cache = lookup.cache_info()
+        logger.info(f"已标注 {len(updates)} 个节点的地区，耗时 {time.perf_counter() - start:.2f} 秒，"
+                    f"缓存命中 {cache.hits}/{cache.hits + cache.misses}")
+        return len(updates)
+    finally:
+        conn.close()
+
+
+def benchmark(lookup, count=1000000, distinct=5000):
+    """
+    微基准: 模拟重复服务器居多的查询
+
+    返回:
+    dict: 查询次数和每秒查询数
+    """
+    ips = [socket.inet_ntoa(random.getrandbits(32).to_bytes(4, "big")) for _ in range(distinct)]
+    queries = [random.choice(ips) for _ in range(count)]
+    lookup.cache_clear()
+    start = time.perf_counter()
+    for ip in queries:
+        lookup(ip)
+    seconds = time.perf_counter() - start
+    return {"lookups": count, "distinct": distinct, "per_second": int(count / seconds) if seconds else 0}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="离线GeoIP/ASN标注")
+    parser.add_argument("databases", nargs="*", help="GeoIP数据库文件(CSV/TSV/MMDB)，默认使用geoip/目录下的全部数据库")
+    parser.add_argument("--lookup", nargs="+", metavar="IP", help="查询指定IP")
+    parser.add_argument("--enrich", action="store_true", help="为节点历史库中的节点写入国家和运营商")
+    parser.add_argument("--refresh", action="store_true", help="与--enrich一起使用，重新查询全部节点")
+    parser.add_argument("--resolve", action="store_true", help="与--enrich一起使用，解析域名服务器(需要网络)")
+    parser.add_argument("--benchmark", action="store_true", help="运行查询微基准")
+
+    args = parser.parse_args()
+    paths = args.databases or find_databases()
+
+    if args.enrich:
+        enrich_history(paths=paths, resolve=args.resolve, refresh=args.refresh)
+
+    if args.lookup or args.benchmark:
+        lookup = make_lookup(paths)
+        if lookup is None:
+            print("未找到GeoIP数据库")
+        else:
+            for ip in args.lookup or []:
+                info = lookup(ip)
+                print(f"{ip}: 国家={info.country or '-'} ASN={info.asn or '-'} 运营商={info.org or '-'}")
+            if args.benchmark:
+                result = benchmark(lookup)
+                print(f"{result['lookups']} 次查询({result['distinct']} 个不同IP): {result['per_second']} 次/秒")
@@ -6,8 +6,10 @@ import re
 import logging
 import json
 import os
+import hashlib
+import heapq
 from datetime import datetime
-from bs4 import BeautifulSoup
+from html_backend import make_soup, tags_filter
 
 # 配置日志
 logging.basicConfig(
@@ -21,6 +23,94 @@ logging.basicConfig(
 
 logger = logging.getLogger("github_monitor")
 
+# 仓库页面中只有README表格里的日期数据有用
+GITHUB_TABLE_FILTER = tags_filter("table")
+
+HISTORY_FILE = "github_monitor_history.json"
+
+# 匹配格式为 | 2025-04-05 | 20 | 这样的行
+DATE_ROW_PATTERN = re.compile(r'\|\s*(20\d{2}-\d{2}-\d{2})\s*\|\s*(\d+)\s*\|')
+
+def load_history():
+    """
+    读取监控历史记录
+
+    返回:
+    dict: 历史记录，文件不存在或损坏时返回空字典
+    """
+    if os.path.exists(HISTORY_FILE):
+        try:
+            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.exception(f"读取历史记录文件出错: {e}")
+    return {}
+
+def save_history(history):
+    """
+    保存监控历史记录
+    """
+    history['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        logger.exception(f"保存历史记录文件出错: {e}")
+
+def parse_date_table(readme_content, table_state=None):
+    """
+    增量解析README中的日期表格
+
+    新日期总是插入在表格顶部，因此记住上次解析时第一行的原文和从该行到文末内容的长度与摘要。
+    再次解析时只要这一行仍在且其后内容没有变化，就只扫描它之前新增的部分；
+    旧行被修改、删除或在中间补录时摘要不再一致，回退为完整扫描。
+
+    参数:
+    readme_content (str): README内容
+    table_state (dict, optional): 上次解析保存的表格状态
+
+    返回:
+    tuple: (按日期降序排列的[(YYYYMMDD, node_count), ...], 新的表格状态, 本次扫描到的行数)
+    """
+    known_rows = []
+    end = len(readme_content)
+    if table_state and table_state.get('head_row'):
+        pos = readme_content.find(table_state['head_row'])
+        if pos != -1 and len(readme_content) - pos == table_state.get('tail_length'):
+            tail_digest = hashlib.sha1(readme_content[pos:].encode('utf-8')).hexdigest()
+            if tail_digest == table_state.get('tail_digest'):
+                known_rows = [tuple(row) for row in table_state.get('rows', [])]
+                end = pos
+
+    head = None
+    scanned_rows = []
+    for match in DATE_ROW_PATTERN.finditer(readme_content, 0, end):
+        if head is None:
+            head = match
+        scanned_rows.append((match.group(1).replace('-', ''), int(match.group(2))))
+
+    # 新扫描到的行只有少数几行，排序后与已知的降序行归并
+    dates = []
+    seen_dates = set()
+    for date_tuple in heapq.merge(sorted(scanned_rows, key=lambda x: x[0], reverse=True), known_rows,
+                                  key=lambda x: x[0], reverse=True):
+        if date_tuple[0] not in seen_dates:
+            seen_dates.add(date_tuple[0])
+            dates.append(date_tuple)
+
+    if head is not None:
+        tail = readme_content[head.start():]
+        table_state = {
+            'head_row': head.group(0),
+            'tail_length': len(tail),
+            'tail_digest': hashlib.sha1(tail.encode('utf-8')).hexdigest()
+        }
+    elif not known_rows:
+        table_state = {}
+    table_state = dict(table_state, rows=[list(row) for row in dates]) if dates else {}
+
+    return dates, table_state, len(scanned_rows)
+
 def fetch_github_dates_from_url(url="https://raw.githubusercontent.com/Jeffrey-done/clash-freenode/main/README.md"):
     """
     从GitHub仓库的原始README文件中获取节点日期信息
@@ -41,18 +131,16 @@ def fetch_github_dates_from_url(url="https://raw.githubusercontent.com/Jeffrey-d
         response.raise_for_status()
         readme_content = response.text
         
-        # 提取日期表格部分
-        dates = []
-        
-        # 使用正则表达式直接提取表格中的日期和节点数据
-        # 匹配格式为 | 2025-04-05 | 20 | 这样的行
-        date_pattern = r'\|\s*(20\d{2}-\d{2}-\d{2})\s*\|\s*(\d+)\s*\|'
-        date_matches = re.findall(date_pattern, readme_content)
-        
-        for date_match in date_matches:
-            date_str = date_match[0].replace('-', '')  # 转换为YYYYMMDD格式
-            node_count = int(date_match[1])
-            dates.append((date_str, node_count))
+        # 只解析表格中上次已知第一行之前的新增部分
+        history = load_history()
+        dates, table_state, scanned = parse_date_table(readme_content, history.get('table'))
+        if scanned < len(dates):
+            logger.info(f"增量解析日期表格: 扫描 {scanned} 行，共 {len(dates)} 个日期")
+        else:
+            logger.info(f"完整解析日期表格: 共 {len(dates)} 个日期")
+        if table_state != history.get('table'):
+            history['table'] = table_state
+            save_history(history)
         
         # 如果没有找到日期表格，尝试查找"最后更新"字段
         if not dates:
@@ -64,8 +152,8 @@ def fetch_github_dates_from_url(url="https://raw.githubusercontent.com/Jeffrey-d
                 dates.append((date_str, 0))  # 节点数未知，用0表示
         
         if dates:
-            # 按日期降序排序
-            sorted_dates = sorted(dates, key=lambda x: x[0], reverse=True)
+            # 表格解析结果已按日期降序排列
+            sorted_dates = dates
             logger.info(f"成功获取到 {len(sorted_dates)} 个日期")
             # 打印前3个日期进行确认
             for i, date_tuple in enumerate(sorted_dates[:3]):
@@ -126,8 +214,8 @@ def fetch_github_dates(repo_url="https://github.com/OpenRunner/clash-freenode"):
         response.raise_for_status()
         html_content = response.text
         
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # 只构建页面中的表格
+        soup = make_soup(html_content, parse_only=GITHUB_TABLE_FILTER)
         
         # 查找日期表格
         date_tuples = []
@@ -245,6 +333,31 @@ def get_all_dates():
     
     return dates
 
+def get_processed_dates(date_tuples=()):
+    """
+    获取已处理过的日期集合
+
+    旧版历史记录只保存了last_date，此时把不晚于last_date的已知日期都视为已处理
+
+    参数:
+    date_tuples (list, optional): 当前获取到的日期列表，用于从旧版历史记录推算已处理日期
+
+    返回:
+    set: 已处理的日期集合，格式为YYYYMMDD
+    """
+    history = load_history()
+    return _processed_dates(history, date_tuples)
+
+def _processed_dates(history, date_tuples=()):
+    if 'processed_dates' in history:
+        return set(history['processed_dates'])
+    last_date = history.get('last_date')
+    if not last_date:
+        return set()
+    known_dates = [row[0] for row in history.get('table', {}).get('rows', [])]
+    known_dates += [date_tuple[0] for date_tuple in date_tuples]
+    return {date for date in known_dates if date <= last_date} | {last_date}
+
 def get_last_processed_date():
     """
     获取上次处理的最新日期
@@ -252,15 +365,7 @@ def get_last_processed_date():
     返回:
     str: 上次处理的最新日期，格式为YYYYMMDD，如果没有则返回None
     """
-    history_file = "github_monitor_history.json"
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-                return history.get('last_date')
-        except Exception as e:
-            logger.exception(f"读取历史记录文件出错: {e}")
-    return None
+    return load_history().get('last_date')
 
 def save_last_processed_date(date):
     """
@@ -269,14 +374,27 @@ def save_last_processed_date(date):
     参数:
     date (str): 日期，格式为YYYYMMDD
     """
-    history_file = "github_monitor_history.json"
-    try:
-        history = {'last_date': date, 'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-        logger.info(f"已保存最新处理日期: {date}")
-    except Exception as e:
-        logger.exception(f"保存历史记录文件出错: {e}")
+    history = load_history()
+    history['last_date'] = date
+    save_history(history)
+    logger.info(f"已保存最新处理日期: {date}")
+
+def mark_dates_processed(dates):
+    """
+    把日期加入已处理集合，并更新最新处理日期
+    
+    参数:
+    dates (list): 日期列表，格式为YYYYMMDD
+    """
+    if not dates:
+        return
+    history = load_history()
+    processed = _processed_dates(history)
+    processed.update(dates)
+    history['processed_dates'] = sorted(processed, reverse=True)
+    history['last_date'] = max(history.get('last_date') or '', *dates)
+    save_history(history)
+    logger.info(f"已记录 {len(dates)} 个已处理日期，最新处理日期: {history['last_date']}")
 
 def get_new_dates():
     """
@@ -286,25 +404,24 @@ def get_new_dates():
     list: 需要处理的日期列表，格式为 [(YYYYMMDD, node_count), ...]，按时间降序排列
     """
     all_date_tuples = get_all_dates()
-    last_date = get_last_processed_date()
     
     if not all_date_tuples:
         logger.warning("没有获取到任何日期")
         return []
     
-    if not last_date:
+    processed = get_processed_dates(all_date_tuples)
+    if not processed:
         logger.info("没有历史记录，将处理所有日期")
         return all_date_tuples
     
-    # 查找需要处理的新日期
-    new_date_tuples = []
-    for date_tuple in all_date_tuples:
-        if date_tuple[0] > last_date:
-            new_date_tuples.append(date_tuple)
-        else:
-            break  # 日期已按降序排列，遇到小于等于上次处理的日期时可以停止
+    # 与已处理日期集合比较，表格中补录或之前遗漏的旧日期也会被找出
+    new_date_tuples = [date_tuple for date_tuple in all_date_tuples if date_tuple[0] not in processed]
+    latest_processed = max(processed)
+    backfilled = sum(1 for date_tuple in new_date_tuples if date_tuple[0] < latest_processed)
     
     logger.info(f"找到 {len(new_date_tuples)} 个新日期需要处理")
+    if backfilled:
+        logger.info(f"其中 {backfilled} 个是早于 {latest_processed} 的补录或遗漏日期")
     return new_date_tuples
 
 def get_all_dates_to_process():
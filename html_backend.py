@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTML解析后端
+优先使用lxml解析器，并支持按标签名/属性只构建提取器需要的元素，
+未安装lxml时自动回退到内置的html.parser
+"""
+
+import os
+import time
+import logging
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger("html_backend")
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+
+
+class TagFilter(SoupStrainer):
+    """
+    按标签名和属性决定是否构建元素的过滤器，用作BeautifulSoup的parse_only
+    被选中元素的全部子孙都会保留；兼容bs4 4.13前后两套parse_only接口
+    """
+
+    def __init__(self, predicate):
+        """
+        参数:
+        predicate (callable): predicate(标签名, 属性字典) -> bool
+        """
+        self.predicate = predicate
+        # 旧版bs4会以(标签名, 属性)调用name规则
+        super().__init__(name=self._match)
+
+    def _match(self, name, attrs=None):
+        return self.predicate(name, dict(attrs or {}))
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        # 新版bs4在建树时调用此方法
+        return self.predicate(name, dict(attrs or {}))
+
+
+def tags_filter(*names, **attrs):
+    """
+    构造只保留指定标签、或带有指定属性的元素的过滤器
+
+    参数:
+    names (str): 需要保留的标签名
+    attrs: 属性名=True表示只要带有该属性即保留，属性名=字符串表示属性值中包含该字符串时保留
+           (属性名中的下划线会转换为连字符，class_表示class属性)
+
+    返回:
+    TagFilter: 过滤器
+    """
+    names = set(names)
+    wanted = {}
+    for key, value in attrs.items():
+        key = "class" if key == "class_" else key.replace("_", "-")
+        wanted[key] = value
+
+    def predicate(name, tag_attrs):
+        if name in names:
+            return True
+        for key, value in wanted.items():
+            if key not in tag_attrs:
+                continue
+            if value is True:
+                return True
+            actual = tag_attrs[key]
+            if isinstance(actual, (list, tuple)):
+                actual = " ".join(actual)
+            if value in (actual or ""):
+                return True
+        return False
+
+    return TagFilter(predicate)
+
+
+def make_soup(markup, parse_only=None, parser=None):
+    """
+    使用最快的可用解析器构建BeautifulSoup对象
+
+    参数:
+    markup (str): HTML内容
+    parse_only (SoupStrainer, optional): 只构建匹配的元素(及其子孙)
+    parser (str, optional): 指定解析器，默认为DEFAULT_PARSER
+
+    返回:
+    BeautifulSoup: 解析结果
+    """
+    return BeautifulSoup(markup, parser or DEFAULT_PARSER, parse_only=parse_only)
+
+
+def benchmark(markup, parse_only=None, rounds=20):
+    """
+    对比html.parser全量解析、lxml全量解析和lxml过滤解析的耗时
+
+    返回:
+    dict: 每种方式每轮平均耗时(毫秒)
+    """
+    def timed(parser, strainer):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            BeautifulSoup(markup, parser, parse_only=strainer)
+        return round((time.perf_counter() - start) / rounds * 1000, 2)
+
+    report = {
+        "bytes": len(markup.encode("utf-8")),
+        "html.parser": timed("html.parser", None)
+    }
+    if DEFAULT_PARSER == "lxml":
+        report["lxml"] = timed("lxml", None)
+    if parse_only is not None:
+        report[f"{DEFAULT_PARSER}+filter"] = timed(DEFAULT_PARSER, parse_only)
+    return report
+
+
+# 没有调试抓取文件时使用的示例页面
+SAMPLE_HTML = "<html><head>" + "<script>var x = 1;</script>" * 20 + "</head><body>" + (
+    "<div class='post'><h2>文章标题</h2><div class='meta'><span>作者</span><span>标签</span></div>"
+    "<p>正文段落<a href='https://example.com/page'>链接</a></p><ul><li>项目: 1</li><li>项目: 2</li></ul></div>"
+) * 300 + (
+    "<div class='hero-body'><p>FreeV2.net免费节点</p>"
+    "<a class='btn' data-clipboard-text='https://b.freev2.net/sub/abc'>立即复制</a></div>"
+) + "</body></html>"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="HTML解析后端基准测试")
+    parser.add_argument("files", nargs="*", help="调试抓取的HTML文件，默认使用debug_freev2.html和debug目录下的HTML")
+    parser.add_argument("--rounds", type=int, default=20, help="重复次数")
+
+    args = parser.parse_args()
+
+    # 各爬虫的过滤器按文件名前缀匹配
+    from freev2_scraper import FREEV2_FILTER
+    from datiya_scraper import DATIYA_FILTER
+    from github_monitor import GITHUB_TABLE_FILTER
+    filters = {"freev2": FREEV2_FILTER, "datiya": DATIYA_FILTER, "github": GITHUB_TABLE_FILTER}
+
+    files = args.files
+    if not files:
+        files = [f for f in ["debug_freev2.html"] if os.path.exists(f)]
+        if os.path.isdir("debug"):
+            files += [os.path.join("debug", f) for f in sorted(os.listdir("debug")) if f.endswith(".html")]
+
+    captures = []
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            captures.append((path, f.read()))
+    if not captures:
+        print("未找到调试抓取文件，使用内置示例页面")
+        captures.append(("sample_freev2", SAMPLE_HTML))
+
+    print(f"默认解析器: {DEFAULT_PARSER}")
+    for path, markup in captures:
+        name = os.path.basename(path)
+        strainer = next((flt for key, flt in filters.items() if key in name), FREEV2_FILTER)
+        report = benchmark(markup, strainer, args.rounds)
+        timings = ", ".join(f"{k}: {v} 毫秒" for k, v in report.items() if k != "bytes")
+        print(f"{name} ({report['bytes']} 字节): {timings}")
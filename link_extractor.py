@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+README类来源的通用链接提取器
+每个来源在导入时把自己的全部规则编译成一个带命名分组的交替正则，
+对文档只扫描一遍，再按命名分组对每个匹配进行分类
+"""
+
+import re
+import time
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger("link_extractor")
+
+# pattern: 编译后的交替正则
+# subgroups: {规则名: 该规则内部命名分组名的元组}，用于零宽规则(如表格行)取值
+Extractor = namedtuple("Extractor", ["pattern", "subgroups"])
+
+# 订阅链接中允许出现的字符，与各爬虫原有的正则保持一致
+URL_CHARS = r"[\w\./\-=]"
+
+
+def compile_extractor(rules, flags=re.MULTILINE):
+    """
+    将规则列表编译为一个提取器
+
+    参数:
+    rules (list): [(规则名, 正则), ...]，按优先级排列。同一位置上排在前面的规则优先匹配。
+                  正则内部可以带有以"规则名__"开头的命名分组，提取时会作为元组返回。
+                  规则名为None时不再包裹命名分组，由正则自身结尾的空命名分组标记类别(见suffix_rule)。
+    flags (int): 正则标志
+
+    返回:
+    Extractor: 编译后的提取器
+    """
+    parts = []
+    subgroups = {}
+    for name, pattern in rules:
+        if name is None:
+            parts.append(pattern)
+            continue
+        inner = re.compile(pattern, flags).groupindex
+        subgroups[name] = tuple(g for g in sorted(inner, key=inner.get) if g.startswith(f"{name}__"))
+        parts.append(f"(?P<{name}>{pattern})")
+    return Extractor(re.compile("|".join(parts), flags), subgroups)
+
+
+def suffix_rule(prefix, suffixes):
+    """
+    多个规则共享同一前缀时合并成一条规则，前缀只扫描一次，
+    每个后缀后面跟一个空命名分组，匹配结束时最后闭合的分组即为类别
+
+    参数:
+    prefix (str): 公共前缀正则，例如惰性匹配的链接主体
+    suffixes (list): [(规则名, 后缀正则), ...]，按优先级排列
+
+    返回:
+    tuple: 可直接放入compile_extractor规则列表的(None, 正则)
+    """
+    alternatives = "|".join(f"{suffix}(?P<{name}>)" for name, suffix in suffixes)
+    return (None, f"{prefix}(?:{alternatives})")
+
+
+def iter_matches(extractor, text):
+    """
+    单次扫描文档，依次产出 (规则名, 值, 位置)
+
+    没有内部分组的规则，值是匹配到的文本；带有"规则名__"内部分组的规则，值是这些分组组成的元组。
+    用前瞻写成的零宽规则(例如表格行)不会消耗文本，同一段文本中的链接仍然可以被其他规则匹配到。
+    """
+    subgroups = extractor.subgroups
+    for match in extractor.pattern.finditer(text):
+        kind = match.lastgroup
+        if subgroups.get(kind):
+            value = tuple((match.group(g) or "").strip() for g in subgroups[kind])
+        else:
+            value = match.group(kind) or match.group(0)
+        yield kind, value, match.start()
+
+
+def extract(extractor, text, section_kinds=()):
+    """
+    扫描文档并按章节、规则分类汇总匹配结果(保序去重)
+
+    参数:
+    extractor (Extractor): compile_extractor返回的提取器
+    text (str): 文档内容
+    section_kinds (tuple): 作为章节分隔的规则名，匹配到时切换当前章节
+
+    返回:
+    dict: {章节名: {规则名: [值, ...]}}，文档开头到第一个分隔规则之前的章节名为空字符串
+    """
+    sections = {"": {}}
+    section = ""
+    seen = set()
+    for kind, value, _ in iter_matches(extractor, text):
+        if kind in section_kinds:
+            section = kind
+            sections.setdefault(section, {})
+            continue
+        if (section, kind, value) in seen:
+            continue
+        seen.add((section, kind, value))
+        sections[section].setdefault(kind, []).append(value)
+    return sections
+
+
+def merge_sections(sections, kind):
+    """
+    合并所有章节中某一规则的匹配结果(保序去重)
+    """
+    merged = []
+    for matches in sections.values():
+        for value in matches.get(kind, []):
+            if value not in merged:
+                merged.append(value)
+    return merged
+
+
+def benchmark(extractor, text, legacy_patterns=(), rounds=200, section_kinds=()):
+    """
+    微基准: 比较单次扫描提取与逐个正则多次findall的耗时
+
+    参数:
+    extractor (Extractor): 提取器
+    text (str): 测试文档
+    legacy_patterns (iterable): 旧实现中逐个执行的正则列表
+    rounds (int): 重复次数
+    section_kinds (tuple): 传给extract的章节分隔规则名
+
+    返回:
+    dict: 每轮平均耗时(微秒)
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        extract(extractor, text, section_kinds)
+    single_pass = (time.perf_counter() - start) / rounds * 1e6
+
+    compiled = [re.compile(p) for p in legacy_patterns]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for pattern in compiled:
+            pattern.findall(text)
+    multi_pass = (time.perf_counter() - start) / rounds * 1e6
+
+    return {
+        "bytes": len(text.encode("utf-8")),
+        "rounds": rounds,
+        "single_pass_us": round(single_pass, 1),
+        "multi_pass_us": round(multi_pass, 1),
+        "legacy_patterns": len(compiled)
+    }
+
+
+# 旧实现中逐个执行的正则，仅用于基准对比
+LEGACY_PATTERNS = {
+    "shaoyou": [
+        r"https?://[\w\./\-=]+?\.yaml",
+        r"https?://[\w\./\-=]+?/all\.yaml",
+        r"https?://[\w\./\-=]+?\.txt",
+        r"https?://[\w\./\-=]+?/base64\.txt",
+        r"https?://[\w\./\-=]+?mihomo\.yaml",
+        r"https?://[\w\./\-=]+?/mihomo\.yaml",
+        r"# 无需代理更新节点订阅([\s\S]+?)(?=#|$)",
+        r"(https?://[\w\./\-=]+?vless-all)",
+        r"(https?://[\w\./\-=]+?/all\.yaml)",
+        r"(https?://[\w\./\-=]+?/vless-all)",
+        r"(https?://[\w\./\-=]+?vless-base64)",
+        r"(https?://[\w\./\-=]+?/base64\.txt)",
+        r"(https?://[\w\./\-=]+?/vless-base64)",
+        r"(https?://[\w\./\-=]+?vless-mihomo)",
+        r"(https?://[\w\./\-=]+?/mihomo\.yaml)",
+        r"(https?://[\w\./\-=]+?/vless-mihomo)",
+        r"\|.*?\|.*?\|.*?\|([\s\S]+?)(?=##|$)",
+        r"\|\s*(.*?)\s*\|\s*(.*?)\s*\|\s*(.*?)\s*\|"
+    ],
+    "v2rayc": [
+        r"(\d+月\d+日.*?免费节点.*?订阅链接)",
+        r"更新时间\s*(20\d{2}-\d{2}-\d{2}\s*\d{2}:\d{2}:\d{2})",
+        r"(\d{4})[-/](\d{2})[-/](\d{2})|(\d{8})",
+        r"https?://v2rayc\.github\.io/uploads/\d+/\d+/[^.\s]+\.yaml",
+        r"https?://v2rayc\.github\.io/uploads/\d+/\d+/[^.\s]+\.txt",
+        r"https?://v2rayc\.github\.io/uploads/\d+/\d+/[^.\s]+\.json"
+    ]
+}
+
+# 没有调试文件时使用的示例文档
+SAMPLE_READMES = {
+    "shaoyou": """# 周润发公益免费v2ray节点订阅
+
+每2小时更新一次
+
+## 订阅链接
+
+- yaml: https://raw.githubusercontent.com/shaoyouvip/free/refs/heads/main/all.yaml
+- base64: https://raw.githubusercontent.com/shaoyouvip/free/refs/heads/main/base64.txt
+- mihomo: https://raw.githubusercontent.com/shaoyouvip/free/main/mihomo.yaml
+
+# 无需代理更新节点订阅
+
+- https://d.aizrf.com/vless-all
+- https://d.aizrf.com/vless-base64
+- https://d.aizrf.com/vless-mihomo
+
+## 客户端
+
+| 名称 | 平台 | 下载 |
+| --- | --- | --- |
+| SingBox | Mac/Linux/Android/Ios | [https://sing-box.sagernet.org/clients/](https://sing-box.sagernet.org/clients/) |
+| FlClash | Mac/Linux/Windows/Android | [https://github.com/chen08209/FlClash](https://github.com/chen08209/FlClash) |
+| V2RayN | Windows | [https://github.com/2dust/v2rayN](https://github.com/2dust/v2rayN) |
+""",
+    "v2rayc": """# 2月21日→21.6M/S|免费节点Clash/SSR/V2rayC订阅链接
+
+更新时间 2026-02-21 09:00:09
+
+""" + "".join(
+        f"- https://v2rayc.github.io/uploads/2026/02/{i}-20260221.yaml\n"
+        f"- https://v2rayc.github.io/uploads/2026/02/{i}-20260221.txt\n" for i in range(5)
+    ) + "- https://v2rayc.github.io/uploads/2026/02/20260221.json\n"
+}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="README链接提取器微基准")
+    parser.add_argument("--source", choices=["shaoyou", "v2rayc"], default="shaoyou", help="使用哪个来源的规则")
+    parser.add_argument("--file", help="README文件路径，默认使用对应来源的调试文件")
+    parser.add_argument("--rounds", type=int, default=200, help="重复次数")
+    parser.add_argument("--repeat", type=int, default=1, help="将文档重复N次以放大规模")
+
+    args = parser.parse_args()
+
+    if args.source == "shaoyou":
+        from shaoyou_scraper import README_EXTRACTOR as extractor, README_SECTIONS as section_kinds
+        default_file = "debug/debug_shaoyou.md"
+    else:
+        from v2rayc_scraper import README_EXTRACTOR as extractor
+        section_kinds = ()
+        default_file = "debug_v2rayc_readme.txt"
+
+    path = args.file or default_file
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except OSError:
+        print(f"未找到 {path}，使用内置示例文档")
+        content = SAMPLE_READMES[args.source]
+
+    result = benchmark(extractor, content * args.repeat, LEGACY_PATTERNS[args.source], args.rounds, section_kinds)
+    print(f"文档大小: {result['bytes']} 字节, 重复 {result['rounds']} 轮")
+    print(f"单次扫描: {result['single_pass_us']} 微秒/轮")
+    print(f"逐个正则({result['legacy_patterns']}个): {result['multi_pass_us']} 微秒/轮")
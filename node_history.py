@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+节点历史库
+以节点指纹为键记录每个节点的首次出现、最后出现、出现次数和来源(位掩码)，
+数据保存在results/nodes.db(SQLite)。首次构建时并行回放整个downloads/归档，
+之后每次运行只解析新增或内容变化的订阅文件。
+文件按内容摘要判断是否变化(CI每次检出都会重置修改时间)，每个文件包含的节点指纹也保存在库中，
+文件内容变化时替换它原来的贡献，而不是重复累加出现次数
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from node_parser import parse_subscription, node_fingerprint
+
+logger = logging.getLogger("node_history")
+
+DB_PATH = "results/nodes.db"
+DOWNLOADS_DIR = "downloads"
+
+# 来源位掩码，同一节点出现在多个来源时按位或
+SOURCES = {
+    "datiya": 1,
+    "freev2": 2,
+    "bestclash": 4,
+    "shaoyou": 8,
+    "ripao": 16,
+    "v2rayc": 32
+}
+
+SUBSCRIPTION_EXTENSIONS = (".yaml", ".yml", ".txt", ".json")
+# 文件名中的日期: datiya为 20250405-clash.yaml，其余为 xxx_20250405_024441.txt 或 xxx_1_20250404.yaml
+FILE_DATE_PATTERN = re.compile(r"(?:^|[_-])(20\d{6})(?=[_\-.])")
+
+# 文件数少于该值时直接在当前进程解析，避免启动进程池的开销
+PARALLEL_THRESHOLD = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    fp TEXT PRIMARY KEY,
+    type TEXT,
+    server TEXT,
+    port INTEGER,
+    name TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    sightings INTEGER,
+    sources INTEGER,
+    config TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS node_days (
+    fp TEXT,
+    day TEXT,
+    sources INTEGER,
+    PRIMARY KEY (fp, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    source TEXT,
+    day TEXT,
+    nodes INTEGER,
+    digest TEXT,
+    fps BLOB
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_nodes_last_seen ON nodes (last_seen);
+CREATE INDEX IF NOT EXISTS idx_node_days_day ON node_days (day);
+"""
+
+
+def connect(db_path=DB_PATH):
+    """
+    打开节点历史库，不存在时创建
+
+    返回:
+    sqlite3.Connection: 数据库连接
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(ingested_files)")}
+    if columns and "digest" not in columns:
+        # 旧版本按修改时间判断文件变化，没有记录每个文件的节点，出现次数可能已被重复累加，清空后重新回放归档
+        logger.warning("节点历史库是旧格式，清空节点记录后重新回放整个归档")
+        with conn:
+            conn.execute("DROP TABLE ingested_files")
+            conn.execute("DELETE FROM node_days")
+            conn.execute("DELETE FROM nodes")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def source_names(mask):
+    """
+    将来源位掩码转换为来源名称列表
+    """
+    return [name for name, bit in SOURCES.items() if mask & bit]
+
+
+def classify_file(path, root=DOWNLOADS_DIR):
+    """
+    根据路径判断订阅文件的来源和日期
+
+    参数:
+    path (str): 文件路径
+    root (str): 下载目录
+
+    返回:
+    tuple: (来源, YYYY-MM-DD)，不是需要记录的订阅文件时返回None
+    """
+    filename = os.path.basename(path)
+    # _latest文件是最新一份的副本，下载记录不是订阅文件
+    if not filename.endswith(SUBSCRIPTION_EXTENSIONS) or "_latest" in filename or "download_record" in filename:
+        return None
+    relative = os.path.relpath(path, root).split(os.sep)
+    source = relative[0] if len(relative) > 1 else "datiya"
+    if source not in SOURCES:
+        return None
+    # 只使用文件名中的日期，文件修改时间在检出后没有意义
+    match = FILE_DATE_PATTERN.search(filename)
+    if not match:
+        return None
+    day = match.group(1)
+    return source, f"{day[:4]}-{day[4:6]}-{day[6:8]}"
+
+
+def file_digest(path):
+    """
+    计算文件内容的SHA-1摘要
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pack_fps(fps):
+    # 16位十六进制指纹按8字节紧凑存储
+    return b"".join(bytes.fromhex(fp) for fp in sorted(fps))
+
+
+def _unpack_fps(blob):
+    blob = blob or b""
+    return [blob[i:i + 8].hex() for i in range(0, len(blob), 8)]
+
+
+def _parse_file(path):
+    """
+    解析单个订阅文件(在进程池中执行)
+
+    返回:
+    tuple: (路径, [(指纹, 节点字典), ...])
+    """
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            nodes = parse_subscription(f.read(), path)
+    except OSError as e:
+        logger.warning(f"读取订阅文件 {path} 出错: {e}")
+        nodes = []
+    return path, [(node_fingerprint(node), node) for node in nodes]
+
+
+def _port(node):
+    # 端口可能是字符串，也可能是端口范围等无法转换为整数的值，这时记为0
+    try:
+        return int(node.get("port") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _node_row(fp, node, day, count, sources):
+    return (
+        fp, str(node.get("type", "")), str(node.get("server", "")), _port(node),
+        str(node.get("name", "")), day, day, count, sources,
+        json.dumps(node, ensure_ascii=False, sort_keys=True, default=str)
+    )
+
+
+def record_nodes(conn, parsed_files):
+    """
+    将解析结果写入历史库
+
+    参数:
+    conn (sqlite3.Connection): 数据库连接
+    parsed_files (list): [(路径, 来源, 日期, 大小, 修改时间, 内容摘要, [(指纹, 节点字典), ...]), ...]
+
+    返回:
+    int: 涉及的节点数
+    """
+    # 已记录过的文件内容发生变化时，需要去掉它原来的贡献
+    changed = {}
+    paths = [item[0] for item in parsed_files]
+    for i in range(0, len(paths), 500):
+        chunk = paths[i:i + 500]
+        for row in conn.execute(f"SELECT path, fps FROM ingested_files WHERE path IN ({','.join('?' * len(chunk))})",
+                                chunk):
+            changed[row["path"]] = _unpack_fps(row["fps"])
+
+    # 先在内存中按节点聚合，再整体写入，避免逐条更新
+    nodes = {}
+    days = {}
+    for path, source, day, size, mtime, digest, fingerprints in parsed_files:
+        bit = SOURCES[source]
+        for fp in set(fp for fp, _ in fingerprints):
+            days[(fp, day)] = days.get((fp, day), 0) | bit
+        for fp, node in dict(fingerprints).items():
+            entry = nodes.get(fp)
+            if entry is None:
+                nodes[fp] = [node, day, day, 1, bit]
+                continue
+            if day >= entry[2]:
+                entry[0] = node
+            entry[1] = min(entry[1], day)
+            entry[2] = max(entry[2], day)
+            entry[3] += 1
+            entry[4] |= bit
+
+    rows = []
+    for fp, (node, first_seen, last_seen, count, sources) in nodes.items():
+        row = list(_node_row(fp, node, last_seen, count, sources))
+        row[5] = first_seen
+        rows.append(row)
+
+    with conn:
+        conn.executemany("""
+            INSERT INTO nodes (fp, type, server, port, name, first_seen, last_seen, sightings, sources, config)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (fp) DO UPDATE SET
+                name = CASE WHEN excluded.last_seen >= nodes.last_seen THEN excluded.name ELSE nodes.name END,
+                config = CASE WHEN excluded.last_seen >= nodes.last_seen THEN excluded.config ELSE nodes.config END,
+                first_seen = min(nodes.first_seen, excluded.first_seen),
+                last_seen = max(nodes.last_seen, excluded.last_seen),
+                sightings = nodes.sightings + excluded.sightings,
+                sources = nodes.sources | excluded.sources
+        """, rows)
+        conn.executemany("""
+            INSERT INTO node_days (fp, day, sources) VALUES (?, ?, ?)
+            ON CONFLICT (fp, day) DO UPDATE SET sources = node_days.sources | excluded.sources
+        """, [(fp, day, sources) for (fp, day), sources in days.items()])
+        conn.executemany("""
+            INSERT OR REPLACE INTO ingested_files (path, size, mtime, source, day, nodes, digest, fps)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(path, size, mtime, source, day, len(fingerprints), digest,
+               _pack_fps(set(fp for fp, _ in fingerprints)))
+              for path, source, day, size, mtime, digest, fingerprints in parsed_files])
+        if changed:
+            affected = set(fp for fps in changed.values() for fp in fps)
+            affected.update(fp for item in parsed_files if item[0] in changed for fp, _ in item[-1])
+            recount_nodes(conn, affected)
+    return len(nodes)
+
+
+def recount_nodes(conn, fps):
+    """
+    根据各文件记录的节点指纹重新计算指定节点的首次/最后出现日期、出现次数、来源和每日记录
+    (在调用方的事务中执行)，不再出现在任何文件中的节点会被删除
+
+    参数:
+    conn (sqlite3.Connection): 数据库连接
+    fps (set): 需要重新计算的指纹
+    """
+    totals = {}
+    days = {}
+    for row in conn.execute("SELECT source, day, fps FROM ingested_files"):
+        bit = SOURCES.get(row["source"], 0)
+        for fp in _unpack_fps(row["fps"]):
+            if fp not in fps:
+                continue
+            entry = totals.setdefault(fp, [row["day"], row["day"], 0, 0])
+            entry[0] = min(entry[0], row["day"])
+            entry[1] = max(entry[1], row["day"])
+            entry[2] += 1
+            entry[3] |= bit
+            days[(fp, row["day"])] = days.get((fp, row["day"]), 0) | bit
+
+    conn.executemany("DELETE FROM node_days WHERE fp = ?", [(fp,) for fp in fps])
+    conn.executemany("DELETE FROM nodes WHERE fp = ?", [(fp,) for fp in fps if fp not in totals])
+    conn.executemany("UPDATE nodes SET first_seen = ?, last_seen = ?, sightings = ?, sources = ? WHERE fp = ?",
+                     [(*entry, fp) for fp, entry in totals.items()])
+    conn.executemany("INSERT INTO node_days (fp, day, sources) VALUES (?, ?, ?)",
+                     [(fp, day, sources) for (fp, day), sources in days.items()])
+
+
+def find_new_files(conn, root=DOWNLOADS_DIR):
+    """
+    查找尚未记录或内容已变化的订阅文件
+
+    大小和修改时间都没变的文件直接跳过；否则计算内容摘要，摘要相同时只更新记录的修改时间，
+    这样CI检出重置修改时间后只需要读一遍文件，不需要重新解析
+
+    返回:
+    list: [(路径, 来源, 日期, 大小, 修改时间, 内容摘要), ...]
+    """
+    ingested = {row["path"]: (row["size"], row["mtime"], row["digest"])
+                for row in conn.execute("SELECT path, size, mtime, digest FROM ingested_files")}
+    new_files = []
+    touched = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            info = classify_file(path, root)
+            if not info:
+                continue
+            stat = os.stat(path)
+            known = ingested.get(path)
+            if known and known[:2] == (stat.st_size, stat.st_mtime):
+                continue
+            digest = file_digest(path)
+            if known and known[2] == digest:
+                touched.append((stat.st_size, stat.st_mtime, path))
+                continue
+            new_files.append((path, info[0], info[1], stat.st_size, stat.st_mtime, digest))
+    if touched:
+        with conn:
+            conn.executemany("UPDATE ingested_files SET size = ?, mtime = ? WHERE path = ?", touched)
+        logger.info(f"{len(touched)} 个订阅文件只有修改时间变化，内容相同，跳过解析")
+    return new_files
+
+
+def update_history(root=DOWNLOADS_DIR, db_path=DB_PATH, workers=None, rebuild=False):
+    """
+    增量更新节点历史库，只解析新增的订阅文件
+
+    参数:
+    root (str): 下载目录
+    db_path (str): 数据库路径
+    workers (int, optional): 解析进程数，默认为CPU核数
+    rebuild (bool): 是否删除已有数据库并回放整个归档
+
+    返回:
+    dict: 本次更新的统计信息
+    """
+    if rebuild and os.path.exists(db_path):
+        os.remove(db_path)
+    start = time.perf_counter()
+    conn = connect(db_path)
+    try:
+        new_files = find_new_files(conn, root)
+        if not new_files:
+            logger.info("没有新的订阅文件需要记录")
+            return {"files": 0, "nodes": 0, "seconds": 0}
+
+        logger.info(f"开始解析 {len(new_files)} 个订阅文件...")
+        file_info = {path: (source, day, size, mtime, digest) for path, source, day, size, mtime, digest in new_files}
+        paths = list(file_info)
+        if len(paths) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_parse_file, paths, chunksize=8))
+        else:
+            results = [_parse_file(path) for path in paths]
+
+        parsed_files = [(path, *file_info[path], fingerprints) for path, fingerprints in results]
+        node_count = record_nodes(conn, parsed_files)
+        seconds = round(time.perf_counter() - start, 2)
+        logger.info(f"已记录 {len(parsed_files)} 个订阅文件中的 {node_count} 个节点，耗时 {seconds} 秒")
+        return {"files": len(parsed_files), "nodes": node_count, "seconds": seconds}
+    finally:
+        conn.close()
+
+
+def long_lived_nodes(conn, limit=20, min_days=2):
+    """
+    查询存活时间最长的节点
+
+    参数:
+    conn (sqlite3.Connection): 数据库连接
+    limit (int): 返回数量
+    min_days (int): 至少出现的天数
+
+    返回:
+    list: 节点记录(sqlite3.Row)列表，包含span_days和days字段
+    """
+    return conn.execute("""
+        SELECT nodes.*, CAST(julianday(last_seen) - julianday(first_seen) AS INTEGER) + 1 AS span_days,
+               (SELECT COUNT(*) FROM node_days WHERE node_days.fp = nodes.fp) AS days
+        FROM nodes
+        WHERE days >= ?
+        ORDER BY span_days DESC, days DESC, sightings DESC
+        LIMIT ?
+    """, (min_days, limit)).fetchall()
+
+
+def history_summary(conn):
+    """
+    统计历史库概况
+
+    返回:
+    dict: 节点总数、文件数、时间范围
+    """
+    row = conn.execute("SELECT COUNT(*) AS nodes, MIN(first_seen) AS first, MAX(last_seen) AS last FROM nodes").fetchone()
+    files = conn.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0]
+    return {"nodes": row["nodes"], "files": files, "first_seen": row["first"], "last_seen": row["last"]}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="节点历史库")
+    parser.add_argument("--rebuild", action="store_true", help="删除已有数据库并并行回放整个downloads/归档")
+    parser.add_argument("--workers", type=int, help="解析进程数，默认为CPU核数")
+    parser.add_argument("--downloads", default=DOWNLOADS_DIR, help="下载目录")
+    parser.add_argument("--db", default=DB_PATH, help="数据库路径")
+    parser.add_argument("--top", type=int, default=20, help="显示存活时间最长的N个节点")
+
+    args = parser.parse_args()
+
+    update_history(args.downloads, args.db, args.workers, args.rebuild)
+
+    conn = connect(args.db)
+    summary = history_summary(conn)
+    print(f"共 {summary['nodes']} 个节点，来自 {summary['files']} 个订阅文件 ({summary['first_seen']} ~ {summary['last_seen']})")
+    print(f"存活时间最长的 {args.top} 个节点:")
+    for row in long_lived_nodes(conn, args.top):
+        sources = ",".join(source_names(row["sources"]))
+        print(f"- {row['fp']} {row['type']} {row['server']}:{row['port']} "
+              f"{row['first_seen']} ~ {row['last_seen']} ({row['span_days']}天/出现{row['days']}天, {sources}) {row['name']}")
+    conn.close()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+订阅文件节点解析
+支持Clash/Mihomo YAML、base64编码的分享链接订阅以及sing-box JSON，
+统一解析为Clash风格的节点字典，并为每个节点计算与名称无关的指纹
+"""
+
+import re
+import json
+import base64
+import hashlib
+import logging
+from urllib.parse import urlsplit, parse_qs, unquote
+
+logger = logging.getLogger("node_parser")
+
+try:
+    import yaml
+
+    class _SafeLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+        pass
+
+    # 部分订阅用 "password: !<str> 1234" 把纯数字密码标记为字符串，SafeLoader不认识这个标签，整个文件都会解析失败
+    _SafeLoader.add_constructor("str", _SafeLoader.construct_yaml_str)
+    YAML_LOADER = _SafeLoader
+except ImportError:
+    yaml = None
+
+# 订阅文件中真正需要的只有proxies段，其余是体积大得多的规则和分组
+# 段落在下一个顶层键处结束，列表项可能不缩进(顶格的 "- name: ...")，不能以任意顶格行作为结束
+PROXIES_SECTION_PATTERN = re.compile(r"^proxies:[^\n]*\n(.*?)(?=^[A-Za-z][\w-]*:|\Z)", re.MULTILINE | re.DOTALL)
+SHARE_LINK_SCHEMES = ("ss", "vmess", "vless", "trojan", "hysteria2", "hy2", "tuic")
+
+
+def parse_clash(text):
+    """
+    解析Clash/Mihomo配置中的节点
+
+    参数:
+    text (str): YAML内容
+
+    返回:
+    list: 节点字典列表
+    """
+    if yaml is None:
+        logger.warning("未安装PyYAML，无法解析Clash配置")
+        return []
+    match = PROXIES_SECTION_PATTERN.search(text)
+    if not match:
+        return []
+    try:
+        proxies = yaml.load("proxies:\n" + match.group(1), Loader=YAML_LOADER).get("proxies")
+    except yaml.YAMLError as e:
+        logger.warning(f"解析Clash配置出错: {e}")
+        return []
+    return [proxy for proxy in proxies or [] if isinstance(proxy, dict) and proxy.get("server")]
+
+
+def _b64decode(data):
+    data = data.strip().replace("-", "+").replace("_", "/")
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _query(parts):
+    return {key: values[0] for key, values in parse_qs(parts.query).items()}
+
+
+def parse_share_link(link):
+    """
+    解析单个分享链接(ss/vmess/vless/trojan/hysteria2/tuic)
+
+    参数:
+    link (str): 分享链接
+
+    返回:
+    dict: 节点字典，无法解析时返回None
+    """
+    scheme, _, rest = link.strip().partition("://")
+    scheme = scheme.lower()
+    if scheme not in SHARE_LINK_SCHEMES or not rest:
+        return None
+    try:
+        if scheme == "vmess":
+            config = json.loads(_b64decode(rest).decode("utf-8", errors="ignore"))
+            node = {
+                "name": config.get("ps", ""),
+                "type": "vmess",
+                "server": config.get("add", ""),
+                "port": int(config.get("port") or 0),
+                "uuid": config.get("id", ""),
+                "alterId": int(config.get("aid") or 0),
+                "cipher": config.get("scy") or "auto",
+                "network": config.get("net") or "tcp",
+                "tls": config.get("tls") == "tls",
+                "servername": config.get("sni") or config.get("host", "")
+            }
+            if config.get("fp"):
+                node["client-fingerprint"] = config["fp"]
+            if node["network"] == "ws":
+                node["ws-opts"] = {"path": config.get("path") or "/", "headers": {"Host": config.get("host", "")}}
+            return node
+
+        parts = urlsplit(f"{scheme}://{rest}")
+        name = unquote(parts.fragment)
+        query = _query(parts)
+
+        if scheme == "ss":
+            if parts.hostname and parts.username:
+                # SIP002: ss://base64(method:password)@host:port
+                userinfo = unquote(parts.username)
+                if parts.password is None:
+                    userinfo = _b64decode(userinfo).decode("utf-8", errors="ignore")
+                else:
+                    userinfo = f"{userinfo}:{unquote(parts.password)}"
+                host, port = parts.hostname, parts.port
+            else:
+                # 旧格式: ss://base64(method:password@host:port)
+                decoded = _b64decode(rest.split("#", 1)[0]).decode("utf-8", errors="ignore")
+                userinfo, _, address = decoded.rpartition("@")
+                host, _, port = address.rpartition(":")
+            cipher, _, password = userinfo.partition(":")
+            return {"name": name, "type": "ss", "server": host, "port": int(port or 0),
+                    "cipher": cipher, "password": password}
+
+        node = {
+            "name": name,
+            "type": "hysteria2" if scheme == "hy2" else scheme,
+            "server": parts.hostname or "",
+            "port": parts.port or 0,
+            "network": query.get("type", "tcp")
+        }
+        # Clash中vless使用servername，trojan/hysteria2/tuic使用sni
+        sni = query.get("sni") or query.get("peer") or query.get("host", "")
+        node["servername" if scheme == "vless" else "sni"] = sni
+        if query.get("fp"):
+            node["client-fingerprint"] = query["fp"]
+        if query.get("allowInsecure") in ("1", "true") or query.get("insecure") in ("1", "true"):
+            node["skip-cert-verify"] = True
+        secret = unquote(parts.username or "")
+        if scheme in ("vless", "tuic"):
+            node["uuid"] = secret
+            if scheme == "tuic" and parts.password:
+                node["password"] = unquote(parts.password)
+            if query.get("flow"):
+                node["flow"] = query["flow"]
+        else:
+            node["password"] = secret
+        if scheme == "vless":
+            node["tls"] = query.get("security") in ("tls", "reality")
+            if query.get("security") == "reality":
+                node["reality-opts"] = {"public-key": query.get("pbk", ""), "short-id": query.get("sid", "")}
+        if node["type"] == "hysteria2" and query.get("obfs"):
+            node["obfs"] = query["obfs"]
+            node["obfs-password"] = query.get("obfs-password", "")
+        if node["network"] == "ws":
+            node["ws-opts"] = {"path": query.get("path") or "/", "headers": {"Host": query.get("host", "")}}
+        elif node["network"] == "grpc":
+            node["grpc-opts"] = {"grpc-service-name": query.get("serviceName", "")}
+        return node
+    except (ValueError, UnicodeError, json.JSONDecodeError):
+        return None
+
+
+def parse_share_links(text):
+    """
+    解析分享链接订阅，支持整体base64编码或每行一个明文链接
+
+    参数:
+    text (str): 订阅内容
+
+    返回:
+    list: 节点字典列表
+    """
+    text = text.strip()
+    if text and "://" not in text[:64]:
+        try:
+            text = _b64decode(text).decode("utf-8", errors="ignore")
+        except ValueError:
+            return []
+    nodes = []
+    for line in text.splitlines():
+        node = parse_share_link(line)
+        if node and node["server"]:
+            nodes.append(node)
+    return nodes
+
+
+def parse_singbox(text):
+    """
+    解析sing-box配置中的出站节点
+
+    参数:
+    text (str): JSON内容
+
+    返回:
+    list: 节点字典列表
+    """
+    try:
+        config = json.loads(text)
+    except json.JSONDecodeError:
+        return []
+    nodes = []
+    for outbound in config.get("outbounds", []):
+        if not isinstance(outbound, dict) or not outbound.get("server"):
+            continue
+        node = {
+            "name": outbound.get("tag", ""),
+            "type": "ss" if outbound.get("type") == "shadowsocks" else outbound.get("type", ""),
+            "server": outbound["server"],
+            "port": outbound.get("server_port", 0),
+            "network": (outbound.get("transport") or {}).get("type", "tcp")
+        }
+        for key in ("uuid", "password"):
+            if outbound.get(key):
+                node[key] = outbound[key]
+        if outbound.get("method"):
+            node["cipher"] = outbound["method"]
+        tls = outbound.get("tls") or {}
+        if tls.get("enabled"):
+            node["tls"] = True
+            node["servername"] = tls.get("server_name", "")
+        transport = outbound.get("transport") or {}
+        if node["network"] == "ws":
+            node["ws-opts"] = {"path": transport.get("path") or "/", "headers": transport.get("headers") or {}}
+        nodes.append(node)
+    return nodes
+
+
+def parse_subscription(text, filename=""):
+    """
+    根据文件名和内容自动选择解析方式
+
+    参数:
+    text (str): 订阅文件内容
+    filename (str): 文件名，用于判断格式
+
+    返回:
+    list: 节点字典列表
+    """
+    if filename.endswith(".json"):
+        return parse_singbox(text)
+    if filename.endswith((".yaml", ".yml")) or PROXIES_SECTION_PATTERN.search(text[:200000]):
+        return parse_clash(text)
+    return parse_share_links(text)
+
+
+def node_fingerprint(node):
+    """
+    计算节点指纹
+
+    同一个节点在不同来源中名称各不相同，格式也可能不同(YAML或分享链接)，
+    因此只使用协议、服务器、端口和凭据计算
+
+    参数:
+    node (dict): 节点字典
+
+    返回:
+    str: 16位十六进制指纹
+    """
+    secret = node.get("uuid") or node.get("password") or ""
+    if node.get("type") == "ss":
+        secret = f"{node.get('cipher', '')}:{secret}"
+    key = "|".join([
+        str(node.get("type", "")).lower(),
+        str(node.get("server", "")).strip().lower(),
+        str(node.get("port", "")),
+        str(secret)
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="解析订阅文件中的节点")
+    parser.add_argument("files", nargs="+", help="订阅文件路径")
+
+    args = parser.parse_args()
+
+    for path in args.files:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            nodes = parse_subscription(f.read(), path)
+        print(f"{path}: {len(nodes)} 个节点")
+        for node in nodes:
+            print(f"  {node_fingerprint(node)}  {node.get('type')}  {node.get('server')}:{node.get('port')}  {node.get('name')}")
@@ -0,0 +1,747 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+节点连通性探测
+从节点历史库取出近期出现过的节点，去重后用asyncio分阶段探测:
+TCP连接 -> TLS握手(使用节点的sni/servername) -> 协议握手(ws升级、trojan请求)。
+基于QUIC的节点(hysteria/hysteria2/tuic)改用UDP发送QUIC Initial，以收到版本协商作为存活依据。
+每个阶段有独立的并发上限，只有通过前一阶段的节点才会进入代价更高的下一阶段；
+各阶段复用同一个连接(TLS在TCP连接上握手，协议握手走TLS连接)，每个节点只握手一次。
+TCP阶段同时进行的连接数受文件描述符上限约束，每个目标单独超时。
+结果写入节点历史库的probe_status(最新状态)和probe_log(探测记录)表，供订阅排序使用。
+probe_status同时作为按指纹的探测缓存: 有效期内探测过的节点不再重复探测，
+无论它出现在多少个订阅中；每次运行的缓存命中情况记录在probe_runs表
+"""
+
+import os
+import ssl
+import json
+import time
+import base64
+import socket
+import asyncio
+import hashlib
+import logging
+import subprocess
+from datetime import datetime, timedelta
+from collections import namedtuple
+from urllib.parse import quote
+import node_history
+import node_reliability
+import udp_prober
+
+logger = logging.getLogger("node_prober")
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_TIMEOUT = 3.0
+# 为日志、数据库等其他文件保留的描述符数量
+RESERVED_FDS = 64
+MAX_CONCURRENCY = 2048
+# 探测缓存有效期(秒): 可用节点的结果保留3小时，不可用节点保留12小时
+CACHE_TTL = 3 * 3600
+NEGATIVE_CACHE_TTL = 12 * 3600
+PROBED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 基于QUIC的协议改用UDP探测，wireguard没有可以无密钥触发的回复，不探测
+QUIC_PROTOCOLS = ("hysteria", "hysteria2", "tuic")
+UDP_PROTOCOLS = QUIC_PROTOCOLS + ("wireguard",)
+# trojan握手通过节点请求的目标，返回204即表示节点可以正常转发
+TROJAN_PROBE_HOST = "www.gstatic.com"
+TROJAN_PROBE_PORT = 80
+TROJAN_PROBE_PATH = "/generate_204"
+
+ProbeResult = namedtuple("ProbeResult", ["host", "port", "ok", "latency_ms", "error"])
+# tls: 是否需要TLS握手; greeting: 协议握手类型("ws"、"trojan"、"quic"或空字符串)
+Target = namedtuple("Target", ["host", "port", "tls", "sni", "greeting", "path", "ws_host", "password"])
+# stage: 最后通过的阶段("tcp"、"tls"、"ws"、"trojan"、"quic"，第一个阶段失败时为空字符串)
+FunnelResult = namedtuple("FunnelResult", ["target", "ok", "stage", "latency_ms", "tls_ms", "greeting_ms", "error"])
+# 各阶段的并发信号量
+Pools = namedtuple("Pools", ["tcp", "tls", "greeting"])
+
+PROBE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probe_status (
+    fp TEXT PRIMARY KEY,
+    probed_at TEXT,
+    ok INTEGER,
+    latency_ms REAL,
+    error TEXT,
+    fail_streak INTEGER DEFAULT 0,
+    stage TEXT,
+    tls_ms REAL,
+    greeting_ms REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS probe_log (
+    fp TEXT,
+    probed_at TEXT,
+    ok INTEGER,
+    latency_ms REAL,
+    stage TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_probe_log_fp ON probe_log (fp, probed_at);
+CREATE TABLE IF NOT EXISTS probe_runs (
+    started_at TEXT,
+    targets INTEGER,
+    probed INTEGER,
+    cache_hits INTEGER,
+    skipped INTEGER DEFAULT 0,
+    alive INTEGER,
+    seconds REAL
+);
+"""
+# 旧版本创建的表缺少的列
+PROBE_COLUMNS = {
+    "probe_status": ("stage TEXT", "tls_ms REAL", "greeting_ms REAL"),
+    "probe_log": ("stage TEXT",),
+    "probe_runs": ("skipped INTEGER DEFAULT 0",)
+}
+
+# 免费节点大多使用自签名证书，只验证握手能否完成
+TLS_CONTEXT = ssl.create_default_context()
+TLS_CONTEXT.check_hostname = False
+TLS_CONTEXT.verify_mode = ssl.CERT_NONE
+
+
+def default_concurrency():
+    """
+    根据进程的文件描述符上限计算同时进行的连接数上限
+    """
+    if resource is None:
+        return 256
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return MAX_CONCURRENCY
+    return max(16, min(MAX_CONCURRENCY, int((soft - RESERVED_FDS) * 0.8)))
+
+
+def make_pools(concurrency=None):
+    """
+    创建各阶段的并发信号量，TLS和协议握手代价更高，并发上限相应降低
+    """
+    concurrency = concurrency or default_concurrency()
+    return Pools(
+        asyncio.Semaphore(concurrency),
+        asyncio.Semaphore(max(8, concurrency // 4)),
+        asyncio.Semaphore(max(4, concurrency // 8))
+    )
+
+
+def ensure_probe_schema(conn):
+    """
+    创建探测结果表和可靠性评分表，并为旧版本创建的表补充缺少的列
+    """
+    conn.executescript(PROBE_SCHEMA)
+    node_reliability.ensure_schema(conn)
+    for table, columns in PROBE_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            if column.split()[0] not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+
+def target_from_node(node):
+    """
+    根据节点配置确定需要探测的阶段
+
+    参数:
+    node (dict): Clash风格的节点字典
+
+    返回:
+    Target: 探测目标，无法探测的UDP协议或配置不完整时返回None
+    """
+    node_type = str(node.get("type", "")).lower()
+    if node_type in UDP_PROTOCOLS and node_type not in QUIC_PROTOCOLS:
+        return None
+    server = str(node.get("server", "")).strip()
+    try:
+        port = int(node.get("port") or 0)
+    except (TypeError, ValueError):
+        return None
+    if not server or not port:
+        return None
+    if node_type in QUIC_PROTOCOLS:
+        return Target(server, port, False, "", "quic", "", "", "")
+
+    tls = bool(node.get("tls")) or node_type == "trojan"
+    sni = str(node.get("servername") or node.get("sni") or "") if tls else ""
+    network = node.get("network") or "tcp"
+    greeting = path = ws_host = password = ""
+    if network == "ws":
+        ws_opts = node.get("ws-opts") or {}
+        greeting = "ws"
+        path = str(ws_opts.get("path") or "/")
+        ws_host = str((ws_opts.get("headers") or {}).get("Host") or "")
+    elif node_type == "trojan" and network == "tcp" and node.get("password"):
+        greeting = "trojan"
+        password = str(node["password"])
+    return Target(server, port, tls, sni, greeting, path, ws_host, password)
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (OSError, ssl.SSLError):
+        pass
+
+
+async def _connect(host, port):
+    """
+    建立TCP连接，依次尝试解析出的地址，返回已连接的非阻塞套接字
+    """
+    loop = asyncio.get_running_loop()
+    error = None
+    for family, type_, proto, _, address in await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+        sock = socket.socket(family, type_, proto)
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, address)
+        except OSError as e:
+            sock.close()
+            error = e
+            continue
+        except BaseException:
+            # 超时取消时同样关闭套接字
+            sock.close()
+            raise
+        return sock
+    raise error
+
+
+async def _open(sock, target, timeout):
+    """
+    在已建立的TCP连接上创建读写流，TLS节点先完成TLS握手，失败时关闭连接
+    """
+    kwargs = {}
+    if target.tls:
+        kwargs = {"ssl": TLS_CONTEXT, "server_hostname": target.sni or target.host, "ssl_handshake_timeout": timeout}
+    try:
+        return await asyncio.wait_for(asyncio.open_connection(sock=sock, **kwargs), timeout)
+    except BaseException:
+        sock.close()
+        raise
+
+
+def _error_text(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, ssl.SSLError):
+        return error.reason or type(error).__name__
+    return getattr(error, "strerror", None) or str(error) or type(error).__name__
+
+
+async def probe_tcp(host, port, timeout=DEFAULT_TIMEOUT):
+    """
+    探测单个目标的TCP连接延迟
+
+    返回:
+    tuple: (ProbeResult 探测结果(失败时latency_ms为None), 已连接的套接字(失败时为None，由调用方关闭或继续使用))
+    """
+    start = time.perf_counter()
+    try:
+        sock = await asyncio.wait_for(_connect(host, port), timeout)
+    except (asyncio.TimeoutError, OSError, UnicodeError, ValueError) as e:
+        return ProbeResult(host, port, False, None, _error_text(e)), None
+    latency = (time.perf_counter() - start) * 1000
+    return ProbeResult(host, port, True, round(latency, 1), ""), sock
+
+
+async def probe_tls(sock, target, timeout=DEFAULT_TIMEOUT):
+    """
+    在已建立的TCP连接上使用节点的sni完成TLS握手
+
+    返回:
+    tuple: (是否成功, 握手耗时毫秒, 错误信息, 成功时为TLS连接的(reader, writer)，失败时为None且连接已关闭)
+    """
+    start = time.perf_counter()
+    try:
+        streams = await _open(sock, target, timeout)
+    except (asyncio.TimeoutError, OSError, ssl.SSLError, UnicodeError, ValueError) as e:
+        return False, None, _error_text(e), None
+    latency = (time.perf_counter() - start) * 1000
+    return True, round(latency, 1), "", streams
+
+
+def _greeting_request(target):
+    """
+    构造协议握手请求，返回 (请求字节, 判断响应首行是否成功的函数)
+    """
+    if target.greeting == "ws":
+        host = target.ws_host or target.sni or target.host
+        path = target.path if target.path.startswith("/") else "/" + target.path
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (f"GET {quote(path, safe='/?=&%@:+,;~')} HTTP/1.1\r\nHost: {host}\r\n"
+                   f"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                   f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        return request.encode("utf-8"), lambda line: line.split(b" ")[1:2] == [b"101"]
+
+    # trojan: 密码的SHA224十六进制 + CRLF + CONNECT命令和目标地址 + CRLF + 载荷
+    password_hash = hashlib.sha224(target.password.encode("utf-8")).hexdigest().encode()
+    address = TROJAN_PROBE_HOST.encode()
+    payload = f"GET {TROJAN_PROBE_PATH} HTTP/1.1\r\nHost: {TROJAN_PROBE_HOST}\r\nConnection: close\r\n\r\n".encode()
+    request = (password_hash + b"\r\n" + b"\x01\x03" + bytes([len(address)]) + address
+               + TROJAN_PROBE_PORT.to_bytes(2, "big") + b"\r\n" + payload)
+    return request, lambda line: line.split(b" ")[1:2] == [b"204"]
+
+
+async def probe_greeting(streams, target, timeout=DEFAULT_TIMEOUT):
+    """
+    在已建立的连接(TLS节点为TLS连接)上发送协议握手请求并检查响应首行，不关闭连接
+
+    ws节点要求返回101升级响应；trojan节点要求通过节点请求探测地址并返回204，
+    密码错误时服务器通常会回落到普通网站，返回其他状态码
+
+    返回:
+    tuple: (是否成功, 从发送请求到收到响应首行的耗时毫秒, 错误信息)
+    """
+    reader, writer = streams
+    request, accept = _greeting_request(target)
+    try:
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        latency = (time.perf_counter() - start) * 1000
+    except (asyncio.TimeoutError, OSError, ssl.SSLError) as e:
+        return False, None, _error_text(e)
+    if not accept(line):
+        return False, None, line.strip().decode("utf-8", errors="replace")[:60] or "empty response"
+    return True, round(latency, 1), ""
+
+
+async def probe_funnel(target, pools, timeout=DEFAULT_TIMEOUT):
+    """
+    按 TCP -> TLS -> 协议握手 的顺序探测单个目标，任一阶段失败即停止。
+    QUIC目标只有一个UDP阶段，与TCP连接共用并发上限
+
+    返回:
+    FunnelResult: 探测结果
+    """
+    if target.greeting == "quic":
+        async with pools.tcp:
+            ok, latency, info = await udp_prober.probe_quic(target.host, target.port, timeout)
+        return FunnelResult(target, ok, "quic" if ok else "", latency, None, None, "" if ok else f"quic: {info}")
+
+    # 所有阶段共用一个连接: TLS在TCP连接上握手，协议握手复用TLS连接，每个目标只建立一次连接、握手一次。
+    # 连接在整个探测期间占用TCP阶段的名额，因此TCP并发上限就是同时打开的连接数上限
+    async with pools.tcp:
+        tcp, sock = await probe_tcp(target.host, target.port, timeout)
+        if not tcp.ok:
+            return FunnelResult(target, False, "", None, None, None, tcp.error)
+
+        stage = "tcp"
+        tls_ms = None
+        streams = None
+        try:
+            if target.tls:
+                async with pools.tls:
+                    ok, tls_ms, error, streams = await probe_tls(sock, target, timeout)
+                if not ok:
+                    return FunnelResult(target, False, stage, tcp.latency_ms, None, None, f"tls: {error}")
+                stage = "tls"
+
+            greeting_ms = None
+            if target.greeting:
+                async with pools.greeting:
+                    try:
+                        streams = streams or await _open(sock, target, timeout)
+                    except (asyncio.TimeoutError, OSError, ValueError) as e:
+                        ok, error = False, _error_text(e)
+                    else:
+                        ok, greeting_ms, error = await probe_greeting(streams, target, timeout)
+                if not ok:
+                    return FunnelResult(target, False, stage, tcp.latency_ms, tls_ms, None, f"{target.greeting}: {error}")
+                stage = target.greeting
+        finally:
+            if streams:
+                await _close(streams[1])
+            else:
+                sock.close()
+
+    return FunnelResult(target, True, stage, tcp.latency_ms, tls_ms, greeting_ms, "")
+
+
+async def run_funnel(targets, concurrency=None, timeout=DEFAULT_TIMEOUT):
+    """
+    并发探测多个目标
+
+    参数:
+    targets (list): Target列表
+    concurrency (int, optional): TCP阶段同时进行的连接数上限，默认根据文件描述符上限计算
+    timeout (float): 每个阶段的超时时间(秒)
+
+    返回:
+    list: 与targets顺序一致的FunnelResult列表
+    """
+    pools = make_pools(concurrency)
+    return await asyncio.gather(*(probe_funnel(target, pools, timeout) for target in targets))
+
+
+def funnel_summary(results):
+    """
+    统计各阶段进入和通过的目标数
+
+    返回:
+    dict: {阶段: [进入数, 通过数]}
+    """
+    summary = {"tcp": [0, 0], "tls": [0, 0], "greeting": [0, 0], "quic": [0, 0]}
+    for result in results:
+        target = result.target
+        if target.greeting == "quic":
+            summary["quic"][0] += 1
+            summary["quic"][1] += result.ok
+            continue
+        summary["tcp"][0] += 1
+        if not result.stage:
+            continue
+        summary["tcp"][1] += 1
+        if target.tls:
+            summary["tls"][0] += 1
+            summary["tls"][1] += result.stage != "tcp"
+        if target.greeting and (result.stage != "tcp" or not target.tls):
+            summary["greeting"][0] += 1
+            summary["greeting"][1] += result.ok
+    return summary
+
+
+def load_targets(conn, max_age_days=3, limit=None):
+    """
+    读取近期出现过的节点并按探测目标去重
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    max_age_days (int): 只探测最近多少天内出现过的节点(相对于库中最新日期)
+    limit (int, optional): 最多探测的目标数
+
+    返回:
+    dict: {Target: [指纹, ...]}
+    """
+    latest = conn.execute("SELECT MAX(last_seen) FROM nodes").fetchone()[0]
+    if not latest:
+        return {}
+    since = (datetime.strptime(latest, "%Y-%m-%d") - timedelta(days=max_age_days - 1)).strftime("%Y-%m-%d")
+    targets = {}
+    for fp, config in conn.execute(
+            "SELECT fp, config FROM nodes WHERE last_seen >= ? ORDER BY last_seen DESC", (since,)):
+        target = target_from_node(json.loads(config or "{}"))
+        if target is None or (target not in targets and limit and len(targets) >= limit):
+            continue
+        targets.setdefault(target, []).append(fp)
+    return targets
+
+
+def split_cached(conn, targets, ttl=CACHE_TTL, negative_ttl=NEGATIVE_CACHE_TTL, now=None):
+    """
+    按探测缓存拆分目标
+
+    目标的全部指纹都在有效期内探测过时命中缓存；只要有一个指纹过期或从未探测，
+    整个目标都需要重新探测
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    targets (dict): load_targets的返回值
+    ttl (int): 可用节点结果的有效期(秒)
+    negative_ttl (int): 不可用节点结果的有效期(秒)
+    now (datetime, optional): 当前时间
+
+    返回:
+    tuple: (需要探测的目标dict, 命中缓存的目标dict)
+    """
+    ensure_probe_schema(conn)
+    now = now or datetime.now()
+    fresh_ok = (now - timedelta(seconds=ttl)).strftime(PROBED_AT_FORMAT)
+    fresh_failed = (now - timedelta(seconds=negative_ttl)).strftime(PROBED_AT_FORMAT)
+    fresh = {row[0] for row in conn.execute(
+        "SELECT fp FROM probe_status WHERE probed_at >= CASE WHEN ok THEN ? ELSE ? END", (fresh_ok, fresh_failed))}
+    pending, cached = {}, {}
+    for target, fps in targets.items():
+        (cached if all(fp in fresh for fp in fps) else pending)[target] = fps
+    return pending, cached
+
+
+def cache_stats(conn, runs=None):
+    """
+    统计探测缓存的命中率
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    runs (int, optional): 只统计最近N次运行
+
+    返回:
+    dict: 运行次数、目标总数、实际探测数、命中数、调度跳过数和命中率(不计调度跳过的目标)
+    """
+    ensure_probe_schema(conn)
+    row = conn.execute(f"""
+        SELECT COUNT(*), SUM(targets), SUM(probed), SUM(cache_hits), SUM(skipped) FROM (
+            SELECT * FROM probe_runs ORDER BY started_at DESC {"LIMIT ?" if runs else ""}
+        )
+    """, (runs,) if runs else ()).fetchone()
+    count, targets, probed, hits, skipped = row[0], row[1] or 0, row[2] or 0, row[3] or 0, row[4] or 0
+    considered = targets - skipped
+    return {"runs": count, "targets": targets, "probed": probed, "cache_hits": hits, "skipped": skipped,
+            "hit_ratio": round(hits / considered, 3) if considered else 0}
+
+
+def save_probe_results(conn, targets, results):
+    """
+    保存探测结果
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    targets (dict): load_targets的返回值
+    results (list): FunnelResult列表
+    """
+    ensure_probe_schema(conn)
+    probed_at = datetime.now().strftime(PROBED_AT_FORMAT)
+    rows = []
+    for result in results:
+        for fp in targets[result.target]:
+            rows.append((fp, probed_at, int(result.ok), result.latency_ms, result.error,
+                         result.stage, result.tls_ms, result.greeting_ms))
+    with conn:
+        conn.executemany("""
+            INSERT INTO probe_status (fp, probed_at, ok, latency_ms, error, stage, tls_ms, greeting_ms, fail_streak)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CASE WHEN ? THEN 0 ELSE 1 END)
+            ON CONFLICT (fp) DO UPDATE SET
+                probed_at = excluded.probed_at,
+                ok = excluded.ok,
+                latency_ms = excluded.latency_ms,
+                error = excluded.error,
+                stage = excluded.stage,
+                tls_ms = excluded.tls_ms,
+                greeting_ms = excluded.greeting_ms,
+                fail_streak = CASE WHEN excluded.ok THEN 0 ELSE probe_status.fail_streak + 1 END
+        """, [row + (row[2],) for row in rows])
+        conn.executemany("INSERT INTO probe_log (fp, probed_at, ok, latency_ms, stage) VALUES (?, ?, ?, ?, ?)",
+                         [row[:4] + (row[5],) for row in rows])
+        # 追加到各节点的环形缓冲区，更新可用率和延迟分位数
+        node_reliability.record_results(conn, [row[:4] for row in rows])
+
+
+def ranked_nodes(conn, limit=50):
+    """
+    按探测结果排序的可用节点，以通过的最深阶段的耗时排序，越低越靠前
+
+    返回:
+    list: 节点记录(sqlite3.Row)列表，包含latency_ms、tls_ms、greeting_ms和stage字段
+    """
+    ensure_probe_schema(conn)
+    return conn.execute("""
+        SELECT nodes.*, probe_status.latency_ms, probe_status.tls_ms, probe_status.greeting_ms,
+               probe_status.stage, probe_status.probed_at
+        FROM nodes JOIN probe_status ON probe_status.fp = nodes.fp
+        WHERE probe_status.ok = 1
+        ORDER BY COALESCE(probe_status.greeting_ms, probe_status.tls_ms, probe_status.latency_ms)
+        LIMIT ?
+    """, (limit,)).fetchall()
+
+
+def probe_history(db_path=node_history.DB_PATH, max_age_days=3, limit=None, concurrency=None, timeout=DEFAULT_TIMEOUT,
+                  ttl=CACHE_TTL, negative_ttl=NEGATIVE_CACHE_TTL):
+    """
+    探测节点历史库中近期出现过的节点并保存结果，有效期内探测过的节点直接使用缓存
+
+    参数:
+    ttl (int): 可用节点结果的有效期(秒)，为0时不使用缓存
+    negative_ttl (int): 不可用节点结果的有效期(秒)，为0时不使用缓存
+
+    返回:
+    dict: 探测统计
+    """
+    conn = node_history.connect(db_path)
+    try:
+        targets = load_targets(conn, max_age_days, limit)
+        if not targets:
+            logger.info("节点历史库中没有需要探测的节点")
+            return {"targets": 0, "probed": 0, "cache_hits": 0, "alive": 0, "seconds": 0}
+        started_at = datetime.now()
+        pending, cached = split_cached(conn, targets, ttl, negative_ttl, started_at)
+        logger.info(f"探测缓存命中 {len(cached)}/{len(targets)} 个目标"
+                    f"({sum(len(fps) for fps in cached.values())} 个节点)")
+
+        concurrency = concurrency or default_concurrency()
+        results = []
+        seconds = 0
+        if pending:
+            logger.info(f"开始探测 {len(pending)} 个目标，并发上限 {concurrency}，超时 {timeout} 秒")
+            start = time.perf_counter()
+            results = asyncio.run(run_funnel(list(pending), concurrency, timeout))
+            seconds = round(time.perf_counter() - start, 2)
+            save_probe_results(conn, pending, results)
+        alive = sum(1 for result in results if result.ok)
+        with conn:
+            conn.execute("INSERT INTO probe_runs (started_at, targets, probed, cache_hits, alive, seconds) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (started_at.strftime(PROBED_AT_FORMAT), len(targets), len(pending), len(cached), alive, seconds))
+        summary = funnel_summary(results)
+        if results:
+            logger.info(f"探测完成: {alive}/{len(results)} 个目标通过，耗时 {seconds} 秒，"
+                        + "，".join(f"{stage} {passed}/{entered}" for stage, (entered, passed) in summary.items()))
+        return {"targets": len(targets), "probed": len(pending), "cache_hits": len(cached),
+                "alive": alive, "seconds": seconds, "funnel": summary}
+    finally:
+        conn.close()
+
+
+def _make_certificate(directory):
+    """
+    使用openssl命令行生成自签名证书，openssl不可用时返回None
+    """
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", keyfile,
+                        "-out", certfile, "-days", "1", "-subj", "/CN=localhost"],
+                       check=True, capture_output=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+UDP_TARGETS_PER_STANDIN = 20
+
+
+async def _run_local_fleet(count, concurrency, timeout):
+    """
+    启动本地替身服务器并探测，验证每个目标通过的阶段与预期一致
+
+    替身包括: 普通TCP、TLS、ws升级(正确/错误路径)、trojan(正确/错误密码)、
+    期望TLS但只有普通TCP的端口，已关闭的端口，以及QUIC(回复版本协商/不回复/回复其他数据/已关闭的UDP端口)
+    """
+    password = "local-fleet"
+    password_hash = hashlib.sha224(password.encode()).hexdigest().encode()
+
+    async def plain(reader, writer):
+        writer.close()
+
+    async def websocket(reader, writer):
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        status = b"101 Switching Protocols" if request_line.split(b" ")[1:2] == [b"/ws"] else b"404 Not Found"
+        writer.write(b"HTTP/1.1 " + status + b"\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def trojan(reader, writer):
+        try:
+            received = await reader.readexactly(56)
+            await reader.readline()
+        except asyncio.IncompleteReadError:
+            # 只建立连接、不发送数据的客户端(TLS节点没有协议握手时)
+            writer.close()
+            return
+        # 密码错误时像真实服务器一样回落为普通网站
+        writer.write(b"HTTP/1.1 204 No Content\r\n\r\n" if received == password_hash else b"HTTP/1.1 400 Bad Request\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    import tempfile
+    servers = []
+    cases = []
+
+    async def serve(handler, tls_context=None):
+        server = await asyncio.start_server(handler, "127.0.0.1", 0, ssl=tls_context)
+        servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    def add(port, expected_ok, expected_stage, tls=False, greeting="", path="", secret=""):
+        target = Target("127.0.0.1", port, tls, "localhost" if tls else "", greeting, path, "", secret)
+        cases.extend([(target, expected_ok, expected_stage)] * count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        tls_context = _make_certificate(directory)
+
+    add(await serve(plain), True, "tcp")
+    add(await serve(websocket), True, "ws", greeting="ws", path="/ws")
+    add(await serve(websocket), False, "tcp", greeting="ws", path="/wrong")
+    add(await serve(plain), False, "tcp", tls=True)
+    for _ in range(count):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            cases.append((Target("127.0.0.1", sock.getsockname()[1], False, "", "", "", "", ""), False, ""))
+    if tls_context:
+        add(await serve(plain, tls_context), True, "tls", tls=True)
+        add(await serve(websocket, tls_context), True, "ws", tls=True, greeting="ws", path="/ws")
+        add(await serve(trojan, tls_context), True, "trojan", tls=True, greeting="trojan", secret=password)
+        add(await serve(trojan, tls_context), False, "tls", tls=True, greeting="trojan", secret="wrong")
+    else:
+        logger.warning("未找到openssl命令，跳过TLS相关的替身服务器")
+
+    # 同时到达的1200字节数据报很快会占满单个套接字的接收缓冲区，每个UDP替身只承担少量目标
+    datagram_servers = []
+    for factory, expected_ok in ((udp_prober.VersionNegotiationServer, True), (udp_prober.SilentServer, False),
+                                 (udp_prober.EchoServer, False), (None, False)):
+        for i in range(count):
+            if i % UDP_TARGETS_PER_STANDIN == 0:
+                if factory is None:
+                    port = udp_prober.closed_udp_port()
+                else:
+                    transport, port = await udp_prober.serve(factory)
+                    datagram_servers.append(transport)
+            target = Target("127.0.0.1", port, False, "", "quic", "", "", "")
+            cases.append((target, expected_ok, "quic" if expected_ok else ""))
+
+    start = time.perf_counter()
+    results = await run_funnel([case[0] for case in cases], concurrency, timeout)
+    seconds = time.perf_counter() - start
+    for server in servers:
+        server.close()
+        await server.wait_closed()
+    for transport in datagram_servers:
+        transport.close()
+
+    mismatches = [(result, expected_ok, expected_stage)
+                  for result, (_, expected_ok, expected_stage) in zip(results, cases)
+                  if result.ok != expected_ok or result.stage != expected_stage]
+    return results, mismatches, seconds
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="节点连通性探测")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--days", type=int, default=3, help="只探测最近多少天内出现过的节点")
+    parser.add_argument("--limit", type=int, help="最多探测的目标数")
+    parser.add_argument("--concurrency", type=int, help="TCP阶段同时进行的连接数上限，默认根据文件描述符上限计算")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="每个阶段的超时时间(秒)")
+    parser.add_argument("--top", type=int, default=10, help="显示延迟最低的N个节点")
+    parser.add_argument("--ttl", type=int, default=CACHE_TTL, help="可用节点探测结果的缓存有效期(秒)")
+    parser.add_argument("--negative-ttl", type=int, default=NEGATIVE_CACHE_TTL, help="不可用节点探测结果的缓存有效期(秒)")
+    parser.add_argument("--no-cache", action="store_true", help="忽略探测缓存，重新探测全部目标")
+    parser.add_argument("--local-fleet", type=int, metavar="N", help="自检模式: 每种本地替身服务器各探测N次")
+
+    args = parser.parse_args()
+
+    if args.local_fleet:
+        results, mismatches, seconds = asyncio.run(
+            _run_local_fleet(args.local_fleet, args.concurrency or default_concurrency(), args.timeout))
+        summary = funnel_summary(results)
+        print(f"探测 {len(results)} 个本地目标，耗时 {seconds:.2f} 秒 ({len(results) / seconds:.0f} 个/秒)")
+        for stage, (entered, passed) in summary.items():
+            print(f"- {stage}: 进入 {entered}，通过 {passed}")
+        if mismatches:
+            result, expected_ok, expected_stage = mismatches[0]
+            print(f"自检失败: {len(mismatches)} 个结果与预期不符，例如 {result}，预期 ok={expected_ok} stage={expected_stage}")
+            raise SystemExit(1)
+        print("自检通过")
+    else:
+        ttl, negative_ttl = (0, 0) if args.no_cache else (args.ttl, args.negative_ttl)
+        probe_history(args.db, args.days, args.limit, args.concurrency, args.timeout, ttl, negative_ttl)
+        conn = node_history.connect(args.db)
+        stats = cache_stats(conn)
+        print(f"最近 {stats['runs']} 次运行共 {stats['targets']} 个目标，实际探测 {stats['probed']} 个，"
+              f"缓存命中率 {stats['hit_ratio']:.1%}")
+        for row in ranked_nodes(conn, args.top):
+            print(f"- {row['stage']} TCP {row['latency_ms']} 毫秒 TLS {row['tls_ms']} 毫秒 握手 {row['greeting_ms']} 毫秒  "
+                  f"{row['type']} {row['server']}:{row['port']}  {row['name']}")
+        conn.close()
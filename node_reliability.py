@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+节点可靠性评分
+每个节点在node_reliability表中保存一个固定长度的环形缓冲区(探测时间和延迟两个紧凑数组，
+以BLOB存储)，每次探测后追加结果并重新计算滚动窗口内的可用率和延迟分位数。
+评分直接保存为列，"最近3天可用率95%以上"这样的筛选只需一次索引查询，不需要扫描probe_log
+"""
+
+import sys
+import math
+import time
+import logging
+from array import array
+from datetime import datetime, timedelta
+import node_history
+
+logger = logging.getLogger("node_reliability")
+
+# 每个节点保留的探测结果数(按30分钟一轮约3天)
+RING_SIZE = 144
+WINDOW_HOURS = 72
+# 样本数少于该值时不参与可靠节点筛选
+MIN_SAMPLES = 3
+MIN_UPTIME = 0.95
+# 延迟数组中表示探测失败的值，正常延迟上限为65534毫秒
+FAILED = 0xFFFF
+# 每次查询的指纹数，低于SQLite的变量数上限
+QUERY_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_reliability (
+    fp TEXT PRIMARY KEY,
+    head INTEGER,
+    times BLOB,
+    latencies BLOB,
+    samples INTEGER,
+    uptime REAL,
+    p50 REAL,
+    p90 REAL,
+    updated_at TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_node_reliability_uptime ON node_reliability (uptime, p50);
+"""
+
+
+def ensure_schema(conn):
+    """
+    创建可靠性评分表。executescript会提交未完成的事务，需要在写入事务开始之前调用
+    """
+    conn.executescript(SCHEMA)
+
+
+def _load(typecode, blob):
+    # 数据库中统一使用小端字节序，保证在不同机器之间可以复制
+    values = array(typecode)
+    values.frombytes(blob or b"")
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _dump(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def percentile(sorted_values, fraction):
+    """
+    最近秩法计算分位数
+    """
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return float(sorted_values[index])
+
+
+def score(times, latencies, since):
+    """
+    计算时间窗口内的可用率和延迟分位数
+
+    参数:
+    times (array): 探测时间(Unix时间戳)
+    latencies (array): 延迟(毫秒)，探测失败为FAILED
+    since (int): 窗口起点(Unix时间戳)
+
+    返回:
+    tuple: (样本数, 可用率, P50, P90)
+    """
+    window = [latency for t, latency in zip(times, latencies) if t >= since]
+    if not window:
+        return 0, None, None, None
+    ok = sorted(latency for latency in window if latency != FAILED)
+    return len(window), round(len(ok) / len(window), 4), percentile(ok, 0.5), percentile(ok, 0.9)
+
+
+def record_results(conn, rows, window_hours=WINDOW_HOURS):
+    """
+    将探测结果追加到各节点的环形缓冲区并更新评分(在调用方的事务中执行，表需要已经存在)
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    rows (list): [(指纹, 探测时间 YYYY-MM-DD HH:MM:SS, 是否可用, 延迟毫秒), ...]，按时间先后排列
+    window_hours (int): 评分窗口(小时)
+    """
+    fps = list(dict.fromkeys(row[0] for row in rows))
+    rings = {}
+    for i in range(0, len(fps), QUERY_CHUNK):
+        chunk = fps[i:i + QUERY_CHUNK]
+        for fp, head, times, latencies in conn.execute(
+                f"SELECT fp, head, times, latencies FROM node_reliability WHERE fp IN ({','.join('?' * len(chunk))})",
+                chunk):
+            rings[fp] = [head, _load("I", times), _load("H", latencies)]
+
+    latest = None
+    for fp, probed_at, ok, latency in rows:
+        ring = rings.setdefault(fp, [0, array("I"), array("H")])
+        moment = datetime.strptime(probed_at, "%Y-%m-%d %H:%M:%S")
+        value = min(FAILED - 1, int(round(latency))) if ok and latency is not None else FAILED
+        head, times, latencies = ring
+        if len(times) < RING_SIZE:
+            times.append(int(moment.timestamp()))
+            latencies.append(value)
+        else:
+            times[head] = int(moment.timestamp())
+            latencies[head] = value
+        ring[0] = (head + 1) % RING_SIZE
+        latest = max(latest or probed_at, probed_at)
+
+    if not rings:
+        return
+    since = int((datetime.strptime(latest, "%Y-%m-%d %H:%M:%S") - timedelta(hours=window_hours)).timestamp())
+    updates = []
+    for fp, (head, times, latencies) in rings.items():
+        samples, uptime, p50, p90 = score(times, latencies, since)
+        updated_at = datetime.fromtimestamp(times[head - 1]).strftime("%Y-%m-%d %H:%M:%S")
+        updates.append((fp, head, _dump(times), _dump(latencies), samples, uptime, p50, p90, updated_at))
+    conn.executemany("""
+        INSERT OR REPLACE INTO node_reliability (fp, head, times, latencies, samples, uptime, p50, p90, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, updates)
+
+
+def rebuild_from_log(conn, window_hours=WINDOW_HOURS):
+    """
+    清空环形缓冲区并从probe_log回放全部探测记录，用于首次启用或修改参数之后
+
+    返回:
+    int: 回放的记录数
+    """
+    ensure_schema(conn)
+    rows = conn.execute("SELECT fp, probed_at, ok, latency_ms FROM probe_log ORDER BY probed_at").fetchall()
+    with conn:
+        conn.execute("DELETE FROM node_reliability")
+        record_results(conn, [tuple(row) for row in rows], window_hours)
+    return len(rows)
+
+
+def recent_results(conn, window):
+    """
+    从环形缓冲区读取每个节点最近window次探测结果，不需要扫描probe_log
+
+    返回:
+    dict: {指纹: [(是否可用, 延迟毫秒), ...]}，按时间从新到旧，探测失败时延迟为None
+    """
+    ensure_schema(conn)
+    history = {}
+    for fp, head, latencies in conn.execute("SELECT fp, head, latencies FROM node_reliability"):
+        latencies = _load("H", latencies)
+        # head指向下一次写入的位置，缓冲区未满时就是数组长度
+        newest = [latencies[(head - 1 - i) % len(latencies)] for i in range(min(window, len(latencies)))]
+        history[fp] = [(0, None) if value == FAILED else (1, value) for value in newest]
+    return history
+
+
+def reliable_nodes(conn, min_uptime=MIN_UPTIME, min_samples=MIN_SAMPLES, limit=50, window_hours=WINDOW_HOURS):
+    """
+    查询可用率达标的节点，按P50延迟排序
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    min_uptime (float): 最低可用率
+    min_samples (int): 最少样本数
+    limit (int, optional): 返回数量，为None时返回全部
+    window_hours (int): 评分必须在该时间内更新过
+
+    返回:
+    list: 节点记录(sqlite3.Row)列表，包含samples、uptime、p50和p90字段
+    """
+    ensure_schema(conn)
+    since = (datetime.now() - timedelta(hours=window_hours)).strftime("%Y-%m-%d %H:%M:%S")
+    return conn.execute(f"""
+        SELECT nodes.*, r.samples, r.uptime, r.p50, r.p90, r.updated_at
+        FROM node_reliability AS r JOIN nodes ON nodes.fp = r.fp
+        WHERE r.uptime >= ? AND r.samples >= ? AND r.updated_at >= ?
+        ORDER BY r.p50, r.uptime DESC
+        {"LIMIT ?" if limit is not None else ""}
+    """, (min_uptime, min_samples, since) + ((limit,) if limit is not None else ())).fetchall()
+
+
+def reliability_summary(conn, min_uptime=MIN_UPTIME, limit=10):
+    """
+    统计可靠性评分概况，供统计面板使用
+
+    返回:
+    dict: 有评分的节点数、达标节点数和达标节点列表
+    """
+    ensure_schema(conn)
+    scored = conn.execute("SELECT COUNT(*) FROM node_reliability WHERE samples > 0").fetchone()[0]
+    rows = reliable_nodes(conn, min_uptime, limit=None)
+    return {
+        "scored": scored,
+        "reliable": len(rows),
+        "min_uptime": min_uptime,
+        "window_hours": WINDOW_HOURS,
+        "top": [[row["name"], row["type"], row["uptime"], row["p50"], row["p90"], row["samples"]] for row in rows[:limit]]
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="节点可靠性评分")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--rebuild", action="store_true", help="从probe_log回放全部探测记录重建评分")
+    parser.add_argument("--min-uptime", type=float, default=MIN_UPTIME, help="最低可用率")
+    parser.add_argument("--top", type=int, default=20, help="显示延迟最低的N个达标节点")
+
+    args = parser.parse_args()
+
+    conn = node_history.connect(args.db)
+    if args.rebuild:
+        start = time.perf_counter()
+        count = rebuild_from_log(conn)
+        logger.info(f"已回放 {count} 条探测记录，耗时 {time.perf_counter() - start:.2f} 秒")
+    start = time.perf_counter()
+    rows = reliable_nodes(conn, args.min_uptime, limit=args.top)
+    print(f"最近 {WINDOW_HOURS} 小时可用率不低于 {args.min_uptime:.0%} 的节点(查询耗时 {(time.perf_counter() - start) * 1000:.1f} 毫秒):")
+    for row in rows:
+        print(f"- 可用率 {row['uptime']:.0%} P50 {row['p50']} 毫秒 P90 {row['p90']} 毫秒 ({row['samples']} 次)  "
+              f"{row['type']} {row['server']}:{row['port']}  {row['name']}")
+    conn.close()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+节点统计
+从节点历史库加载全部节点，按列存储并对协议、加密方式、地区、传输方式等字段做分类编码，
+分布、每日趋势和分来源统计都通过对编码数组计数(bincount)完成。
+安装了NumPy时使用NumPy，否则回退到标准库array
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from array import array
+from datetime import datetime
+from collections import namedtuple
+import node_history
+import node_reliability
+import template_engine
+
+logger = logging.getLogger("node_stats")
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STATS_FILE = "web/stats.json"
+PANEL_TEMPLATE = "partials/stats_panel.html"
+# 统计面板中的一张分布卡片，bars: [(标签, 计数, 百分比), ...]
+PanelCard = namedtuple("PanelCard", ["title", "icon", "color", "bars"])
+# 每次统计都会变化的字段，判断统计结果是否变化时忽略
+VOLATILE_KEYS = ("generated_at", "timing_ms")
+
+# 名称中的国旗emoji由两个区域指示符组成，例如 🇭🇰 -> HK
+FLAG_PATTERN = re.compile("([\U0001F1E6-\U0001F1FF]{2})")
+# 部分来源在名称中使用 GB_1、US-2 或 "GB SS-03" 这样的地区代码，SS-03、SR-01是协议编号而不是地区
+REGION_CODE_PATTERN = re.compile(r"^([A-Z]{2})\s|(?<![A-Za-z])(?!SS|SR)([A-Z]{2})[_\-]\d")
+UNKNOWN = "未知"
+
+CATEGORY_FIELDS = ("type", "cipher", "country", "network", "port")
+
+
+def region_from_name(name):
+    """
+    从节点名称中推断地区代码
+
+    返回:
+    str: 两位地区代码，无法推断时返回"未知"
+    """
+    match = FLAG_PATTERN.search(name or "")
+    if match:
+        return "".join(chr(ord(c) - 0x1F1E6 + ord("A")) for c in match.group(1))
+    match = REGION_CODE_PATTERN.search(name or "")
+    if match:
+        return match.group(1) or match.group(2)
+    return UNKNOWN
+
+
+def encode(values):
+    """
+    分类编码
+
+    参数:
+    values (iterable): 原始值
+
+    返回:
+    tuple: (编码数组array('H')，标签列表)，codes[i]是values[i]在标签列表中的下标
+    """
+    index = {}
+    codes = array("H", (index.setdefault(value, len(index)) for value in values))
+    return codes, list(index)
+
+
+def bincount(codes, size, mask=None):
+    """
+    对编码数组计数
+
+    参数:
+    codes (array): 编码数组
+    size (int): 类别数
+    mask (array, optional): 与codes等长的0/1数组(或source_mask返回的布尔数组)，只统计为1的位置
+
+    返回:
+    list: 每个类别的计数
+    """
+    if np is not None:
+        values = np.frombuffer(codes, dtype=np.uint16) if isinstance(codes, array) else codes
+        if mask is not None:
+            values = values[np.frombuffer(mask, dtype=np.uint8).astype(bool) if isinstance(mask, array) else mask]
+        return np.bincount(values, minlength=size).tolist()
+    counts = [0] * size
+    if mask is None:
+        for code in codes:
+            counts[code] += 1
+    else:
+        for code, keep in zip(codes, mask):
+            if keep:
+                counts[code] += 1
+    return counts
+
+
+def source_mask(sources, bit):
+    """
+    来源掩码数组中包含某个来源的位置
+
+    参数:
+    sources (array): 来源掩码数组array('B')
+    bit (int): 来源的位
+
+    返回:
+    安装了NumPy时为布尔数组(一次按位与运算)，否则为0/1的array('B')
+    """
+    if np is not None:
+        return (np.frombuffer(sources, dtype=np.uint8) & bit) != 0
+    return array("B", (1 if value & bit else 0 for value in sources))
+
+
+def ranked(labels, counts, limit=None):
+    """
+    按计数降序排列的 [[标签, 计数], ...]，忽略计数为0的类别
+    """
+    pairs = sorted(((label, count) for label, count in zip(labels, counts) if count), key=lambda x: -x[1])
+    return [list(pair) for pair in pairs[:limit]]
+
+
+def load_columns(conn):
+    """
+    从节点历史库加载列式数据
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+
+    返回:
+    dict: 各字段的(编码数组, 标签列表)，以及来源掩码、首次出现日期和每日出现记录
+    """
+    fps = []
+    sources = array("B")
+    first_seen = []
+    node_columns = {row[1] for row in conn.execute("PRAGMA table_info(nodes)")}
+    # 经过GeoIP标注的历史库带有country/org列，没有查到结果时仍回退到从名称推断
+    has_country = "country" in node_columns
+    has_org = "org" in node_columns
+    raw = {field: [] for field in CATEGORY_FIELDS + (("provider",) if has_org else ())}
+    # 加密方式和传输方式由SQLite直接从节点配置JSON中取出，避免在Python中逐个解析
+    query = ("SELECT fp, type, name, port, sources, first_seen, "
+             "json_extract(config, '$.cipher') AS cipher, json_extract(config, '$.network') AS network"
+             + (", country" if has_country else "") + (", org" if has_org else "") + " FROM nodes")
+    for row in conn.execute(query):
+        fps.append(row["fp"])
+        raw["type"].append(row["type"] or UNKNOWN)
+        raw["cipher"].append(str(row["cipher"] or "无"))
+        raw["country"].append((has_country and row["country"]) or region_from_name(row["name"]))
+        raw["network"].append(str(row["network"] or "tcp"))
+        raw["port"].append(row["port"])
+        if has_org:
+            raw["provider"].append(row["org"] or UNKNOWN)
+        sources.append(row["sources"])
+        first_seen.append(row["first_seen"])
+
+    columns = {field: encode(values) for field, values in raw.items()}
+    columns["sources"] = sources
+    columns["first_seen"] = first_seen
+
+    # 每日出现记录: 节点下标、日期编码、来源掩码
+    node_index = {fp: i for i, fp in enumerate(fps)}
+    day_nodes = array("I")
+    day_values = []
+    day_sources = array("B")
+    for fp, day, day_mask in conn.execute("SELECT fp, day, sources FROM node_days ORDER BY day"):
+        day_nodes.append(node_index[fp])
+        day_values.append(day)
+        day_sources.append(day_mask)
+    columns["days"] = (day_nodes, encode(day_values), day_sources)
+    return columns
+
+
+def compute_stats(columns, trend_days=60):
+    """
+    计算分布、每日趋势和分来源统计
+
+    参数:
+    columns (dict): load_columns的返回值
+    trend_days (int): 趋势保留最近多少天
+
+    返回:
+    dict: 统计结果
+    """
+    total = len(columns["sources"])
+    stats = {"total_nodes": total, "distributions": {}, "sources": {}, "trend": {}}
+
+    for field in CATEGORY_FIELDS + (("provider",) if "provider" in columns else ()):
+        codes, labels = columns[field]
+        stats["distributions"][field] = ranked(labels, bincount(codes, len(labels)), 20)
+
+    type_codes, type_labels = columns["type"]
+    country_codes, country_labels = columns["country"]
+    for name, bit in node_history.SOURCES.items():
+        mask = source_mask(columns["sources"], bit)
+        count = int(mask.sum()) if np is not None else sum(mask)
+        if not count:
+            continue
+        stats["sources"][name] = {
+            "nodes": count,
+            "type": ranked(type_labels, bincount(type_codes, len(type_labels), mask), 8),
+            "country": ranked(country_labels, bincount(country_codes, len(country_labels), mask), 8)
+        }
+
+    day_nodes, (day_codes, day_labels), day_sources = columns["days"]
+    if day_labels:
+        n_days = len(day_labels)
+        # 日期编码与协议编码组合成一维编码，一次计数得到 日期×协议 的二维表
+        n_types = len(type_labels)
+        if np is not None:
+            # 按节点下标取出协议编码，与日期编码组合，全部是数组运算
+            node_types = np.frombuffer(type_codes, dtype=np.uint16)[np.frombuffer(day_nodes, dtype=np.uint32)]
+            combined = np.frombuffer(day_codes, dtype=np.uint16).astype(np.int64) * n_types + node_types
+            by_day_type = np.bincount(combined, minlength=n_days * n_types).tolist()
+            # 日期标签已排序(按日期读取)，用二分查找把首次出现日期转换为日期编码，不在标签中的记为0
+            labels = np.array(day_labels)
+            first = np.array(columns["first_seen"], dtype=labels.dtype)
+            positions = np.minimum(np.searchsorted(labels, first), n_days - 1)
+            first_codes = np.where(labels[positions] == first, positions, 0)
+        else:
+            by_day_type = [0] * (n_days * n_types)
+            for day, node in zip(day_codes, day_nodes):
+                by_day_type[day * n_types + type_codes[node]] += 1
+            day_index = {day: i for i, day in enumerate(day_labels)}
+            first_codes = array("H", (day_index.get(day, 0) for day in columns["first_seen"]))
+
+        start = max(0, n_days - trend_days)
+        stats["trend"] = {
+            "days": day_labels[start:],
+            "nodes": bincount(day_codes, n_days)[start:],
+            "new": bincount(first_codes, n_days)[start:],
+            "by_type": {
+                label: by_day_type[t::n_types][start:n_days]
+                for t, label in enumerate(type_labels)
+            },
+            "by_source": {}
+        }
+        for name, bit in node_history.SOURCES.items():
+            mask = source_mask(day_sources, bit)
+            counts = bincount(day_codes, n_days, mask)[start:]
+            if any(counts):
+                stats["trend"]["by_source"][name] = counts
+        stats["latest_day"] = day_labels[-1]
+        stats["active_nodes"] = stats["trend"]["nodes"][-1]
+    return stats
+
+
+def build_stats(db_path=node_history.DB_PATH, output=STATS_FILE):
+    """
+    从节点历史库生成统计数据并保存为JSON
+
+    参数:
+    db_path (str): 节点历史库路径
+    output (str): 输出文件，为None时不保存
+
+    返回:
+    dict: 统计结果，历史库不存在时返回None
+    """
+    if not os.path.exists(db_path):
+        logger.warning(f"未找到节点历史库 {db_path}，跳过节点统计")
+        return None
+    start = time.perf_counter()
+    conn = node_history.connect(db_path)
+    try:
+        columns = load_columns(conn)
+        reliability = node_reliability.reliability_summary(conn)
+    finally:
+        conn.close()
+    loaded = time.perf_counter()
+    stats = compute_stats(columns)
+    stats["reliability"] = reliability
+    stats["generated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    stats["timing_ms"] = {
+        "load": round((loaded - start) * 1000, 1),
+        "compute": round((time.perf_counter() - loaded) * 1000, 1),
+        "backend": "numpy" if np is not None else "array"
+    }
+    if output:
+        previous = None
+        if os.path.exists(output):
+            try:
+                with open(output, "r", encoding="utf-8") as f:
+                    previous = json.load(f)
+            except Exception:
+                pass
+        # 统计内容没有变化时保留原文件(沿用原来的生成时间)，避免每次运行都产生新的提交
+        if previous and stable_stats(previous) == json.loads(json.dumps(stable_stats(stats))):
+            stats["generated_at"] = previous.get("generated_at", stats["generated_at"])
+            logger.info(f"节点统计没有变化，保留 {output}")
+        else:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump(stats, f, ensure_ascii=False, indent=2)
+            logger.info(f"已生成节点统计 {output}，共 {stats['total_nodes']} 个节点")
+    return stats
+
+
+def stable_stats(stats):
+    """
+    去掉生成时间和耗时等易变字段后的统计数据，用于判断统计结果是否变化
+    """
+    return {key: value for key, value in (stats or {}).items() if key not in VOLATILE_KEYS}
+
+
+def render_stats_panel(stats):
+    """
+    生成节点统计面板的HTML(模板 partials/stats_panel.html，输出自动转义)
+
+    参数:
+    stats (dict): build_stats的返回值
+
+    返回:
+    str: HTML片段，没有统计数据时返回空字符串
+    """
+    if not stats or not stats.get("total_nodes"):
+        return ""
+    total = stats["total_nodes"]
+    distributions = stats["distributions"]
+    panels = [
+        ("协议", "bi-shield-lock", distributions.get("type", [])[:8], "primary"),
+        ("地区", "bi-globe", distributions.get("country", [])[:8], "success"),
+        ("运营商", "bi-building", distributions.get("provider", [])[:6], "info") if distributions.get("provider")
+        else ("传输方式", "bi-arrow-left-right", distributions.get("network", [])[:6], "info"),
+        ("来源", "bi-diagram-3", [[name, info["nodes"]] for name, info in stats["sources"].items()], "warning")
+    ]
+    cards = [PanelCard(title, icon, color, [(label, count, count * 100 / total if total else 0) for label, count in pairs])
+             for title, icon, pairs, color in panels]
+    trend = stats.get("trend", {})
+    return template_engine.render_to_string(PANEL_TEMPLATE, {
+        "total": total,
+        "latest_day": stats.get("latest_day", "-"),
+        "active_nodes": stats.get("active_nodes", 0),
+        "generated_at": stats.get("generated_at", ""),
+        "cards": cards,
+        "trend_rows": list(zip(trend.get("days", []), trend.get("nodes", []), trend.get("new", [])))[-7:][::-1],
+        "reliability": stats.get("reliability") or {}
+    })
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="节点统计")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--output", default=STATS_FILE, help="统计结果输出文件")
+
+    args = parser.parse_args()
+
+    stats = build_stats(args.db, args.output)
+    if stats:
+        timing = stats["timing_ms"]
+        print(f"共 {stats['total_nodes']} 个节点，加载 {timing['load']} 毫秒，计算 {timing['compute']} 毫秒 ({timing['backend']})")
+        for field, pairs in stats["distributions"].items():
+            print(f"{field}: " + ", ".join(f"{label}={count}" for label, count in pairs[:8]))
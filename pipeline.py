@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+单进程爬取流水线
+把注册表中各来源的 发现 → 爬取 → 下载 → 解析(记录节点历史) → 下载前端资源 → 渲染 → 预压缩 组织成一个依赖图(DAG)，在同一个进程里运行:
+- 互不依赖的来源在线程池中并发执行(都是网络I/O)，同一来源内的阶段按依赖顺序执行，
+  每个主机的并发名额由注册表在所有来源之间共享
+- 每个阶段每次运行只执行一次，模块导入、日志初始化和状态读取也只做一次
+- 运行结束后输出每个阶段的状态和耗时
+
+代替工作流中依次运行七次 monitor_and_fetch.py 的做法(其中默认模式和 --freev2 会把FreeV2.net爬取两次)
+"""
+
+import time
+import asyncio
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import source_registry
+import monitor_and_fetch as mf
+
+logger = logging.getLogger("pipeline")
+
+# requires: 必须成功且有结果的上游阶段，结果以 {阶段名: 返回值} 传给本阶段的函数
+# after: 只需要先运行结束的上游阶段，失败或没有结果都不影响本阶段(例如渲染总是使用本地已有的数据)
+Stage = namedtuple("Stage", ["name", "func", "requires", "after"])
+# state: ok / failed / skipped
+StageResult = namedtuple("StageResult", ["name", "state", "seconds", "value", "note"])
+
+# 并发线程数，默认每个来源一个线程
+DEFAULT_WORKERS = 6
+
+
+def check_graph(stages):
+    """
+    检查依赖图: 阶段名唯一、依赖的阶段存在并且没有环
+
+    参数:
+    stages (list): Stage列表
+    """
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"阶段名重复: {sorted(name for name in set(names) if names.count(name) > 1)}")
+    for stage in stages:
+        missing = [dep for dep in stage.requires + stage.after if dep not in names]
+        if missing:
+            raise ValueError(f"阶段 {stage.name} 依赖不存在的阶段: {', '.join(missing)}")
+
+    # 反复移除没有未完成依赖的阶段，剩下的阶段构成环
+    remaining = {stage.name: set(stage.requires + stage.after) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps & remaining.keys()]
+        if not ready:
+            raise ValueError(f"依赖图中存在环: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+
+
+def _run_stage(stage, inputs):
+    start = time.perf_counter()
+    try:
+        value = stage.func(inputs)
+        return StageResult(stage.name, "ok", time.perf_counter() - start, value, "")
+    except Exception as e:
+        logger.exception(f"阶段 {stage.name} 出错: {e}")
+        return StageResult(stage.name, "failed", time.perf_counter() - start, None, str(e))
+
+
+def run_dag(stages, workers=DEFAULT_WORKERS):
+    """
+    按依赖关系运行全部阶段，依赖都已结束的阶段立即提交到线程池
+
+    必需的上游阶段失败或返回None时，本阶段标记为skipped，不会运行
+
+    参数:
+    stages (list): Stage列表，列表顺序决定同时就绪的阶段的提交顺序
+    workers (int): 并发线程数
+
+    返回:
+    dict: {阶段名: StageResult}，按阶段结束的顺序排列
+    """
+    check_graph(stages)
+    pending = list(stages)
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            # 跳过的阶段也算结束，可能让更多阶段就绪，所以重复扫描直到没有变化
+            changed = True
+            while changed:
+                changed = False
+                for stage in list(pending):
+                    if not all(dep in results for dep in stage.requires + stage.after):
+                        continue
+                    pending.remove(stage)
+                    failed = [dep for dep in stage.requires if results[dep].state != "ok" or results[dep].value is None]
+                    if failed:
+                        logger.warning(f"跳过阶段 {stage.name}: 上游阶段 {', '.join(failed)} 没有成功或没有结果")
+                        results[stage.name] = StageResult(stage.name, "skipped", 0.0, None,
+                                                          f"上游阶段没有成功或没有结果: {', '.join(failed)}")
+                        changed = True
+                        continue
+                    inputs = {dep: results[dep].value for dep in stage.requires}
+                    logger.info(f"开始阶段 {stage.name}")
+                    running[executor.submit(_run_stage, stage, inputs)] = stage
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                results[stage.name] = future.result()
+                logger.info(f"阶段 {stage.name} 结束: {results[stage.name].state}，"
+                            f"耗时 {results[stage.name].seconds:.2f} 秒")
+    return results
+
+
+def source_stages(source, download=True, force_update=False):
+    """
+    注册表中一个来源的 发现 → 爬取 → 下载 阶段，每个阶段在所在线程的事件循环中调用注册表的异步接口
+
+    参数:
+    source (source_registry.Source): 来源
+    download (bool): 是否下载订阅文件
+    force_update (bool): 是否包括已处理过的工作项
+
+    返回:
+    list: Stage列表
+    """
+    name = source.name
+    stages = [
+        Stage(f"{name}:discover", lambda inputs: asyncio.run(source_registry.discover(source, force_update)), (), ()),
+        Stage(f"{name}:fetch", lambda inputs: asyncio.run(source_registry.collect(source, inputs[f"{name}:discover"])),
+              (f"{name}:discover",), ())
+    ]
+    if download and source.download:
+        stages.append(Stage(f"{name}:download",
+                            lambda inputs: asyncio.run(source_registry.download(source, inputs[f"{name}:fetch"])),
+                            (f"{name}:fetch",), ()))
+    return stages
+
+
+def build_stages(download=True, force_update=False, sources=None, probe=False):
+    """
+    根据来源注册表生成流水线的依赖图
+
+    参数:
+    download (bool): 是否下载订阅文件
+    force_update (bool): 是否重新爬取所有日期
+    sources (list, optional): 只爬取这些来源，默认爬取全部已注册的来源
+    probe (bool): 是否在记录节点历史后探测一轮节点，并根据探测结果生成 web/sub/ 下的订阅
+
+    返回:
+    list: Stage列表
+    """
+    stages = []
+    for source in source_registry.registered(sources):
+        stages += source_stages(source, download, force_update)
+    fetched = tuple(stage.name for stage in stages)
+    stages += [
+        # 解析全部新下载的订阅文件，记录到节点历史库
+        Stage("history", lambda inputs: mf.update_node_history(), (), fetched),
+        # 下载前端资源打包需要的第三方文件(只下载缓存中缺少的)，渲染时的打包只读取缓存
+        Stage("vendor", lambda inputs: mf.vendor_assets(), (), ()),
+        # 渲染只读取本地数据，任何来源失败都照常生成页面(页面上会标记缺少或过期的来源)
+        Stage("render", lambda inputs: mf.generate_html_page(update_history=False, compress=False), (),
+              ("history", "vendor"))
+    ]
+    if probe and mf.PROBE_SCHEDULER_ENABLED:
+        stages.append(Stage("probe", lambda inputs: mf.probe_scheduler.run_cycle(), (), ("history",)))
+        if mf.SUB_BUILDER_ENABLED:
+            # 探测失败时仍然使用库中最近的探测结果生成订阅
+            stages.append(Stage("subscriptions", lambda inputs: mf.sub_builder.build_subscriptions(), (), ("probe",)))
+    elif probe:
+        logger.warning("节点探测功能未启用，跳过探测和订阅生成")
+    # 预压缩必须在所有写入web/的阶段之后，否则 .gz/.br 副本会落后于旁边的源文件
+    writers = tuple(stage.name for stage in stages if stage.name in ("render", "subscriptions"))
+    stages.append(Stage("compress", lambda inputs: mf.precompress_web(), (), writers))
+    return stages
+
+
+def format_summary(results, wall_seconds):
+    """
+    将各阶段的运行结果格式化为文本表格
+
+    参数:
+    results (dict): run_dag的返回值
+    wall_seconds (float): 整个流水线的墙钟时间
+
+    返回:
+    str: 运行摘要
+    """
+    width = max([len(name) for name in results] + [4])
+    lines = [f"{'阶段'.ljust(width - 2)}  状态      耗时(秒)"]
+    for result in results.values():
+        line = f"{result.name.ljust(width)}  {result.state.ljust(8)}  {result.seconds:8.2f}"
+        lines.append(f"{line}  {result.note}" if result.note else line)
+    states = [result.state for result in results.values()]
+    total = sum(result.seconds for result in results.values())
+    lines.append(f"共 {len(results)} 个阶段(成功 {states.count('ok')}，失败 {states.count('failed')}，"
+                 f"跳过 {states.count('skipped')})，各阶段耗时合计 {total:.2f} 秒，墙钟时间 {wall_seconds:.2f} 秒")
+    return "\n".join(lines)
+
+
+def run_pipeline(download=True, force_update=False, sources=None, workers=DEFAULT_WORKERS, probe=False):
+    """
+    运行完整的流水线并输出每个阶段的耗时
+
+    返回:
+    dict: {阶段名: StageResult}
+    """
+    start = time.perf_counter()
+    results = run_dag(build_stages(download, force_update, sources, probe), workers)
+    logger.info("流水线运行结束\n" + format_summary(results, time.perf_counter() - start))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="在一个进程中按依赖关系并发爬取所有来源并生成页面")
+    parser.add_argument("--no-download", action="store_true", help="不下载订阅文件")
+    parser.add_argument("--force-update", action="store_true", help="重新爬取所有日期")
+    parser.add_argument("--sources", help="只爬取这些来源，用逗号分隔，例如 datiya,v2rayc")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并发线程数")
+    parser.add_argument("--probe", action="store_true", help="探测一轮节点并生成 web/sub/ 下的订阅")
+    parser.add_argument("--graph", action="store_true", help="只输出依赖图，不运行")
+
+    args = parser.parse_args()
+
+    sources = [source.strip() for source in args.sources.split(",")] if args.sources else None
+    if args.graph:
+        stages = build_stages(not args.no_download, args.force_update, sources, args.probe)
+        check_graph(stages)
+        for stage in stages:
+            deps = ", ".join(stage.requires + tuple(f"({dep})" for dep in stage.after))
+            print(f"- {stage.name}" + (f" ← {deps}" if deps else ""))
+    else:
+        run_pipeline(not args.no_download, args.force_update, sources, args.workers, args.probe)
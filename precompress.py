@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+静态文件预压缩
+为 web/ 下的每个文本文件生成最高压缩级别的 .gz(以及安装了brotli时的 .br)副本，
+支持预压缩文件的服务器(nginx gzip_static/brotli_static、Caddy precompressed等)可以直接发送，
+不依赖服务器实时压缩。gzip头中的时间戳固定为0，相同内容的压缩结果字节完全相同。
+每个文件的内容指纹和保留的压缩副本记录在清单中，只重新压缩内容变化或副本缺失的文件。
+需要在所有写入 web/ 的步骤(页面、API、订阅等)之后运行，否则压缩副本会落后于源文件
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import site_renderer
+
+logger = logging.getLogger("precompress")
+
+try:
+    import brotli
+    BROTLI_ENABLED = True
+except ImportError:
+    brotli = None
+    BROTLI_ENABLED = False
+
+WEB_DIR = "web"
+MANIFEST_PATH = "results/cache/compress_manifest.json"
+TEXT_EXTENSIONS = (".html", ".json", ".yaml", ".yml", ".txt", ".css", ".js", ".svg", ".xml")
+# 太小的文件压缩后往往更大，而且不值得多一次文件查找
+MIN_SIZE = 256
+
+
+def compressors():
+    """
+    可用的压缩方式
+
+    返回:
+    dict: {扩展名: 压缩函数}
+    """
+    methods = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if BROTLI_ENABLED:
+        methods[".br"] = lambda data: brotli.compress(data, quality=11)
+    return methods
+
+
+def text_files(web_dir=WEB_DIR):
+    """
+    列出需要压缩的文本文件(相对路径，已排序)
+    """
+    files = []
+    for root, _, names in os.walk(web_dir):
+        for name in names:
+            if name.endswith(TEXT_EXTENSIONS):
+                files.append(os.path.relpath(os.path.join(root, name), web_dir))
+    return sorted(files)
+
+
+def _write_bytes(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def precompress(web_dir=WEB_DIR, manifest_path=MANIFEST_PATH, min_size=MIN_SIZE, force=False):
+    """
+    为文本文件生成压缩副本，只处理内容变化的文件，并删除源文件已不存在的压缩副本
+
+    压缩后没有变小的文件不保留副本，服务器会直接发送原文件
+
+    参数:
+    web_dir (str): 网站目录
+    manifest_path (str): 内容指纹清单路径，{文件: [内容指纹, [保留的压缩副本扩展名, ...]]}
+    min_size (int): 小于该字节数的文件不压缩
+    force (bool): 忽略清单，重新压缩全部文件
+
+    返回:
+    dict: {"files": 文件数, "compressed": 本次压缩的文件数, "original": 原始总字节数,
+           ".gz"/".br": 压缩后总字节数(没有压缩副本的文件按原始大小计算)}
+    """
+    methods = compressors()
+    manifest = {} if force else (site_renderer.read_json(manifest_path) or {})
+    entries = {}
+    report = {"files": 0, "compressed": 0, "original": 0}
+    report.update({suffix: 0 for suffix in methods})
+
+    for name in text_files(web_dir):
+        path = os.path.join(web_dir, name)
+        with open(path, "rb") as f:
+            data = f.read()
+        report["files"] += 1
+        report["original"] += len(data)
+        # 可用的压缩方式也计入指纹，安装brotli之后会补齐 .br 副本
+        digest = hashlib.sha256(data).hexdigest()[:16] + "".join(methods)
+        if len(data) < min_size:
+            entries[name] = [digest, []]
+            for suffix in methods:
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+                report[suffix] += len(data)
+            continue
+
+        # 清单中记录的压缩副本都还存在时才跳过，副本被删除后重新生成
+        entry = manifest.get(name)
+        if (isinstance(entry, list) and len(entry) == 2 and entry[0] == digest
+                and all(os.path.exists(path + suffix) for suffix in entry[1])):
+            entries[name] = entry
+            for suffix in methods:
+                # 不在清单中的副本是压缩后没有变小的文件
+                report[suffix] += os.path.getsize(path + suffix) if suffix in entry[1] else len(data)
+            continue
+
+        kept = []
+        for suffix, compress in methods.items():
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                _write_bytes(path + suffix, compressed)
+                kept.append(suffix)
+                report[suffix] += len(compressed)
+            else:
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+                report[suffix] += len(data)
+        entries[name] = [digest, kept]
+        report["compressed"] += 1
+
+    # 清理源文件已经删除的压缩副本
+    for root, _, names in os.walk(web_dir):
+        for name in names:
+            base, suffix = os.path.splitext(name)
+            if suffix in (".gz", ".br") and base.endswith(TEXT_EXTENSIONS) and not os.path.exists(
+                    os.path.join(root, base)):
+                os.remove(os.path.join(root, name))
+
+    if entries != manifest:
+        site_renderer.write_if_changed(manifest_path, json.dumps(entries, ensure_ascii=False, indent=2, sort_keys=True))
+    return report
+
+
+def savings_report(report):
+    """
+    将压缩结果格式化为一行文字
+    """
+    parts = [f"{report['files']} 个文本文件(本次压缩 {report['compressed']} 个)，原始 {report['original'] / 1024:.1f} KB"]
+    for suffix in (".gz", ".br"):
+        if suffix in report:
+            saved = 1 - report[suffix] / report["original"] if report["original"] else 0
+            parts.append(f"{suffix} {report[suffix] / 1024:.1f} KB(节省 {saved:.1%})")
+    return "，".join(parts)
+
+
+def serve(web_dir=WEB_DIR, port=8000):
+    """
+    本地静态服务器: 客户端接受gzip/brotli时直接发送预压缩副本
+    """
+    import functools
+    import mimetypes
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    class Handler(SimpleHTTPRequestHandler):
+        def send_head(self):
+            path = self.translate_path(self.path)
+            if os.path.isdir(path):
+                # 没有以/结尾的目录由父类重定向
+                if not self.path.split("?", 1)[0].endswith("/"):
+                    return super().send_head()
+                path = os.path.join(path, "index.html")
+            accepted = self.headers.get("Accept-Encoding", "")
+            for suffix, encoding in ((".br", "br"), (".gz", "gzip")):
+                if encoding in accepted and os.path.isfile(path + suffix):
+                    f = open(path + suffix, "rb")
+                    self.send_response(200)
+                    self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+                    self.send_header("Content-Encoding", encoding)
+                    self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                    self.send_header("Vary", "Accept-Encoding")
+                    self.end_headers()
+                    return f
+            return super().send_head()
+
+    server = ThreadingHTTPServer(("", port), functools.partial(Handler, directory=web_dir))
+    logger.info(f"正在 http://localhost:{port}/ 提供 {web_dir} 目录")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="为网站文本文件生成gzip/brotli预压缩副本")
+    parser.add_argument("--web", default=WEB_DIR, help="网站目录")
+    parser.add_argument("--force", action="store_true", help="忽略内容指纹清单，重新压缩全部文件")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="压缩后在本地端口启动支持预压缩文件的静态服务器")
+
+    args = parser.parse_args()
+
+    if not BROTLI_ENABLED:
+        logger.info("未安装brotli，只生成.gz文件")
+    start = time.perf_counter()
+    report = precompress(args.web, force=args.force)
+    print(f"- {savings_report(report)}")
+    logger.info(f"耗时 {time.perf_counter() - start:.2f} 秒")
+    if args.serve is not None:
+        try:
+            serve(args.web, args.serve)
+        except KeyboardInterrupt:
+            pass
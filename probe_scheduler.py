@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+自适应探测调度
+为每个探测目标计算优先级，每轮只在固定的探测预算内探测优先级最高的目标:
+- 距离上次探测越久优先级越高，从未探测过的目标最优先
+- 最近结果在可用/不可用之间反复变化或延迟波动大的目标优先级更高
+- 新出现的节点优先级更高
+- 连续失败的目标按指数退避降低优先级，长期不可用的节点很少再被探测
+长期稳定的节点因此只偶尔复查，探测能力集中在新节点和不稳定的节点上
+"""
+
+import time
+import math
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from collections import namedtuple
+import node_history
+import node_prober
+import node_reliability
+
+logger = logging.getLogger("probe_scheduler")
+
+# 每轮最多探测的目标数
+PROBE_BUDGET = 500
+# 调度间隔(分钟)
+CYCLE_MINUTES = 30
+# 两次探测同一目标的最短间隔(分钟)
+MIN_REPROBE_MINUTES = 20
+# 计算波动时使用的最近探测次数
+HISTORY_WINDOW = 10
+# 从未探测过的目标视为已有这么多小时未探测
+NEVER_PROBED_HOURS = 72
+# 首次出现后多少天内视为新节点
+NEW_NODE_DAYS = 1
+NEW_NODE_BOOST = 2.0
+FLAP_WEIGHT = 4.0
+VARIANCE_WEIGHT = 2.0
+MAX_BACKOFF = 64
+
+# flips: 最近结果中可用/不可用的切换次数，cv: 延迟的变异系数
+TargetState = namedtuple("TargetState", ["staleness_hours", "flips", "cv", "fail_streak", "is_new"])
+
+
+def load_history(conn, window=HISTORY_WINDOW):
+    """
+    读取每个节点最近window次探测结果
+
+    probe_log只追加不清理，这里读取node_reliability中每个节点固定长度的环形缓冲区，
+    耗时只与节点数有关
+
+    返回:
+    dict: {指纹: [(ok, latency_ms), ...]}，按时间从新到旧
+    """
+    return node_reliability.recent_results(conn, window)
+
+
+def _variation(latencies):
+    """
+    计算延迟的变异系数(标准差/均值)
+    """
+    if len(latencies) < 2:
+        return 0.0
+    mean = sum(latencies) / len(latencies)
+    if not mean:
+        return 0.0
+    variance = sum((x - mean) ** 2 for x in latencies) / len(latencies)
+    return math.sqrt(variance) / mean
+
+
+def node_state(status, history, first_seen, now):
+    """
+    根据节点的探测状态和最近的探测记录计算调度状态
+
+    参数:
+    status (sqlite3.Row): probe_status中的记录，从未探测时为None
+    history (list): load_history中该节点的记录
+    first_seen (str): 首次出现日期
+    now (datetime): 当前时间
+
+    返回:
+    TargetState: 调度状态
+    """
+    is_new = first_seen >= (now - timedelta(days=NEW_NODE_DAYS)).strftime("%Y-%m-%d")
+    if status is None:
+        return TargetState(NEVER_PROBED_HOURS, 0, 0.0, 0, is_new)
+    probed_at = datetime.strptime(status["probed_at"], node_prober.PROBED_AT_FORMAT)
+    staleness = max(0.0, (now - probed_at).total_seconds() / 3600)
+    flips = sum(1 for a, b in zip(history, history[1:]) if a[0] != b[0])
+    cv = _variation([latency for ok, latency in history if ok and latency is not None])
+    return TargetState(staleness, flips, cv, status["fail_streak"] or 0, is_new)
+
+
+def priority(state, window=HISTORY_WINDOW):
+    """
+    计算调度优先级，值越大越先探测
+
+    优先级 = 未探测时长 × 不稳定系数 × 新节点系数 / 失败退避
+    """
+    if state.staleness_hours * 60 < MIN_REPROBE_MINUTES:
+        return 0.0
+    instability = 1 + FLAP_WEIGHT * state.flips / max(1, window - 1) + VARIANCE_WEIGHT * state.cv
+    boost = NEW_NODE_BOOST if state.is_new else 1.0
+    # 连续失败1次可能只是偶发，之后每多失败一次优先级减半
+    backoff = min(MAX_BACKOFF, 2 ** max(0, state.fail_streak - 1))
+    return state.staleness_hours * instability * boost / backoff
+
+
+def plan_cycle(conn, targets, budget=PROBE_BUDGET, now=None):
+    """
+    为本轮选出优先级最高的目标
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    targets (dict): node_prober.load_targets的返回值
+    budget (int): 本轮最多探测的目标数
+    now (datetime, optional): 当前时间
+
+    返回:
+    list: [(优先级, Target), ...]，按优先级降序
+    """
+    node_prober.ensure_probe_schema(conn)
+    now = now or datetime.now()
+    statuses = {row["fp"]: row for row in conn.execute("SELECT fp, probed_at, fail_streak FROM probe_status")}
+    first_seen = dict(conn.execute("SELECT fp, first_seen FROM nodes WHERE last_seen >= ?",
+                                   ((now - timedelta(days=30)).strftime("%Y-%m-%d"),)).fetchall())
+    history = load_history(conn)
+
+    scored = []
+    for target, fps in targets.items():
+        # 同一目标对应多个指纹时取最高优先级
+        score = max(priority(node_state(statuses.get(fp), history.get(fp, []), first_seen.get(fp, ""), now))
+                    for fp in fps)
+        if score > 0:
+            scored.append((score, target))
+    return heapq.nlargest(budget, scored, key=lambda item: item[0])
+
+
+def run_cycle(db_path=node_history.DB_PATH, budget=PROBE_BUDGET, max_age_days=3, concurrency=None,
+              timeout=node_prober.DEFAULT_TIMEOUT):
+    """
+    执行一轮调度探测
+
+    参数:
+    db_path (str): 节点历史库路径
+    budget (int): 本轮最多探测的目标数
+    max_age_days (int): 只调度最近多少天内出现过的节点
+    concurrency (int, optional): TCP阶段同时进行的连接数上限
+    timeout (float): 每个阶段的超时时间(秒)
+
+    返回:
+    dict: 本轮统计
+    """
+    conn = node_history.connect(db_path)
+    try:
+        targets = node_prober.load_targets(conn, max_age_days)
+        if not targets:
+            logger.info("节点历史库中没有需要探测的节点")
+            return {"targets": 0, "probed": 0, "alive": 0, "seconds": 0}
+        started_at = datetime.now()
+        plan = plan_cycle(conn, targets, budget, started_at)
+        selected = {target: targets[target] for _, target in plan}
+        results = []
+        seconds = 0
+        if selected:
+            logger.info(f"本轮调度 {len(selected)}/{len(targets)} 个目标，"
+                        f"优先级 {plan[0][0]:.1f} ~ {plan[-1][0]:.1f}")
+            start = time.perf_counter()
+            results = asyncio.run(node_prober.run_funnel(list(selected), concurrency, timeout))
+            seconds = round(time.perf_counter() - start, 2)
+            node_prober.save_probe_results(conn, selected, results)
+        alive = sum(1 for result in results if result.ok)
+        with conn:
+            # 未被调度的目标没有可用的缓存结果，单独记为跳过，不计入缓存命中
+            conn.execute("INSERT INTO probe_runs (started_at, targets, probed, cache_hits, skipped, alive, seconds) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (started_at.strftime(node_prober.PROBED_AT_FORMAT), len(targets), len(selected),
+                          0, len(targets) - len(selected), alive, seconds))
+        logger.info(f"本轮探测完成: {alive}/{len(selected)} 个目标通过，耗时 {seconds} 秒")
+        return {"targets": len(targets), "probed": len(selected), "alive": alive, "seconds": seconds}
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="自适应探测调度")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--budget", type=int, default=PROBE_BUDGET, help="每轮最多探测的目标数")
+    parser.add_argument("--days", type=int, default=3, help="只调度最近多少天内出现过的节点")
+    parser.add_argument("--concurrency", type=int, help="TCP阶段同时进行的连接数上限")
+    parser.add_argument("--timeout", type=float, default=node_prober.DEFAULT_TIMEOUT, help="每个阶段的超时时间(秒)")
+    parser.add_argument("--plan", action="store_true", help="只显示本轮的调度计划，不探测")
+    parser.add_argument("--top", type=int, default=20, help="与--plan一起使用，显示优先级最高的N个目标")
+
+    args = parser.parse_args()
+
+    if args.plan:
+        conn = node_history.connect(args.db)
+        targets = node_prober.load_targets(conn, args.days)
+        plan = plan_cycle(conn, targets, args.budget)
+        conn.close()
+        print(f"共 {len(targets)} 个目标，本轮调度 {len(plan)} 个")
+        for score, target in plan[:args.top]:
+            print(f"- {score:8.1f}  {target.host}:{target.port}  {target.greeting or ('tls' if target.tls else 'tcp')}")
+    else:
+        run_cycle(args.db, args.budget, args.days, args.concurrency, args.timeout)
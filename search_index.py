@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+客户端搜索索引
+为最近出现的节点、每日订阅和各来源的最新订阅生成倒排索引，浏览器中的 search.js 按需加载分片后直接搜索，
+不需要服务器参与。可以搜索节点名称、地区(代码、英文或中文名称)、协议、服务器地址、来源和日期，
+例如 "日本 trojan"、"jp vmess"、"104.21"、"20250326"
+
+输出 web/search/:
+- index.json: 分片列表和每个分片的ETag(浏览器按ETag缓存分片)
+- terms/{键}.json: 词项 -> 文档ID列表(差分编码)，ASCII词项按首字母分片，中日韩词项按哈希分片
+- docs/{序号}.json: 每DOC_SHARD_SIZE个文档一个分片，文档为紧凑的数组
+- search.js: 搜索客户端
+
+文档ID在多次生成之间保持不变(记录在 results/cache/search_ids.json)，新文档追加在末尾，
+因此只有内容变化的分片会被重写
+"""
+
+import os
+import re
+import json
+import zlib
+import logging
+from datetime import datetime, timedelta
+import site_renderer
+import static_api
+import node_history
+from node_stats import region_from_name, UNKNOWN
+
+logger = logging.getLogger("search_index")
+
+SEARCH_DIR = "web/search"
+IDS_PATH = "results/cache/search_ids.json"
+CLIENT_SOURCE = os.path.join("templates", "search.js")
+# 只索引最近N天出现过的节点
+NODE_DAYS = 7
+DOC_SHARD_SIZE = 500
+# 非ASCII词项的哈希分片数，写入index.json供search.js使用
+HASHED_SHARDS = 16
+# 空洞(已删除的文档)超过一半时重新分配ID
+COMPACT_RATIO = 0.5
+
+# 与search.js中的TOKEN_PATTERN一致: ASCII字母数字串，以及中日韩文字串
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]+")
+
+# 常见地区的英文和中文名称，搜索 "japan" 或 "日本" 也能找到名称中只有 JP 的节点
+REGION_NAMES = {
+    "HK": ("hong kong", "香港"), "TW": ("taiwan", "台湾"), "JP": ("japan", "日本"), "KR": ("korea", "韩国"),
+    "SG": ("singapore", "新加坡"), "US": ("united states usa america", "美国"), "CA": ("canada", "加拿大"),
+    "GB": ("united kingdom uk britain", "英国"), "DE": ("germany", "德国"), "FR": ("france", "法国"),
+    "NL": ("netherlands", "荷兰"), "RU": ("russia", "俄罗斯"), "IN": ("india", "印度"), "AU": ("australia", "澳大利亚"),
+    "TR": ("turkey", "土耳其"), "MY": ("malaysia", "马来西亚"), "TH": ("thailand", "泰国"), "VN": ("vietnam", "越南"),
+    "PH": ("philippines", "菲律宾"), "ID": ("indonesia", "印度尼西亚"), "BR": ("brazil", "巴西"),
+    "IT": ("italy", "意大利"), "ES": ("spain", "西班牙"), "SE": ("sweden", "瑞典"), "FI": ("finland", "芬兰"),
+    "PL": ("poland", "波兰"), "UA": ("ukraine", "乌克兰"), "AE": ("united arab emirates uae", "阿联酋"),
+    "CN": ("china", "中国"), "MO": ("macau macao", "澳门")
+}
+
+
+def tokenize(text):
+    """
+    分词: ASCII部分按字母数字串切分，中日韩文字输出单字和相邻两字
+
+    返回:
+    list: 词项(可能重复)
+    """
+    terms = []
+    for run in TOKEN_PATTERN.findall((text or "").lower()):
+        if run.isascii():
+            terms.append(run)
+        else:
+            terms.extend(run)
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def shard_key(term):
+    """
+    词项所在的分片: ASCII词项为首字符(支持前缀搜索)，其他词项为 x + CRC32哈希
+    """
+    if term[0].isascii():
+        return term[0]
+    return f"x{zlib.crc32(term.encode('utf-8')) % HASHED_SHARDS:x}"
+
+
+def query_terms(query):
+    """
+    把搜索词拆分为匹配条件，所有条件都满足的文档才是结果
+
+    返回:
+    list: [(词项, 是否前缀匹配), ...]，ASCII词项按前缀匹配，中日韩文字按单字(只有一个字时)或相邻两字精确匹配
+    """
+    conditions = []
+    for run in TOKEN_PATTERN.findall((query or "").lower()):
+        if run.isascii():
+            conditions.append((run, True))
+        elif len(run) == 1:
+            conditions.append((run, False))
+        else:
+            conditions.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+    return conditions
+
+
+def node_documents(db_path=node_history.DB_PATH, days=NODE_DAYS):
+    """
+    读取最近出现过的节点
+
+    返回:
+    dict: {文档键: (文档数组, 索引文本)}，文档数组为 ["n", 名称, 协议, 地址:端口, 地区, 来源, 最后出现日期]
+    """
+    if not os.path.exists(db_path):
+        return {}
+    conn = node_history.connect(db_path)
+    try:
+        latest = conn.execute("SELECT MAX(last_seen) FROM nodes").fetchone()[0]
+        if not latest:
+            return {}
+        since = (datetime.strptime(latest, "%Y-%m-%d") - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        has_country = "country" in {row[1] for row in conn.execute("PRAGMA table_info(nodes)")}
+        rows = conn.execute(f"""
+            SELECT fp, type, server, port, name, last_seen, sources{", country" if has_country else ""}
+            FROM nodes WHERE last_seen >= ?
+        """, (since,)).fetchall()
+    finally:
+        conn.close()
+
+    documents = {}
+    for row in rows:
+        region = (has_country and row["country"]) or region_from_name(row["name"])
+        region = "" if region == UNKNOWN else region
+        sources = ",".join(node_history.source_names(row["sources"]))
+        address = f"{row['server']}:{row['port']}"
+        text = " ".join((row["name"] or "", row["type"] or "", address, region, " ".join(REGION_NAMES.get(region, ())),
+                         sources.replace(",", " "), row["last_seen"], row["last_seen"].replace("-", "")))
+        documents[f"n:{row['fp']}"] = (["n", row["name"], row["type"], address, region, sources, row["last_seen"]], text)
+    return documents
+
+
+def subscription_documents(snapshot):
+    """
+    每日订阅和各来源的最新订阅
+
+    返回:
+    dict: {文档键: (文档数组, 索引文本)}，每日订阅为 ["d", 标题, 日期, Clash链接, V2Ray链接]，
+          来源订阅为 ["s", 来源, 更新时间, 订阅链接]
+    """
+    documents = {}
+    for date in site_renderer.date_keys(snapshot.results):
+        result = snapshot.results[date]
+        clash = site_renderer._first(result.get("clash_links"))
+        v2ray = site_renderer._first(result.get("v2ray_links"))
+        title = result.get("title") or date
+        text = " ".join((title, date, f"{date[:4]}-{date[4:6]}-{date[6:8]}", "datiya 订阅",
+                         "clash" if clash else "", "v2ray" if v2ray else ""))
+        documents[f"d:{date}"] = (["d", title, date, clash, v2ray], text)
+
+    for source in site_renderer.SOURCES:
+        prefix = f"{source}_"
+        links = [value for key, value in sorted(snapshot.sources.items())
+                 if key.startswith(prefix) and key.endswith("_link") and isinstance(value, str) and value]
+        if source == "v2rayc":
+            links = [link for _, _, _, group in site_renderer.v2rayc_groups(snapshot.sources.get("v2rayc_data") or {})
+                     for link in group]
+        if not links:
+            continue
+        status = snapshot.status[source]
+        documents[f"s:{source}"] = (["s", source, site_renderer.stable_updated_at(status), links[0]],
+                                    f"{source} 订阅 最新 {' '.join(links)}")
+    return documents
+
+
+def assign_ids(keys, previous):
+    """
+    为文档分配ID: 已有文档沿用原ID，新文档追加在末尾，空洞过多时按键重新编号
+
+    返回:
+    dict: {文档键: ID}
+    """
+    ids = {key: previous[key] for key in keys if key in previous}
+    next_id = max(previous.values(), default=-1) + 1
+    if next_id and len(ids) < next_id * COMPACT_RATIO:
+        ids = {}
+        next_id = 0
+    for key in sorted(set(keys) - set(ids)):
+        ids[key] = next_id
+        next_id += 1
+    return ids
+
+
+def build_index(snapshot, db_path=node_history.DB_PATH, output_dir=SEARCH_DIR, ids_path=IDS_PATH,
+                node_days=NODE_DAYS):
+    """
+    生成搜索索引，只写入内容变化的分片，并删除不再使用的分片
+
+    参数:
+    snapshot (site_renderer.Snapshot): 渲染快照
+    db_path (str): 节点历史库路径
+    output_dir (str): 输出目录
+    ids_path (str): 文档ID表路径
+    node_days (int): 索引最近多少天出现过的节点
+
+    返回:
+    dict: {"documents": 文档数, "terms": 词项数, "shards": 分片数, "written": 写入的文件数}
+    """
+    documents = node_documents(db_path, node_days)
+    documents.update(subscription_documents(snapshot))
+    ids = assign_ids(documents, site_renderer.read_json(ids_path) or {})
+
+    postings = {}
+    doc_shards = {}
+    for key, (record, text) in documents.items():
+        doc_id = ids[key]
+        for term in set(tokenize(text)):
+            postings.setdefault(term, []).append(doc_id)
+        doc_shards.setdefault(doc_id // DOC_SHARD_SIZE, {})[doc_id % DOC_SHARD_SIZE] = record
+
+    term_shards = {}
+    for term, doc_ids in postings.items():
+        doc_ids.sort()
+        # 差分编码，ID相近时JSON更短
+        term_shards.setdefault(shard_key(term), {})[term] = [doc_ids[0]] + [
+            b - a for a, b in zip(doc_ids, doc_ids[1:])]
+
+    files = {}
+    for key, terms in term_shards.items():
+        files[f"terms/{key}.json"] = static_api.encode(terms)
+    for number, records in doc_shards.items():
+        # 已删除的文档位置为null，保持ID与位置对应
+        size = max(records) + 1
+        files[f"docs/{number}.json"] = static_api.encode([records.get(i) for i in range(size)])
+
+    manifest = {
+        "version": 1,
+        "documents": len(documents),
+        "doc_shard_size": DOC_SHARD_SIZE,
+        "hashed_shards": HASHED_SHARDS,
+        "terms": {key: static_api.etag(files[f"terms/{key}.json"]) for key in sorted(term_shards)},
+        "docs": {str(number): static_api.etag(files[f"docs/{number}.json"]) for number in sorted(doc_shards)}
+    }
+    files["index.json"] = static_api.encode(manifest)
+    with open(CLIENT_SOURCE, "r", encoding="utf-8") as f:
+        files["search.js"] = f.read()
+
+    written = sum(site_renderer.write_if_changed(os.path.join(output_dir, name), content)
+                  for name, content in files.items())
+    for directory in ("terms", "docs"):
+        path = os.path.join(output_dir, directory)
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                if name.endswith(".json") and f"{directory}/{name}" not in files:
+                    os.remove(os.path.join(path, name))
+    site_renderer.write_if_changed(ids_path, json.dumps(ids, ensure_ascii=False, sort_keys=True))
+    return {"documents": len(documents), "terms": len(postings), "shards": len(files) - 2, "written": written}
+
+
+def search(query, output_dir=SEARCH_DIR, limit=20):
+    """
+    在已生成的索引中搜索，匹配规则与search.js相同(用于命令行调试)
+
+    返回:
+    list: 文档数组，最近加入索引的文档在前
+    """
+    matched = None
+    for term, prefix in query_terms(query):
+        shard = site_renderer.read_json(os.path.join(output_dir, "terms", f"{shard_key(term)}.json")) or {}
+        doc_ids = set()
+        for candidate, deltas in shard.items():
+            if candidate == term or (prefix and candidate.startswith(term)):
+                doc_id = 0
+                for delta in deltas:
+                    doc_id += delta
+                    doc_ids.add(doc_id)
+        matched = doc_ids if matched is None else matched & doc_ids
+    records = []
+    shards = {}
+    for doc_id in sorted(matched or (), reverse=True)[:limit]:
+        number = doc_id // DOC_SHARD_SIZE
+        if number not in shards:
+            shards[number] = site_renderer.read_json(os.path.join(output_dir, "docs", f"{number}.json")) or []
+        records.append(shards[number][doc_id % DOC_SHARD_SIZE])
+    return records
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="生成客户端搜索索引")
+    parser.add_argument("--data", default=site_renderer.DATA_PATH, help="按日期保存的爬取结果JSON文件")
+    parser.add_argument("--results", default=site_renderer.RESULTS_DIR, help="各来源结果目录")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--output", default=SEARCH_DIR, help="输出目录")
+    parser.add_argument("--days", type=int, default=NODE_DAYS, help="索引最近多少天出现过的节点")
+    parser.add_argument("--query", help="生成后在命令行中搜索(与浏览器中的匹配规则相同)")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = site_renderer.load_snapshot(results_dir=args.results, data_path=args.data)
+    report = build_index(snapshot, args.db, args.output, node_days=args.days)
+    print(f"- {report['documents']} 个文档，{report['terms']} 个词项，{report['shards']} 个分片，"
+          f"本次写入 {report['written']} 个文件")
+    logger.info(f"耗时 {time.perf_counter() - start:.2f} 秒")
+    if args.query:
+        for record in search(args.query, args.output):
+            print(f"- {' | '.join(str(value) for value in record[1:] if value)}")
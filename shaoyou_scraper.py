@@ -7,12 +7,12 @@
 """
 
 import requests
-import re
 import json
 import os
 import logging
 from datetime import datetime
 import traceback  # 添加traceback模块
+from link_extractor import URL_CHARS, compile_extractor, extract, merge_sections, suffix_rule
 
 # 配置日志
 logging.basicConfig(
@@ -26,6 +26,28 @@ logging.basicConfig(
 
 logger = logging.getLogger("shaoyou_scraper")
 
+# README提取规则，导入时编译为一个交替正则，同一位置上排在前面的规则优先
+README_EXTRACTOR = compile_extractor([
+    ("title", r"# (?P<title__name>[^\n]*?)公益免费v2ray节点订阅"),
+    ("no_proxy", r"# 无需代理更新节点订阅"),
+    # 无需代理章节在下一个"#"处结束
+    ("section_end", r"#"),
+    # 客户端表格行，零宽匹配，不影响行内链接的提取
+    ("client_row", r"^(?=\|(?P<client_row__name>[^|\n]*)\|(?P<client_row__platform>[^|\n]*)\|(?P<client_row__url>[^|\n]*)\|)"),
+    # 各类订阅链接共享链接主体，只按结尾区分格式
+    suffix_rule(rf"https?://{URL_CHARS}+?", [
+        ("mihomo", r"mihomo\.yaml"),
+        ("yaml", r"\.yaml"),
+        ("base64", r"\.txt"),
+        ("vless_all", r"vless-all"),
+        ("vless_base64", r"vless-base64"),
+        ("vless_mihomo", r"vless-mihomo")
+    ])
+])
+
+# 作为章节分隔的规则
+README_SECTIONS = ("no_proxy", "section_end")
+
 def scrape_shaoyou():
     """
     爬取周润发公益免费v2ray节点订阅信息
@@ -64,115 +86,54 @@ def scrape_shaoyou():
         logger.info("已保存源文件到debug/debug_shaoyou.md")
         print("已保存源文件到debug/debug_shaoyou.md")
         
+        # 单次扫描README，按命名分组分类所有匹配
+        sections = extract(README_EXTRACTOR, readme_content, README_SECTIONS)
+        
         # 提取标题和描述
-        title_match = re.search(r"# (.*?)公益免费v2ray节点订阅", readme_content)
-        if title_match:
-            title = title_match.group(1) + "公益免费v2ray节点订阅"
+        title_matches = merge_sections(sections, "title")
+        if title_matches:
+            title = title_matches[0][0] + "公益免费v2ray节点订阅"
         else:
             title = "周润发公益免费v2ray节点订阅"
         
         description = "每2小时更新一次，提供免费v2ray节点订阅"
         
         # 提取yaml格式订阅链接
-        yaml_links = []
-        yaml_patterns = [
-            r"https?://[\w\./\-=]+?\.yaml",
-            r"https?://[\w\./\-=]+?/all\.yaml"
-        ]
-        
-        for pattern in yaml_patterns:
-            yaml_matches = re.findall(pattern, readme_content)
-            if yaml_matches:
-                yaml_links.extend(yaml_matches)
-        
-        yaml_links = list(set(yaml_links))  # 去重
+        yaml_links = merge_sections(sections, "yaml")
         logger.info(f"找到 {len(yaml_links)} 个yaml格式订阅链接")
         print(f"找到 {len(yaml_links)} 个yaml格式订阅链接: {yaml_links}")
         
         # 提取base64格式订阅链接
-        base64_links = []
-        base64_patterns = [
-            r"https?://[\w\./\-=]+?\.txt",
-            r"https?://[\w\./\-=]+?/base64\.txt"
-        ]
-        
-        for pattern in base64_patterns:
-            base64_matches = re.findall(pattern, readme_content)
-            if base64_matches:
-                base64_links.extend(base64_matches)
-        
-        base64_links = list(set(base64_links))  # 去重
+        base64_links = merge_sections(sections, "base64")
         logger.info(f"找到 {len(base64_links)} 个base64格式订阅链接")
         print(f"找到 {len(base64_links)} 个base64格式订阅链接: {base64_links}")
         
         # 提取mihomo格式订阅链接
-        mihomo_links = []
-        mihomo_patterns = [
-            r"https?://[\w\./\-=]+?mihomo\.yaml",
-            r"https?://[\w\./\-=]+?/mihomo\.yaml"
-        ]
-        
-        for pattern in mihomo_patterns:
-            mihomo_matches = re.findall(pattern, readme_content)
-            if mihomo_matches:
-                mihomo_links.extend(mihomo_matches)
-        
-        mihomo_links = list(set(mihomo_links))  # 去重
+        mihomo_links = merge_sections(sections, "mihomo")
         logger.info(f"找到 {len(mihomo_links)} 个mihomo格式订阅链接")
         print(f"找到 {len(mihomo_links)} 个mihomo格式订阅链接: {mihomo_links}")
         
         # 查找无需代理的链接
-        no_proxy_section = re.search(r"# 无需代理更新节点订阅([\s\S]+?)(?=#|$)", readme_content)
         no_proxy_links = {
             "yaml": [],
             "base64": [],
             "mihomo": []
         }
         
-        if no_proxy_section:
-            no_proxy_content = no_proxy_section.group(1)
+        if "no_proxy" in sections:
+            no_proxy_content = sections["no_proxy"]
             
-            # 提取无需代理的yaml链接
-            yaml_patterns = [
-                r"(https?://[\w\./\-=]+?vless-all)",
-                r"(https?://[\w\./\-=]+?/all\.yaml)",
-                r"(https?://[\w\./\-=]+?/vless-all)"
+            # 无需代理的链接: vless-*短链接，或者以固定文件名结尾的完整链接
+            no_proxy_links["yaml"] = no_proxy_content.get("vless_all", []) + [
+                link for link in no_proxy_content.get("yaml", []) if link.endswith("/all.yaml")
             ]
-            
-            for pattern in yaml_patterns:
-                yaml_matches = re.findall(pattern, no_proxy_content)
-                if yaml_matches:
-                    no_proxy_links["yaml"].extend(yaml_matches)
-            
-            # 提取无需代理的base64链接
-            base64_patterns = [
-                r"(https?://[\w\./\-=]+?vless-base64)",
-                r"(https?://[\w\./\-=]+?/base64\.txt)",
-                r"(https?://[\w\./\-=]+?/vless-base64)"
+            no_proxy_links["base64"] = no_proxy_content.get("vless_base64", []) + [
+                link for link in no_proxy_content.get("base64", []) if link.endswith("/base64.txt")
             ]
-            
-            for pattern in base64_patterns:
-                base64_matches = re.findall(pattern, no_proxy_content)
-                if base64_matches:
-                    no_proxy_links["base64"].extend(base64_matches)
-            
-            # 提取无需代理的mihomo链接
-            mihomo_patterns = [
-                r"(https?://[\w\./\-=]+?vless-mihomo)",
-                r"(https?://[\w\./\-=]+?/mihomo\.yaml)",
-                r"(https?://[\w\./\-=]+?/vless-mihomo)"
+            no_proxy_links["mihomo"] = no_proxy_content.get("vless_mihomo", []) + [
+                link for link in no_proxy_content.get("mihomo", []) if link.endswith("/mihomo.yaml")
             ]
             
-            for pattern in mihomo_patterns:
-                mihomo_matches = re.findall(pattern, no_proxy_content)
-                if mihomo_matches:
-                    no_proxy_links["mihomo"].extend(mihomo_matches)
-            
-            # 去重
-            no_proxy_links["yaml"] = list(set(no_proxy_links["yaml"]))
-            no_proxy_links["base64"] = list(set(no_proxy_links["base64"]))
-            no_proxy_links["mihomo"] = list(set(no_proxy_links["mihomo"]))
-            
             logger.info(f"找到无需代理链接: yaml {len(no_proxy_links['yaml'])}, base64 {len(no_proxy_links['base64'])}, mihomo {len(no_proxy_links['mihomo'])}")
             print(f"找到无需代理链接:")
             print(f"  yaml: {no_proxy_links['yaml']}")
@@ -180,26 +141,17 @@ def scrape_shaoyou():
             print(f"  mihomo: {no_proxy_links['mihomo']}")
         
         # 提取支持的客户端信息
-        clients_section = re.search(r"\|.*?\|.*?\|.*?\|([\s\S]+?)(?=##|$)", readme_content)
         clients = []
         
-        if clients_section:
-            clients_content = clients_section.group(1)
-            client_pattern = r"\|\s*(.*?)\s*\|\s*(.*?)\s*\|\s*(.*?)\s*\|"
-            client_matches = re.findall(client_pattern, clients_content)
-            
-            for client in client_matches:
-                name = client[0].strip()
-                platform = client[1].strip()
-                url = client[2].strip()
-                
-                if name and platform and url and "http" in url:
-                    clients.append({
-                        "name": name,
-                        "platform": platform,
-                        "url": url.replace("[", "").replace("]", "").replace("(", "").replace(")", "")
-                    })
-            
+        for name, platform, client_url in merge_sections(sections, "client_row"):
+            if name and platform and client_url and "http" in client_url:
+                clients.append({
+                    "name": name,
+                    "platform": platform,
+                    "url": client_url.replace("[", "").replace("]", "").replace("(", "").replace(")", "")
+                })
+        
+        if clients:
             logger.info(f"找到 {len(clients)} 个客户端信息")
             print(f"找到 {len(clients)} 个客户端信息")
             for client in clients:
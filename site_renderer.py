@@ -0,0 +1,758 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+网页渲染
+把爬取结果整理为模板变量，通过template_engine渲染 templates/ 下的模板:
+- index.html: 主页(各来源订阅、统计面板和按日期的节点卡片，卡片使用 partials/date_card.html)
+- simple.html: 简化版页面
+页面内容以流的形式写入文件，日期数量增长时渲染耗时和内存占用都是线性的
+
+渲染只依赖load_snapshot读取的本地数据(web/data.json和results/下各来源的最新结果)，
+不访问网络。缺少数据或数据过旧的来源在页面上显示"暂无数据"/"数据已过期"标记，
+主页渲染有时间预算，超时时保留上一次生成的页面
+
+build_site对每个页面的输入(快照数据、来源状态、统计数据和模板文件)计算指纹并记录在
+results/cache/site_manifest.json中，输入没有变化的页面直接跳过
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from collections import namedtuple
+import template_engine
+
+logger = logging.getLogger("site_renderer")
+
+RESULTS_DIR = "results"
+DATA_PATH = "web/data.json"
+# 结果字典中不是日期的键
+SOURCE_KEYS = ("freev2", "bestclash", "shaoyou", "ripao", "v2rayc", "dates")
+SOURCES = SOURCE_KEYS[:-1]
+# 来源数据超过该时间没有更新时标记为过期
+STALE_HOURS = 48
+# 主页渲染的时间预算(秒)
+RENDER_BUDGET_SECONDS = 10
+# 页面输入指纹清单
+MANIFEST_PATH = "results/cache/site_manifest.json"
+# 日期卡片片段缓存目录，文件名为卡片数据和卡片模板的指纹
+FRAGMENT_DIR = "results/cache/fragments"
+CARD_TEMPLATE = "partials/date_card.html"
+# 主页只展示最近的日期，更早的日期按月分片，由页面按需加载
+LANDING_DATES = 9
+ARCHIVE_DIR = "archive"
+ARCHIVE_TEMPLATE = "archive_month.html"
+# asset_pipeline生成的本地资源清单(相对于输出目录)，不存在时主页从CDN加载资源
+ASSET_MANIFEST = "assets/manifest.json"
+# search_index生成的搜索索引(相对于输出目录)，存在时主页显示搜索框
+SEARCH_INDEX = "search/index.json"
+# v2rayc每种订阅在页面上展示的链接数
+V2RAYC_LINKS_SHOWN = 3
+NODE_COUNT_PATTERN = re.compile(r"\d+")
+# 结果中的爬取时间，例如 "2025-04-05 10:05:07"，备份数据可能带有后缀
+TIMESTAMP_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}(?::\d{2})?)")
+# 模板使用的各来源变量及其默认值，缺少的来源在页面上显示为"暂无"
+SOURCE_DEFAULTS = {
+    "freev2_link": None, "freev2_data": None,
+    "bestclash_github_link": None, "bestclash_mirror_link": None, "bestclash_data": None,
+    "shaoyou_yaml_link": None, "shaoyou_base64_link": None, "shaoyou_mihomo_link": None,
+    "shaoyou_no_proxy_link": None, "shaoyou_data": None,
+    "ripao_clash_link": None, "ripao_v2ray_link": None, "ripao_clash_mirror": None,
+    "ripao_v2ray_mirror": None, "ripao_data": None,
+    "v2rayc_data": None
+}
+
+# nodes_info: [(键, 值), ...]，node_list_count: 节点信息为列表时的节点数
+DateCard = namedtuple("DateCard", ["date", "formatted_date", "title", "update_time", "nodes_info",
+                                   "node_list_count", "clash_links", "v2ray_links"])
+SimpleRow = namedtuple("SimpleRow", ["date", "clash_count", "v2ray_count", "node_count"])
+# state: ok/stale/missing，note: 简化版页面中显示的说明，
+# from_data: updated_at取自数据中的爬取时间(False表示只能使用文件修改时间，CI检出后不可靠)
+SourceStatus = namedtuple("SourceStatus", ["state", "updated_at", "age_hours", "note", "from_data"])
+# results: {日期: 结果}，sources: 模板使用的各来源变量，status: {来源: SourceStatus}
+Snapshot = namedtuple("Snapshot", ["results", "sources", "status"])
+# dates: 按展示顺序排列的日期，cards/fragment_names: {日期: DateCard/片段文件名}，months: {月份: [日期, ...]}
+Layout = namedtuple("Layout", ["dates", "cards", "fragment_names", "months"])
+
+
+def read_json(path):
+    """
+    读取JSON文件，文件不存在或内容损坏时返回None(损坏时记录警告)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"读取 {path} 时出错: {e}")
+        return None
+
+
+def _read_text(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"读取 {path} 时出错: {e}")
+        return None
+
+
+def _newest_json(directory, exclude=()):
+    """
+    按文件名(包含时间戳)找出目录中最新的JSON结果文件
+    """
+    try:
+        names = sorted((name for name in os.listdir(directory) if name.endswith(".json") and name not in exclude),
+                       reverse=True)
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, names[0]) if names else None
+
+
+def data_timestamp(data):
+    """
+    从结果数据的 scrape_time / update_time 字段取得时间戳
+
+    CI每次检出代码都会重置文件修改时间，数据中记录的时间才能反映来源实际的更新时间
+
+    返回:
+    float: Unix时间戳，没有可解析的时间字段时返回None
+    """
+    for key in ("scrape_time", "update_time"):
+        match = TIMESTAMP_PATTERN.search(str((data or {}).get(key) or ""))
+        if match:
+            try:
+                return datetime.fromisoformat(f"{match.group(1)} {match.group(2)}").timestamp()
+            except ValueError:
+                continue
+    return None
+
+
+def stable_updated_at(status):
+    """
+    可以写入带指纹或ETag的输出的来源更新时间
+
+    返回:
+    str: 数据中记录的更新时间，只能使用文件修改时间(每次检出后都会变化)时返回None
+    """
+    return status.updated_at if status.from_data else None
+
+
+def _first(links):
+    return links[0] if isinstance(links, list) and links else None
+
+
+def load_sources(results_dir=RESULTS_DIR, stored=None):
+    """
+    读取各来源最近一次爬取的结果，只读取本地文件
+
+    参数:
+    results_dir (str): 各来源结果目录
+    stored (dict, optional): data.json的内容，来源结果中没有时间字段时使用其中同名来源条目的爬取时间
+
+    返回:
+    tuple: (模板变量字典, {来源: (数据更新时间, 是否取自数据)，没有数据时为None})
+    """
+    sources = {}
+    timestamps = {}
+
+    def used(source, *paths, data=None):
+        # 优先使用数据中记录的爬取时间，只有数据中都没有时间字段时才使用文件修改时间
+        timestamp = data_timestamp(data)
+        if timestamp is None and isinstance((stored or {}).get(source), dict):
+            timestamp = data_timestamp(stored[source])
+        if timestamp is not None:
+            timestamps[source] = (timestamp, True)
+            return
+        existing = [os.path.getmtime(path) for path in paths if path and os.path.exists(path)]
+        timestamps[source] = (max(existing), False) if existing else None
+
+    directory = os.path.join(results_dir, "freev2")
+    link_path = os.path.join(directory, "freev2_latest.txt")
+    data_path = _newest_json(directory)
+    sources["freev2_link"] = _read_text(link_path)
+    sources["freev2_data"] = read_json(data_path) if data_path else None
+    if not sources["freev2_link"] and sources["freev2_data"]:
+        sources["freev2_link"] = sources["freev2_data"].get("subscription_link") or None
+    used("freev2", link_path if sources["freev2_link"] else None, data_path if sources["freev2_data"] else None,
+         data=sources["freev2_data"])
+
+    directory = os.path.join(results_dir, "bestclash")
+    link_path = os.path.join(directory, "bestclash_latest.txt")
+    data_path = _newest_json(directory)
+    data = read_json(data_path) if data_path else None
+    sources["bestclash_data"] = data
+    sources["bestclash_github_link"] = _read_text(link_path) or (data or {}).get("github_link")
+    sources["bestclash_mirror_link"] = (data or {}).get("mirror_link")
+    used("bestclash", link_path, data_path if data else None, data=data)
+
+    directory = os.path.join(results_dir, "shaoyou")
+    link_path = os.path.join(directory, "shaoyou_latest.txt")
+    data_path = _newest_json(directory, exclude=("shaoyou_latest.json",))
+    data = read_json(data_path) if data_path else None
+    links = read_json(link_path) or {}
+    sources["shaoyou_data"] = data
+    sources["shaoyou_yaml_link"] = links.get("yaml") or _first((data or {}).get("yaml_links"))
+    sources["shaoyou_base64_link"] = links.get("base64") or _first((data or {}).get("base64_links"))
+    sources["shaoyou_mihomo_link"] = links.get("mihomo") or _first((data or {}).get("mihomo_links"))
+    sources["shaoyou_no_proxy_link"] = (links.get("no_proxy_yaml")
+                                        or _first(((data or {}).get("no_proxy_links") or {}).get("yaml")))
+    used("shaoyou", link_path if links else None, data_path if data else None, data=data)
+
+    data_path = os.path.join(results_dir, "ripao", "ripao_latest.json")
+    data = read_json(data_path)
+    sources["ripao_data"] = data
+    for key in ("clash_link", "v2ray_link", "clash_mirror", "v2ray_mirror"):
+        sources[f"ripao_{key}"] = (data or {}).get(key)
+    used("ripao", data_path if data else None, data=data)
+
+    # 最新文件损坏时使用最近的备份
+    directory = os.path.join(results_dir, "v2rayc")
+    data_path = os.path.join(directory, "v2rayc_latest.json")
+    data = read_json(data_path)
+    if data is None:
+        data_path = _newest_json(directory, exclude=("v2rayc_latest.json",))
+        data = read_json(data_path) if data_path else None
+    sources["v2rayc_data"] = data
+    used("v2rayc", data_path if data else None, data=data)
+    return sources, timestamps
+
+
+def source_status(timestamps, now=None, stale_hours=STALE_HOURS):
+    """
+    根据数据更新时间判断各来源数据是否过期
+
+    返回:
+    dict: {来源: SourceStatus}
+    """
+    now = now or time.time()
+    status = {}
+    for source in SOURCES:
+        if timestamps.get(source) is None:
+            status[source] = SourceStatus("missing", None, None, "(暂无数据)", False)
+            continue
+        timestamp, from_data = timestamps[source]
+        age_hours = max(0, int((now - timestamp) // 3600))
+        updated_at = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+        if age_hours >= stale_hours:
+            status[source] = SourceStatus("stale", updated_at, age_hours, f"(数据已过期，最后更新于 {updated_at})",
+                                           from_data)
+        else:
+            status[source] = SourceStatus("ok", updated_at, age_hours, "", from_data)
+    return status
+
+
+def load_snapshot(results=None, results_dir=RESULTS_DIR, data_path=DATA_PATH):
+    """
+    读取渲染页面所需的全部本地数据
+
+    参数:
+    results (dict, optional): 本次运行的爬取结果，其中的日期结果覆盖data.json中的同名日期，来源条目会被忽略
+    results_dir (str): 各来源结果目录
+    data_path (str): 按日期保存的爬取结果
+
+    返回:
+    Snapshot: 渲染快照
+    """
+    dates = {}
+    data = read_json(data_path) or {}
+    for stored in (data, results or {}):
+        dates.update((key, value) for key, value in stored.items()
+                     if key not in SOURCE_KEYS and isinstance(value, dict))
+    sources, timestamps = load_sources(results_dir, data)
+    return Snapshot(dates, sources, source_status(timestamps))
+
+
+def date_keys(results):
+    """
+    获取要展示的日期列表，优先使用结果中的dates数组，否则按日期倒序
+
+    返回:
+    list: 日期列表，只包含结果中存在的日期
+    """
+    if isinstance(results.get("dates"), list) and results["dates"]:
+        keys = results["dates"]
+    else:
+        keys = sorted((key for key in results if key not in SOURCE_KEYS), reverse=True)
+    return [key for key in keys if isinstance(results.get(key), dict)]
+
+
+def node_count(nodes_info):
+    """
+    从节点信息中提取节点数量，字典取第一个包含"节点"的键中的数字，列表取长度
+    """
+    if isinstance(nodes_info, list):
+        return len(nodes_info)
+    if isinstance(nodes_info, dict):
+        for key, value in nodes_info.items():
+            if "节点" in key:
+                match = NODE_COUNT_PATTERN.search(str(value))
+                if match:
+                    return int(match.group())
+    return 0
+
+
+def site_totals(results, dates):
+    """
+    统计日期数、订阅链接数和节点数
+
+    参数:
+    results (dict): 爬取结果
+    dates (list): date_keys返回的日期列表
+
+    返回:
+    dict: 模板中统计卡片使用的变量
+    """
+    total_clash_links = sum(len(results[date].get("clash_links", [])) for date in dates)
+    total_v2ray_links = sum(len(results[date].get("v2ray_links", [])) for date in dates)
+    total_nodes = sum(node_count(results[date].get("nodes_info")) for date in dates)
+    return {
+        "total_dates": len(dates),
+        "total_clash_links": total_clash_links,
+        "total_v2ray_links": total_v2ray_links,
+        "total_nodes": total_nodes,
+        "average_nodes": total_nodes // len(dates) if dates else 0,
+        "earliest_date": min(dates) if dates else "N/A",
+        "latest_date": max(dates) if dates else "N/A"
+    }
+
+
+def date_card(date, result):
+    """
+    生成一个日期卡片的模板变量
+
+    参数:
+    date (str): 日期，例如 20250101
+    result (dict): 该日期的爬取结果
+
+    返回:
+    DateCard: 卡片数据
+    """
+    nodes_info = result.get("nodes_info")
+    return DateCard(
+        date=date,
+        formatted_date=f"{date[:4]}-{date[4:6]}-{date[6:8]}" if len(date) >= 8 else date,
+        title=result.get("title") or f"日期 {date} 的节点数据",
+        update_time=result.get("update_time", "未知"),
+        nodes_info=list(nodes_info.items()) if isinstance(nodes_info, dict) else [],
+        node_list_count=len(nodes_info) if isinstance(nodes_info, list) else 0,
+        clash_links=result.get("clash_links") or [],
+        v2ray_links=result.get("v2ray_links") or []
+    )
+
+
+def v2rayc_groups(v2rayc_data):
+    """
+    v2rayc的三种订阅: [(类型, 名称, 图标, 链接列表), ...]
+    """
+    v2rayc_data = v2rayc_data or {}
+    return [
+        ("clash", "Clash", "bi-intersect", (v2rayc_data.get("clash_links") or [])[:V2RAYC_LINKS_SHOWN]),
+        ("v2ray", "V2Ray", "bi-hdd-network", (v2rayc_data.get("v2ray_links") or [])[:V2RAYC_LINKS_SHOWN]),
+        ("singbox", "Sing-box", "bi-box", (v2rayc_data.get("singbox_links") or [])[:V2RAYC_LINKS_SHOWN])
+    ]
+
+
+def month_key(date):
+    """
+    日期所属的存档月份，例如 20250101 -> 2025-01，无法识别的日期归入 other
+    """
+    return f"{date[:4]}-{date[4:6]}" if len(date) >= 6 and date[:6].isdigit() else "other"
+
+
+def site_layout(snapshot):
+    """
+    计算页面布局: 全部日期、每个日期的卡片数据和片段名称，以及按月分组
+
+    片段名称是卡片数据和卡片模板的指纹，同时用于片段缓存、存档分片指纹和清理过期片段
+
+    返回:
+    Layout: 页面布局
+    """
+    dates = date_keys(snapshot.results)
+    partials = templates_digest(os.path.join(template_engine.TEMPLATE_DIR, "partials"))
+    cards = {}
+    fragment_names = {}
+    months = {}
+    for date in dates:
+        card = date_card(date, snapshot.results[date])
+        cards[date] = card
+        fragment_names[date] = fingerprint(partials, card)[:32] + ".html"
+        months.setdefault(month_key(date), []).append(date)
+    return Layout(dates, cards, fragment_names, dict(sorted(months.items(), reverse=True)))
+
+
+def card_fragments(layout, dates, fragment_dir=FRAGMENT_DIR):
+    """
+    获取日期卡片的HTML片段，已缓存的卡片直接读取，只渲染新增或内容变化的卡片
+
+    过去日期的记录不会再变化，历史越长缓存命中率越高，渲染耗时只与变化的日期数相关
+
+    参数:
+    layout (Layout): 页面布局
+    dates (list): 需要的日期
+    fragment_dir (str): 片段缓存目录，为None时不使用缓存
+
+    返回:
+    tuple: (HTML片段列表, 新渲染的卡片数)
+    """
+    if fragment_dir is None:
+        return [template_engine.render_to_string(CARD_TEMPLATE, {"card": layout.cards[date]})
+                for date in dates], len(dates)
+
+    fragments = []
+    rendered = 0
+    for date in dates:
+        path = os.path.join(fragment_dir, layout.fragment_names[date])
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                fragments.append(f.read())
+            continue
+        except FileNotFoundError:
+            pass
+        fragment = template_engine.render_to_string(CARD_TEMPLATE, {"card": layout.cards[date]})
+        write_if_changed(path, fragment)
+        fragments.append(fragment)
+        rendered += 1
+    return fragments, rendered
+
+
+def prune_fragments(layout, fragment_dir=FRAGMENT_DIR):
+    """
+    删除不再对应任何日期记录的片段(记录被修改或卡片模板变化之后)
+
+    返回:
+    int: 删除的文件数
+    """
+    if not os.path.isdir(fragment_dir):
+        return 0
+    used = set(layout.fragment_names.values())
+    removed = 0
+    for name in os.listdir(fragment_dir):
+        if name.endswith(".html") and name not in used:
+            os.remove(os.path.join(fragment_dir, name))
+            removed += 1
+    return removed
+
+
+def index_context(snapshot, stats_panel_html="", layout=None, fragment_dir=FRAGMENT_DIR, assets=None, search=False):
+    """
+    生成主页模板变量，主页只包含最近LANDING_DATES个日期的卡片，更早的日期按月列出存档
+
+    参数:
+    snapshot (Snapshot): 渲染快照
+    stats_panel_html (str): 节点统计面板HTML
+    layout (Layout, optional): 页面布局，默认根据快照计算
+    fragment_dir (str): 日期卡片片段缓存目录，为None时不使用缓存
+    assets (dict, optional): 本地资源清单，为None时使用CDN
+    search (bool): 是否已生成搜索索引
+
+    返回:
+    dict: 模板变量
+    """
+    layout = layout or site_layout(snapshot)
+    landing = layout.dates[:LANDING_DATES]
+    v2rayc_data = snapshot.sources.get("v2rayc_data") or {}
+    context = dict(SOURCE_DEFAULTS, **snapshot.sources)
+    context["status"] = snapshot.status
+    context.update(site_totals(snapshot.results, layout.dates))
+    context.update({
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "v2rayc_update_time": v2rayc_data.get("update_time", v2rayc_data.get("scrape_time", "未知")),
+        "v2rayc_groups": v2rayc_groups(v2rayc_data),
+        "stats_panel_html": stats_panel_html,
+        "archive_months": [(month, len(dates)) for month, dates in layout.months.items()],
+        "assets": assets,
+        "search": search
+    })
+    context["cards"], rendered = card_fragments(layout, landing, fragment_dir)
+    if landing:
+        logger.info(f"主页日期卡片: {len(landing)} 个，新渲染 {rendered} 个")
+    return context
+
+
+def simple_context(snapshot):
+    """
+    生成简化版页面模板变量
+    """
+    results = snapshot.results
+    v2rayc_data = snapshot.sources.get("v2rayc_data") or {}
+    context = dict(SOURCE_DEFAULTS, **snapshot.sources)
+    context["status"] = snapshot.status
+    context.update({
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "v2rayc_update_time": v2rayc_data.get("update_time", v2rayc_data.get("scrape_time", "未知")),
+        "v2rayc_groups": v2rayc_groups(v2rayc_data),
+        "rows": [SimpleRow(results[date].get("date", date), len(results[date].get("clash_links") or []),
+                           len(results[date].get("v2ray_links") or []), node_count(results[date].get("nodes_info")))
+                 for date in date_keys(results)]
+    })
+    return context
+
+
+def render_index(snapshot, stats_panel_html="", path="web/index.html", budget=RENDER_BUDGET_SECONDS,
+                 layout=None, fragment_dir=FRAGMENT_DIR, assets=None, search=False):
+    """
+    渲染主页，超过时间预算时抛出template_engine.RenderTimeout并保留原有页面
+
+    返回:
+    int: 写入的字符数
+    """
+    deadline = time.monotonic() + budget if budget else None
+    context = index_context(snapshot, stats_panel_html, layout, fragment_dir, assets, search)
+    return template_engine.render_to_file("index.html", path, context, deadline=deadline)
+
+
+def render_month(snapshot, layout, month, output_dir="web", fragment_dir=FRAGMENT_DIR):
+    """
+    生成一个月的存档分片: archive/YYYY-MM.html(日期卡片，供主页按需加载)和 archive/YYYY-MM.json(原始记录)
+
+    返回:
+    int: 新渲染的卡片数
+    """
+    dates = layout.months[month]
+    fragments, rendered = card_fragments(layout, dates, fragment_dir)
+    template_engine.render_to_file(ARCHIVE_TEMPLATE, os.path.join(output_dir, ARCHIVE_DIR, f"{month}.html"),
+                                   {"month": month, "cards": fragments})
+    records = {"month": month, "dates": {date: snapshot.results[date] for date in dates}}
+    write_if_changed(os.path.join(output_dir, ARCHIVE_DIR, f"{month}.json"),
+                     json.dumps(records, ensure_ascii=False, sort_keys=True, separators=(",", ":")))
+    return rendered
+
+
+def render_simple(snapshot, path="web/simple.html"):
+    """
+    渲染简化版页面
+
+    返回:
+    int: 写入的字符数
+    """
+    return template_engine.render_to_file("simple.html", path, simple_context(snapshot))
+
+
+def write_if_changed(path, content):
+    """
+    内容与现有文件不同时才写入(先写临时文件再替换)
+
+    参数:
+    path (str): 文件路径
+    content (str): 文件内容
+
+    返回:
+    bool: 是否写入了文件
+    """
+    data = content.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return True
+
+
+def templates_digest(directory=template_engine.TEMPLATE_DIR):
+    """
+    计算模板目录下所有文件内容的摘要，模板修改后页面需要重新生成
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, directory).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def fingerprint(*inputs):
+    """
+    计算页面输入的指纹，输入需要可以序列化为JSON(namedtuple按列表处理)
+    """
+    payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def page_fingerprints(snapshot, layout, stats_key=None, assets=None, search=False):
+    """
+    计算各输出文件的输入指纹
+
+    页面中的生成时间和来源数据的"距今小时数"不计入指纹，否则每次构建都会变化
+
+    参数:
+    snapshot (Snapshot): 渲染快照
+    layout (Layout): 页面布局
+    stats_key: 统计面板的输入(去掉生成时间等易变字段的统计数据)
+    assets (dict, optional): 本地资源清单
+    search (bool): 是否已生成搜索索引
+
+    返回:
+    dict: {输出文件(相对于输出目录): 指纹}，存档分片的键为 archive/YYYY-MM
+    """
+    status = {source: (item.state, stable_updated_at(item)) for source, item in snapshot.status.items()}
+    templates = templates_digest()
+    landing = [layout.fragment_names[date] for date in layout.dates[:LANDING_DATES]]
+    months = [(month, len(dates)) for month, dates in layout.months.items()]
+    fingerprints = {
+        "index.html": fingerprint("index.html", templates, landing, months,
+                                  site_totals(snapshot.results, layout.dates), snapshot.sources, status, stats_key,
+                                  assets, search),
+        "simple.html": fingerprint("simple.html", templates, snapshot.results, snapshot.sources, status)
+    }
+    for month, dates in layout.months.items():
+        fingerprints[f"{ARCHIVE_DIR}/{month}"] = fingerprint(
+            "archive", templates, [(date, snapshot.results[date]) for date in dates])
+    return fingerprints
+
+
+def build_site(snapshot, stats_panel_html="", stats_key=None, output_dir="web", manifest_path=MANIFEST_PATH,
+               force=False, budget=RENDER_BUDGET_SECONDS, fragment_dir=FRAGMENT_DIR):
+    """
+    增量生成页面: 只重新生成输入指纹发生变化(或文件不存在)的主页、简化版页面和月度存档分片
+
+    参数:
+    snapshot (Snapshot): 渲染快照
+    stats_panel_html (str): 节点统计面板HTML
+    stats_key: 统计面板的输入，用于计算主页指纹
+    output_dir (str): 输出目录
+    manifest_path (str): 指纹清单路径
+    force (bool): 忽略指纹全部重新生成
+    budget (float): 主页渲染时间预算(秒)
+    fragment_dir (str): 日期卡片片段缓存目录
+
+    返回:
+    dict: {输出文件: "rebuilt" 或 "unchanged"}
+    """
+    os.makedirs(fragment_dir, exist_ok=True)
+    manifest = read_json(manifest_path) or {}
+    layout = site_layout(snapshot)
+    assets = read_json(os.path.join(output_dir, ASSET_MANIFEST))
+    assets = {"css": assets["css"], "js": assets["js"]} if assets else None
+    search = os.path.exists(os.path.join(output_dir, SEARCH_INDEX))
+    fingerprints = page_fingerprints(snapshot, layout, stats_key, assets, search)
+    report = {}
+    for name, digest in fingerprints.items():
+        path = os.path.join(output_dir, name)
+        target = path + ".html" if name.startswith(f"{ARCHIVE_DIR}/") else path
+        if not force and manifest.get(path) == digest and os.path.exists(target):
+            report[name] = "unchanged"
+            continue
+        if name == "index.html":
+            render_index(snapshot, stats_panel_html, path, budget, layout, fragment_dir, assets, search)
+        elif name == "simple.html":
+            render_simple(snapshot, path)
+        else:
+            render_month(snapshot, layout, name.split("/", 1)[1], output_dir, fragment_dir)
+        manifest[path] = digest
+        report[name] = "rebuilt"
+        # 每个文件生成后立即更新清单，后面的文件失败时不影响已生成的文件
+        write_if_changed(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True))
+
+    archive = {
+        "months": [{"month": month, "dates": len(dates), "html": f"{month}.html", "json": f"{month}.json"}
+                   for month, dates in layout.months.items()]
+    }
+    write_if_changed(os.path.join(output_dir, ARCHIVE_DIR, "index.json"),
+                     json.dumps(archive, ensure_ascii=False, indent=2))
+    prune_fragments(layout, fragment_dir)
+    return report
+
+
+def sample_results(count, links_per_date=3):
+    """
+    生成用于基准测试的模拟爬取结果
+    """
+    results = {}
+    for i in range(count):
+        date = (datetime(2020, 1, 1) + timedelta(days=i)).strftime("%Y%m%d")
+        results[date] = {
+            "title": f"{date} 免费节点",
+            "update_time": f"{date[:4]}-{date[4:6]}-{date[6:8]} 08:00:00",
+            "clash_links": [f"https://example.com/{date}/clash-{j}.yaml?token=a&b" for j in range(links_per_date)],
+            "v2ray_links": [f"https://example.com/{date}/v2ray-{j}.txt" for j in range(links_per_date)],
+            "nodes_info": {"可用节点": f"{i % 90 + 10}个", "节点类型": "vmess/trojan/ss"}
+        }
+    results["dates"] = sorted(results, reverse=True)
+    return results
+
+
+def benchmark(counts=(1000, 2000, 4000)):
+    """
+    生成不同日期数量的站点并计时: 先在空的片段缓存上完整生成一次(主页和全部月度分片)，
+    再模拟第二天新增一个日期后重新生成(只有主页和当月分片需要重新生成)
+
+    返回:
+    list: [(日期数, 完整生成耗时秒, 新增一个日期后的耗时秒, 主页字节数, 分片数), ...]
+    """
+    timings = []
+    with tempfile.TemporaryDirectory() as directory:
+        # 预热一次，使模板编译不计入计时
+        render_index(Snapshot(sample_results(1), {}, source_status({})), path=os.path.join(directory, "index.html"),
+                     budget=None, fragment_dir=None)
+        for count in counts:
+            output_dir = os.path.join(directory, f"web-{count}")
+            cache = {
+                "manifest_path": os.path.join(directory, f"manifest-{count}.json"),
+                "fragment_dir": os.path.join(directory, f"fragments-{count}")
+            }
+            results = sample_results(count + 1)
+            latest = results["dates"][0]
+            previous = {date: result for date, result in results.items() if date not in (latest, "dates")}
+            start = time.perf_counter()
+            build_site(Snapshot(previous, {}, source_status({})), output_dir=output_dir, budget=None, **cache)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            report = build_site(Snapshot(results, {}, source_status({})), output_dir=output_dir, budget=None, **cache)
+            warm = time.perf_counter() - start
+            shards = sum(name.startswith(f"{ARCHIVE_DIR}/") for name in report)
+            timings.append((count, cold, warm, os.path.getsize(os.path.join(output_dir, "index.html")), shards))
+    return timings
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="渲染网页")
+    parser.add_argument("--data", default=DATA_PATH, help="按日期保存的爬取结果JSON文件")
+    parser.add_argument("--results", default=RESULTS_DIR, help="各来源结果目录")
+    parser.add_argument("--output", default="web", help="输出目录")
+    parser.add_argument("--budget", type=float, default=RENDER_BUDGET_SECONDS, help="主页渲染时间预算(秒)")
+    parser.add_argument("--force", action="store_true", help="忽略输入指纹，重新生成所有页面")
+    parser.add_argument("--benchmark", type=int, nargs="*", metavar="DATES",
+                        help="基准测试: 渲染指定日期数量(默认1000 2000 4000)的模拟数据")
+
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        logging.getLogger("site_renderer").setLevel(logging.WARNING)
+        for count, cold, warm, size, shards in benchmark(args.benchmark or (1000, 2000, 4000)):
+            print(f"- {count} 个日期: 完整生成 {cold * 1000:.1f} 毫秒，新增1个日期后 {warm * 1000:.1f} 毫秒"
+                  f"(只重新生成主页和当月分片)，主页 {size / 1024:.0f} KB，{shards} 个月度分片")
+    else:
+        start = time.perf_counter()
+        snapshot = load_snapshot(results_dir=args.results, data_path=args.data)
+        report = build_site(snapshot, output_dir=args.output, force=args.force, budget=args.budget)
+        for source, status in snapshot.status.items():
+            if status.state != "ok":
+                logger.warning(f"{source}: {status.note}")
+        for name, state in report.items():
+            if state == "rebuilt":
+                print(f"- {os.path.join(args.output, name)}: 已重新生成")
+        print(f"- 输入未变化，跳过 {sum(state == 'unchanged' for state in report.values())} 个文件")
+        logger.info(f"{len(snapshot.results)} 个日期，耗时 {time.perf_counter() - start:.2f} 秒")
@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+来源插件注册表
+每个来源实现同一组步骤 discover → fetch → extract → download，并声明更新频率、访问的主机和并发上限。
+流水线(pipeline.py)、定时任务和命令行都只通过注册表使用来源，新增来源只需要写一个爬虫模块并在这里注册一个Source
+
+步骤都是普通函数(已有的爬虫基于requests)，异步接口通过asyncio.to_thread在线程中调用:
+- discover(force) -> list: 本次需要处理的工作项，单页面来源返回 [None]，force为True时包括已处理过的工作项
+- fetch(item) -> 原始结果或None: 访问网络爬取一个工作项，返回None时按来源声明的次数重试
+- extract(item, raw) -> 记录或None: 整理并保存结果，记录交给download
+- save(records): 可选，全部工作项整理完成后一次性保存(例如多个日期写入同一个data.json)
+- download(record) -> list: 下载订阅文件，返回文件路径列表
+"""
+
+import json
+import random
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+import site_renderer
+import github_monitor
+import datiya_scraper
+import bestclash_scraper
+
+logger = logging.getLogger("source_registry")
+
+# every/unit对应schedule库的 schedule.every(every).<unit>，at为每天的固定时间(unit为days时可用)
+Cadence = namedtuple("Cadence", ["every", "unit", "at"])
+# name: 来源名(与结果目录、命令行参数相同)，title: 日志中显示的名称，
+# hosts: 访问的主要主机，同一主机在所有来源之间共享并发名额，concurrency: 同时处理的工作项数，
+# retries: fetch返回None或出错时的最多尝试次数，download为None时来源没有订阅文件需要下载，
+# save为None时extract已经保存了结果
+Source = namedtuple("Source", ["name", "title", "cadence", "hosts", "concurrency", "retries",
+                               "discover", "fetch", "extract", "download", "save"], defaults=(None,))
+
+# 每个主机同时进行的请求数
+HOST_CONCURRENCY = 4
+# 重试间隔(秒)，实际等待时间在0.5到1.5倍之间随机
+RETRY_DELAY = 5
+
+REGISTRY = {}
+_host_slots = {}
+_host_lock = threading.Lock()
+
+
+def register(source):
+    """
+    注册来源，同名来源会被替换
+    """
+    REGISTRY[source.name] = source
+    return source
+
+
+def registered(names=None):
+    """
+    按注册顺序返回来源
+
+    参数:
+    names (list, optional): 只返回这些来源
+
+    返回:
+    list: Source列表
+    """
+    for name in names or ():
+        if name not in REGISTRY:
+            raise ValueError(f"未知或未启用的来源: {name}")
+    return [source for name, source in REGISTRY.items() if not names or name in names]
+
+
+def schedule_source(scheduler, source, job):
+    """
+    按来源声明的频率把任务加入schedule调度器
+
+    参数:
+    scheduler: schedule模块或schedule.Scheduler
+    source (Source): 来源
+    job (callable): 要执行的任务
+
+    返回:
+    schedule.Job: 已加入的任务
+    """
+    cadence = getattr(scheduler.every(source.cadence.every), source.cadence.unit)
+    if source.cadence.at:
+        cadence = cadence.at(source.cadence.at)
+    return cadence.do(job)
+
+
+def describe_cadence(cadence):
+    """
+    更新频率的文字说明，例如 "每6小时"、"每天00:00"
+    """
+    units = {"minutes": "分钟", "hours": "小时", "days": "天"}
+    every = "" if cadence.every == 1 else cadence.every
+    return f"每{every}{units.get(cadence.unit, cadence.unit)}" + (cadence.at or "")
+
+
+def _host_slot(host):
+    with _host_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(HOST_CONCURRENCY)
+        return _host_slots[host]
+
+
+def _with_hosts(hosts, func, *args):
+    # 按固定顺序占用名额，避免两个来源互相等待
+    slots = [_host_slot(host) for host in sorted(hosts)]
+    for slot in slots:
+        slot.acquire()
+    try:
+        return func(*args)
+    finally:
+        for slot in reversed(slots):
+            slot.release()
+
+
+async def discover(source, force=False):
+    """
+    列出来源本次需要处理的工作项
+    """
+    items = await asyncio.to_thread(_with_hosts, source.hosts, source.discover, force)
+    return list(items or [])
+
+
+def _label(item):
+    # datiya的工作项为 (日期, 节点数)，日志中只显示日期
+    if item is None:
+        return ""
+    return " " + str(item[0] if isinstance(item, tuple) else item)
+
+
+async def _fetch_one(source, item):
+    for attempt in range(source.retries):
+        try:
+            raw = await asyncio.to_thread(_with_hosts, source.hosts, source.fetch, item)
+            if raw is not None:
+                return raw
+            logger.warning(f"{source.title}{_label(item)} 返回空结果 (尝试 {attempt + 1}/{source.retries})")
+        except Exception as e:
+            logger.warning(f"{source.title}{_label(item)} 出错: {e} (尝试 {attempt + 1}/{source.retries})")
+        if attempt < source.retries - 1:
+            await asyncio.sleep(RETRY_DELAY * random.uniform(0.5, 1.5))
+    return None
+
+
+async def collect(source, items):
+    """
+    爬取并整理全部工作项，同时处理的工作项数不超过来源声明的并发上限，
+    来源声明了save时最后一次性保存全部记录
+
+    返回:
+    list: 成功得到的记录
+    """
+    semaphore = asyncio.Semaphore(max(1, source.concurrency))
+
+    async def one(item):
+        async with semaphore:
+            raw = await _fetch_one(source, item)
+            if raw is None:
+                logger.error(f"爬取{source.title}{_label(item)} 失败")
+                return None
+            try:
+                return await asyncio.to_thread(source.extract, item, raw)
+            except Exception as e:
+                logger.exception(f"整理{source.title}{_label(item)} 的结果时出错: {e}")
+                return None
+
+    records = await asyncio.gather(*(one(item) for item in items))
+    records = [record for record in records if record is not None]
+    if source.save and records:
+        await asyncio.to_thread(source.save, records)
+    return records
+
+
+async def download(source, records):
+    """
+    下载全部记录的订阅文件
+
+    返回:
+    list: 下载的文件路径
+    """
+    if source.download is None:
+        return []
+    semaphore = asyncio.Semaphore(max(1, source.concurrency))
+
+    async def one(record):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(_with_hosts, source.hosts, source.download, record) or []
+            except Exception as e:
+                logger.exception(f"下载{source.title}订阅文件时出错: {e}")
+                return []
+
+    files = await asyncio.gather(*(one(record) for record in records))
+    return [path for paths in files for path in paths]
+
+
+async def run_source(source, download_files=True, force=False):
+    """
+    依次运行一个来源的全部步骤
+
+    返回:
+    dict: {"items": 工作项数, "records": 记录列表, "files": 下载的文件列表}
+    """
+    items = await discover(source, force)
+    records = await collect(source, items)
+    files = await download(source, records) if download_files else []
+    logger.info(f"{source.title}: {len(items)} 个工作项，{len(records)} 条记录，下载 {len(files)} 个文件")
+    return {"items": len(items), "records": records, "files": files}
+
+
+async def run_sources(names=None, download_files=True, force=False):
+    """
+    并发运行多个来源，某个来源出错不影响其他来源
+
+    返回:
+    dict: {来源名: run_source的返回值，出错时为None}
+    """
+    sources = registered(names)
+    reports = await asyncio.gather(*(run_source(source, download_files, force) for source in sources),
+                                   return_exceptions=True)
+    results = {}
+    for source, report in zip(sources, reports):
+        if isinstance(report, Exception):
+            logger.error(f"运行{source.title}时出错: {report}")
+            report = None
+        results[source.name] = report
+    return results
+
+
+def run(names=None, download_files=True, force=False):
+    """
+    run_sources的同步入口
+    """
+    return asyncio.run(run_sources(names, download_files, force))
+
+
+def _single_item(force):
+    return [None]
+
+
+def _scrape(scrape):
+    return lambda item: scrape()
+
+
+def _keep(item, raw):
+    return raw
+
+
+# datiya: 工作项为GitHub表格中的新日期 (YYYYMMDD, 节点数)
+def _datiya_discover(force):
+    date_tuples = github_monitor.get_all_dates_to_process() if force else github_monitor.get_new_dates()
+    if force:
+        return date_tuples
+    stored = site_renderer.read_json(site_renderer.DATA_PATH) or {}
+    done = [date for date, _ in date_tuples if date in stored]
+    if done:
+        logger.info(f"{len(done)} 个日期已有数据，标记为已处理")
+        github_monitor.mark_dates_processed(done)
+    return [date_tuple for date_tuple in date_tuples if date_tuple[0] not in stored]
+
+
+def _datiya_extract(item, raw):
+    record = datiya_scraper.daily_record(item[0], item[1], raw)
+    logger.info(f"成功爬取 {record['date']} 的数据: {record['title']}")
+    return record
+
+
+def _datiya_save(records):
+    # 本次爬取的全部日期一次性写入data.json，然后标记为已处理
+    stored = site_renderer.read_json(site_renderer.DATA_PATH) or {}
+    dates = [record["date"].replace("-", "") for record in records]
+    stored.update(zip(dates, records))
+    site_renderer.write_if_changed(site_renderer.DATA_PATH, json.dumps(stored, ensure_ascii=False, indent=2))
+    github_monitor.mark_dates_processed(dates)
+
+
+register(Source("datiya", "datiya每日节点", Cadence(6, "hours", None), ("free.datiya.com",), 1, 3,
+                _datiya_discover, lambda item: datiya_scraper.scrape_datiya(item[0]), _datiya_extract,
+                datiya_scraper.download_subscription_files, _datiya_save))
+
+register(Source("bestclash", "BestClash", Cadence(6, "hours", None), ("raw.githubusercontent.com",), 1, 1,
+                _single_item, _scrape(bestclash_scraper.scrape_bestclash), _keep, None))
+
+# 其余来源的爬虫模块可能不存在，导入失败时不注册
+try:
+    import freev2_scraper
+
+    def _freev2_download(record):
+        path = freev2_scraper.download_subscription_file(record.get("subscription_link"))
+        return [path] if path else []
+
+    register(Source("freev2", "FreeV2.net", Cadence(1, "days", "00:00"), ("b.freev2.net",), 1, 1,
+                    _single_item, _scrape(freev2_scraper.scrape_freev2), _keep, _freev2_download))
+except ImportError:
+    print("未找到freev2_scraper模块，FreeV2.net爬取功能将不可用")
+
+try:
+    import shaoyou_scraper
+    register(Source("shaoyou", "周润发公益v2ray节点", Cadence(2, "hours", None), ("raw.githubusercontent.com",), 1, 1,
+                    _single_item, _scrape(shaoyou_scraper.scrape_shaoyou), _keep,
+                    shaoyou_scraper.download_subscription_files))
+except ImportError:
+    print("未找到shaoyou_scraper模块，周润发公益v2ray节点爬取功能将不可用")
+
+try:
+    import ripao_scraper
+    register(Source("ripao", "日日更新节点", Cadence(1, "days", "02:00"), ("raw.githubusercontent.com",), 1, 1,
+                    _single_item, _scrape(ripao_scraper.scrape_ripao), _keep,
+                    ripao_scraper.download_subscription_files))
+except ImportError:
+    print("未找到ripao_scraper模块，日日更新节点爬取功能将不可用")
+
+try:
+    import v2rayc_scraper
+    register(Source("v2rayc", "v2rayc.github.io节点", Cadence(1, "days", "04:00"),
+                    ("raw.githubusercontent.com", "v2rayc.github.io"), 1, 1,
+                    _single_item, _scrape(v2rayc_scraper.scrape_v2rayc), _keep,
+                    v2rayc_scraper.download_subscription_files))
+except ImportError:
+    print("未找到v2rayc_scraper模块，v2rayc节点爬取功能将不可用")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="列出或运行已注册的来源")
+    parser.add_argument("sources", nargs="*", help="要运行的来源，默认列出全部已注册的来源")
+    parser.add_argument("--no-download", action="store_true", help="不下载订阅文件")
+    parser.add_argument("--force-update", action="store_true", help="包括已处理过的工作项")
+
+    args = parser.parse_args()
+
+    if not args.sources:
+        for source in registered():
+            print(f"- {source.name}: {source.title}，{describe_cadence(source.cadence)}，"
+                  f"主机 {', '.join(source.hosts)}，并发 {source.concurrency}，"
+                  f"{'下载订阅文件' if source.download else '只保存订阅链接'}")
+    else:
+        for name, report in run(args.sources, not args.no_download, args.force_update).items():
+            print(f"- {name}: " + (f"{report['items']} 个工作项，{len(report['records'])} 条记录，"
+                                   f"下载 {len(report['files'])} 个文件" if report else "出错"))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+静态JSON API
+与网页一起生成的版本化静态接口，下游工具可以按需轮询单个文件，不需要下载并解析整个 web/data.json:
+- web/api/v1/sources.json: 目录，各来源的状态和每个接口文件的ETag
+- web/api/v1/sources/{来源}/latest.json: 某个来源最近一次的爬取结果和订阅链接
+- web/api/v1/dates/index.json: 全部日期及其ETag，web/api/v1/dates/{YYYYMMDD}.json: 某一天的结果
+- web/api/v1/nodes/latest.json: 最近一天出现的节点(来自节点历史库，包含最近一次探测结果)
+
+所有文件都是键排序后的紧凑JSON，不包含生成时间，内容不变时字节完全相同，
+因此基于内容的ETag(GitHub Pages等静态托管)在两次生成之间保持稳定。
+文件的ETag记录在指纹清单中，只写入内容变化的文件
+"""
+
+import os
+import json
+import hashlib
+import logging
+import site_renderer
+import node_history
+
+logger = logging.getLogger("static_api")
+
+API_VERSION = 1
+API_DIR = "web/api/v1"
+MANIFEST_PATH = "results/cache/api_manifest.json"
+
+
+def encode(document):
+    """
+    确定性序列化: 键排序、紧凑分隔符、保留中文
+    """
+    return json.dumps(document, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def etag(content):
+    """
+    内容的ETag(SHA-256前16位十六进制)
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def source_document(snapshot, source):
+    """
+    某个来源的最新数据: 状态、订阅链接(模板变量中的 {来源}_xxx_link/mirror)和原始爬取结果
+    """
+    status = snapshot.status[source]
+    prefix = f"{source}_"
+    links = {key[len(prefix):]: value for key, value in snapshot.sources.items()
+             if key.startswith(prefix) and key != f"{source}_data" and value}
+    return {
+        "source": source,
+        "state": status.state,
+        "updated_at": site_renderer.stable_updated_at(status),
+        "links": links,
+        "data": snapshot.sources.get(f"{source}_data")
+    }
+
+
+def latest_nodes(db_path=node_history.DB_PATH):
+    """
+    读取最近一天出现的节点，有探测结果时附带最近一次探测的状态
+
+    返回:
+    dict: {"day": 日期, "nodes": [节点, ...]}，节点历史库不存在时返回None
+    """
+    if not os.path.exists(db_path):
+        return None
+    conn = node_history.connect(db_path)
+    try:
+        day = conn.execute("SELECT MAX(last_seen) FROM nodes").fetchone()[0]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        probed = "probe_status" in tables
+        rows = conn.execute(f"""
+            SELECT nodes.fp, nodes.type, nodes.server, nodes.port, nodes.name, nodes.first_seen, nodes.last_seen,
+                   nodes.sightings, nodes.sources, nodes.config
+                   {", probe_status.ok, probe_status.latency_ms, probe_status.stage, probe_status.probed_at"
+                    if probed else ""}
+            FROM nodes {"LEFT JOIN probe_status ON probe_status.fp = nodes.fp" if probed else ""}
+            WHERE nodes.last_seen = ?
+            ORDER BY nodes.fp
+        """, (day,)).fetchall()
+    finally:
+        conn.close()
+
+    nodes = []
+    for row in rows:
+        node = {key: row[key] for key in ("fp", "type", "server", "port", "name", "first_seen", "last_seen",
+                                          "sightings")}
+        node["sources"] = node_history.source_names(row["sources"])
+        node["config"] = json.loads(row["config"]) if row["config"] else None
+        node["probe"] = None
+        if probed and row["probed_at"]:
+            node["probe"] = {"ok": bool(row["ok"]), "latency_ms": row["latency_ms"], "stage": row["stage"],
+                             "probed_at": row["probed_at"]}
+        nodes.append(node)
+    return {"day": day, "nodes": nodes}
+
+
+def api_documents(snapshot, db_path=node_history.DB_PATH):
+    """
+    生成全部接口文件的内容
+
+    返回:
+    dict: {相对于API目录的路径: 序列化后的JSON}
+    """
+    documents = {}
+    sources = []
+    for source in site_renderer.SOURCES:
+        path = f"sources/{source}/latest.json"
+        documents[path] = encode(source_document(snapshot, source))
+        status = snapshot.status[source]
+        sources.append({"source": source, "state": status.state,
+                        "updated_at": site_renderer.stable_updated_at(status),
+                        "url": path, "etag": etag(documents[path])})
+
+    dates = []
+    for date in site_renderer.date_keys(snapshot.results):
+        path = f"dates/{date}.json"
+        documents[path] = encode({"date": date, **snapshot.results[date]})
+        dates.append({"date": date, "url": path, "etag": etag(documents[path])})
+    documents["dates/index.json"] = encode({"dates": dates})
+
+    catalog = {
+        "version": API_VERSION,
+        "sources": sources,
+        "dates": {"count": len(dates), "latest": dates[0]["date"] if dates else None,
+                  "url": "dates/index.json", "etag": etag(documents["dates/index.json"])},
+        "nodes": None
+    }
+    nodes = latest_nodes(db_path)
+    if nodes is not None:
+        documents["nodes/latest.json"] = encode(nodes)
+        catalog["nodes"] = {"day": nodes["day"], "count": len(nodes["nodes"]), "url": "nodes/latest.json",
+                            "etag": etag(documents["nodes/latest.json"])}
+    documents["sources.json"] = encode(catalog)
+    return documents
+
+
+def build_api(snapshot, api_dir=API_DIR, manifest_path=MANIFEST_PATH, db_path=node_history.DB_PATH, force=False):
+    """
+    增量生成静态API: 只写入ETag变化(或不存在)的文件，删除已经不再生成的文件
+
+    参数:
+    snapshot (site_renderer.Snapshot): 渲染快照
+    api_dir (str): API输出目录
+    manifest_path (str): ETag清单路径
+    db_path (str): 节点历史库路径
+    force (bool): 忽略清单，重新写入全部文件
+
+    返回:
+    dict: {"written": 写入数, "unchanged": 未变化数, "removed": 删除数}
+    """
+    manifest = {} if force else (site_renderer.read_json(manifest_path) or {})
+    documents = api_documents(snapshot, db_path)
+    report = {"written": 0, "unchanged": 0, "removed": 0}
+    tags = {}
+    for name, content in documents.items():
+        tags[name] = etag(content)
+        path = os.path.join(api_dir, name)
+        if manifest.get(name) == tags[name] and os.path.exists(path):
+            report["unchanged"] += 1
+            continue
+        site_renderer.write_if_changed(path, content)
+        report["written"] += 1
+
+    for name in set(manifest) - set(documents):
+        path = os.path.join(api_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+            report["removed"] += 1
+
+    if tags != manifest:
+        site_renderer.write_if_changed(manifest_path, json.dumps(tags, ensure_ascii=False, indent=2, sort_keys=True))
+    return report
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="生成静态JSON API")
+    parser.add_argument("--data", default=site_renderer.DATA_PATH, help="按日期保存的爬取结果JSON文件")
+    parser.add_argument("--results", default=site_renderer.RESULTS_DIR, help="各来源结果目录")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--output", default=API_DIR, help="API输出目录")
+    parser.add_argument("--force", action="store_true", help="忽略ETag清单，重新写入全部文件")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = site_renderer.load_snapshot(results_dir=args.results, data_path=args.data)
+    report = build_api(snapshot, args.output, db_path=args.db, force=args.force)
+    print(f"- 写入 {report['written']} 个文件，未变化 {report['unchanged']} 个，删除 {report['removed']} 个")
+    logger.info(f"{len(snapshot.results)} 个日期，耗时 {time.perf_counter() - start:.2f} 秒")
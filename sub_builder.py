@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+基于探测结果生成订阅
+从节点历史库中选出最近探测可用且延迟最低的节点，生成Clash订阅:
+- web/sub/fastest50.yaml: 全部来源中最快的N个节点
+- web/sub/regions.yaml: 每个地区最快的K个节点，每个地区一个url-test分组
+- web/sub/reliable.yaml: 最近3天可用率达标的节点，按P50延迟排序(来自node_reliability的评分)
+所有分组内的节点都已按实测延迟排序。选择过程只维护大小为N(或每个地区K)的堆，
+节点池增长时复杂度为O(n log k)
+"""
+
+import os
+import json
+import time
+import heapq
+import logging
+from datetime import datetime, timedelta
+from collections import namedtuple
+import node_history
+import node_prober
+import node_reliability
+from node_stats import region_from_name, UNKNOWN
+
+logger = logging.getLogger("sub_builder")
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+SUB_DIR = "web/sub"
+FASTEST_COUNT = 50
+REGION_BEST = 5
+# 只使用最近24小时内的探测结果
+MAX_PROBE_AGE_HOURS = 24
+
+TEST_URL = "http://www.gstatic.com/generate_204"
+TEST_INTERVAL = 300
+TEST_TOLERANCE = 50
+SELECT_GROUP = "🚀 节点选择"
+FASTEST_GROUP = "⚡ 最快节点"
+RELIABLE_GROUP = "🛡️ 稳定节点"
+
+# 各协议在Clash中必需的凭据字段
+REQUIRED_FIELDS = {
+    "ss": ("cipher", "password"),
+    "vmess": ("uuid",),
+    "vless": ("uuid",),
+    "trojan": ("password",),
+    "hysteria2": ("password",),
+    "tuic": ("uuid",)
+}
+
+# latency: 通过的最深阶段的耗时(毫秒)，config为整理后的Clash节点(见clash_node)，
+# 配置不完整的节点在读取时就被排除，不会占用堆选择的名额
+Candidate = namedtuple("Candidate", ["latency", "fp", "region", "name", "config"])
+
+
+def load_candidates(conn, max_age_hours=MAX_PROBE_AGE_HOURS):
+    """
+    读取最近探测可用的节点
+
+    参数:
+    conn (sqlite3.Connection): 节点历史库连接
+    max_age_hours (int): 探测结果的最大时效(小时)
+
+    返回:
+    list: Candidate列表(未排序)，只包含配置完整的节点
+    """
+    node_prober.ensure_probe_schema(conn)
+    has_country = "country" in {row[1] for row in conn.execute("PRAGMA table_info(nodes)")}
+    since = (datetime.now() - timedelta(hours=max_age_hours)).strftime(node_prober.PROBED_AT_FORMAT)
+    rows = conn.execute(f"""
+        SELECT COALESCE(probe_status.greeting_ms, probe_status.tls_ms, probe_status.latency_ms) AS latency,
+               nodes.fp, nodes.name, nodes.config{", nodes.country" if has_country else ""}
+        FROM probe_status JOIN nodes ON nodes.fp = probe_status.fp
+        WHERE probe_status.ok = 1 AND probe_status.probed_at >= ?
+    """, (since,))
+    candidates = []
+    for row in rows:
+        node = clash_node(row["config"]) if row["latency"] is not None else None
+        if node is not None:
+            candidates.append(Candidate(row["latency"], row["fp"],
+                                        (has_country and row["country"]) or region_from_name(row["name"]),
+                                        row["name"], node))
+    return candidates
+
+
+def load_reliable(conn, min_uptime=node_reliability.MIN_UPTIME, count=FASTEST_COUNT):
+    """
+    读取可用率达标的节点，延迟使用P50
+
+    返回:
+    list: Candidate列表，按P50延迟升序，最多count个配置完整的节点
+    """
+    candidates = []
+    for row in node_reliability.reliable_nodes(conn, min_uptime, limit=None):
+        node = clash_node(row["config"])
+        if node is not None:
+            candidates.append(Candidate(row["p50"], row["fp"], region_from_name(row["name"]), row["name"], node))
+            if len(candidates) >= count:
+                break
+    return candidates
+
+
+def select_fastest(candidates, count=FASTEST_COUNT):
+    """
+    选出延迟最低的count个节点(按延迟升序)
+    """
+    return heapq.nsmallest(count, candidates, key=lambda c: (c.latency, c.fp))
+
+
+def select_by_region(candidates, per_region=REGION_BEST):
+    """
+    选出每个地区延迟最低的per_region个节点，地区未知的节点不参与
+
+    每个地区维护一个大小为per_region的最大堆(以负延迟存入最小堆)，
+    新节点比堆顶更快时替换堆顶
+
+    返回:
+    dict: {地区: [Candidate, ...]}，地区按节点数降序，组内按延迟升序
+    """
+    heaps = {}
+    for candidate in candidates:
+        if candidate.region == UNKNOWN:
+            continue
+        heap = heaps.setdefault(candidate.region, [])
+        item = (-candidate.latency, candidate.fp, candidate)
+        if len(heap) < per_region:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    regions = {region: [item[2] for item in sorted(heap, reverse=True)] for region, heap in heaps.items()}
+    return dict(sorted(regions.items(), key=lambda item: (-len(item[1]), item[0])))
+
+
+def region_label(region):
+    """
+    为两位地区代码加上国旗emoji，例如 HK -> 🇭🇰 HK
+    """
+    if len(region) == 2 and region.isascii() and region.isalpha():
+        flag = "".join(chr(0x1F1E6 + ord(c) - ord("A")) for c in region.upper())
+        return f"{flag} {region}"
+    return region
+
+
+def clash_node(config):
+    """
+    将历史库中保存的节点配置整理为可以写入订阅的Clash节点
+
+    YAML来源的端口可能是字符串，早期从分享链接解析的节点缺少reality等参数，
+    这些节点写入订阅后Clash无法连接或整个配置加载失败，因此排除
+
+    参数:
+    config (str): 节点配置JSON
+
+    返回:
+    dict: Clash节点，配置不完整时返回None
+    """
+    try:
+        node = json.loads(config)
+        node["port"] = int(node.get("port"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if not node.get("server") or not 0 < node["port"] < 65536:
+        return None
+    if not all(node.get(field) for field in REQUIRED_FIELDS.get(node.get("type"), ("server",))):
+        return None
+    if "reality-opts" in node and not (node["reality-opts"] or {}).get("public-key"):
+        return None
+    return node
+
+
+def build_config(groups):
+    """
+    生成Clash配置
+
+    参数:
+    groups (list): [(分组名称, [Candidate, ...]), ...]，每组生成一个url-test分组
+
+    返回:
+    dict: Clash配置，没有节点的分组会去掉
+    """
+    proxies = []
+    names = {}
+    used_names = set()
+    for _, candidates in groups:
+        for candidate in candidates:
+            if candidate.fp in names:
+                continue
+            # 同一个节点可能写入多个订阅，复制后再修改名称
+            node = dict(candidate.config)
+            # Clash要求节点名称唯一，不同来源的节点经常重名
+            name = base = str(node.get("name") or candidate.fp)
+            suffix = 2
+            while name in used_names:
+                name = f"{base} {suffix}"
+                suffix += 1
+            node["name"] = name
+            used_names.add(name)
+            names[candidate.fp] = name
+            proxies.append(node)
+
+    groups = [(group_name, candidates) for group_name, candidates in groups if candidates]
+    proxy_groups = [{
+        "name": SELECT_GROUP,
+        "type": "select",
+        "proxies": [group_name for group_name, _ in groups] + [node["name"] for node in proxies]
+    }]
+    for group_name, candidates in groups:
+        proxy_groups.append({
+            "name": group_name,
+            "type": "url-test",
+            "url": TEST_URL,
+            "interval": TEST_INTERVAL,
+            "tolerance": TEST_TOLERANCE,
+            "proxies": [names[candidate.fp] for candidate in candidates]
+        })
+    return {"proxies": proxies, "proxy-groups": proxy_groups, "rules": [f"MATCH,{SELECT_GROUP}"]}
+
+
+def write_config(config, path):
+    """
+    写入Clash配置，先写临时文件再替换，避免读取到写了一半的订阅
+
+    内容只由节点和探测结果决定(不写生成时间)，节点没有变化时文件保持不变
+    """
+    content = "# 节点按实测延迟排序\n" + yaml.dump(config, allow_unicode=True, sort_keys=False, default_flow_style=False)
+    _write_if_changed(path, content)
+
+
+def _write_if_changed(path, content):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def build_subscriptions(db_path=node_history.DB_PATH, output_dir=SUB_DIR, count=FASTEST_COUNT,
+                        per_region=REGION_BEST, max_age_hours=MAX_PROBE_AGE_HOURS,
+                        min_uptime=node_reliability.MIN_UPTIME):
+    """
+    根据探测结果生成订阅文件
+
+    参数:
+    db_path (str): 节点历史库路径
+    output_dir (str): 输出目录
+    count (int): 最快节点订阅的节点数
+    per_region (int): 每个地区保留的节点数
+    max_age_hours (int): 探测结果的最大时效(小时)
+    min_uptime (float): 稳定节点订阅的最低可用率
+
+    返回:
+    dict: 生成的文件和节点数，没有可用节点时返回None
+    """
+    if yaml is None:
+        logger.warning("未安装PyYAML，无法生成订阅")
+        return None
+    if not os.path.exists(db_path):
+        logger.warning(f"未找到节点历史库 {db_path}，跳过订阅生成")
+        return None
+
+    start = time.perf_counter()
+    conn = node_history.connect(db_path)
+    try:
+        candidates = load_candidates(conn, max_age_hours)
+        reliable = load_reliable(conn, min_uptime, count)
+    finally:
+        conn.close()
+    if not candidates:
+        logger.info(f"最近 {max_age_hours} 小时内没有探测可用的节点，跳过订阅生成")
+        return None
+
+    fastest = select_fastest(candidates, count)
+    regions = select_by_region(candidates, per_region)
+
+    fastest_path = os.path.join(output_dir, f"fastest{count}.yaml")
+    fastest_config = build_config([(FASTEST_GROUP, fastest)])
+    write_config(fastest_config, fastest_path)
+    regions_path = os.path.join(output_dir, "regions.yaml")
+    labels = {region_label(region): region for region in regions}
+    regions_config = build_config([(label, regions[region]) for label, region in labels.items()])
+    write_config(regions_config, regions_path)
+    reliable_path = os.path.join(output_dir, "reliable.yaml")
+    reliable_config = build_config([(RELIABLE_GROUP, reliable)])
+    if reliable_config["proxies"]:
+        write_config(reliable_config, reliable_path)
+    elif os.path.exists(reliable_path):
+        # 没有达标节点时删除上一次的订阅，避免继续发布已经不可靠的节点
+        os.remove(reliable_path)
+
+    summary = {
+        "candidates": len(candidates),
+        "files": {
+            os.path.basename(fastest_path): len(fastest_config["proxies"]),
+            os.path.basename(regions_path): len(regions_config["proxies"]),
+            os.path.basename(reliable_path): len(reliable_config["proxies"])
+        },
+        # 第一个分组是节点选择，其余每个地区一个分组
+        "regions": {labels[group["name"]]: len(group["proxies"]) for group in regions_config["proxy-groups"][1:]}
+    }
+    _write_if_changed(os.path.join(output_dir, "index.json"), json.dumps(summary, ensure_ascii=False, indent=2))
+    logger.info(f"已从 {len(candidates)} 个可用节点生成订阅: 最快 {len(fastest_config['proxies'])} 个，"
+                f"{len(summary['regions'])} 个地区，稳定 {len(reliable_config['proxies'])} 个，耗时 {time.perf_counter() - start:.2f} 秒")
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="基于探测结果生成最快节点和分地区订阅")
+    parser.add_argument("--db", default=node_history.DB_PATH, help="节点历史库路径")
+    parser.add_argument("--output", default=SUB_DIR, help="输出目录")
+    parser.add_argument("--count", type=int, default=FASTEST_COUNT, help="最快节点订阅的节点数")
+    parser.add_argument("--per-region", type=int, default=REGION_BEST, help="每个地区保留的节点数")
+    parser.add_argument("--max-age", type=int, default=MAX_PROBE_AGE_HOURS, help="只使用最近N小时内的探测结果")
+    parser.add_argument("--min-uptime", type=float, default=node_reliability.MIN_UPTIME, help="稳定节点订阅的最低可用率")
+
+    args = parser.parse_args()
+
+    summary = build_subscriptions(args.db, args.output, args.count, args.per_region, args.max_age, args.min_uptime)
+    if summary:
+        for filename, nodes in summary["files"].items():
+            print(f"- {os.path.join(args.output, filename)}: {nodes} 个节点")
+        print("地区: " + "，".join(f"{region} {nodes}" for region, nodes in summary["regions"].items()))
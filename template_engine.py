@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+轻量模板引擎
+语法是Jinja2的一个子集，模板首次使用时编译为Python生成器函数并按文件修改时间缓存，
+渲染时逐块产出字符串，可以直接流式写入文件，不需要在内存中拼接整个页面
+
+支持的语法:
+- {{ 表达式 }}: 输出表达式的值并进行HTML转义，{{ 表达式|safe }} 不转义
+- {% if 条件 %} ... {% elif 条件 %} ... {% else %} ... {% endif %}
+- {% for 变量 in 表达式 %} ... {% else %} ... {% endfor %}: else分支在循环体一次都没有执行时输出
+- {% set 变量 = 表达式 %}
+- {% include "partials/xxx.html" %}: 被包含的模板可以使用当前所有变量
+- {# 注释 #}，以及 {%- -%} / {{- -}} 去除标签一侧的空白
+
+表达式是普通的Python表达式，上下文中的变量和内置函数(enumerate、len等)都可以直接使用。
+注意: 模板中用set赋值的变量不能与上下文中的同名变量混用
+"""
+
+import os
+import re
+import html
+import time
+import types
+import builtins
+import logging
+
+logger = logging.getLogger("template_engine")
+
+TEMPLATE_DIR = "templates"
+
+TOKEN_PATTERN = re.compile(r"(\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\})", re.DOTALL)
+FOR_PATTERN = re.compile(r"^for\s+(.+?)\s+in\s+(.+)$", re.DOTALL)
+SET_PATTERN = re.compile(r"^set\s+([A-Za-z_][\w, ]*?)\s*=\s*(.+)$", re.DOTALL)
+INCLUDE_PATTERN = re.compile(r"""^include\s+(["'])(.+?)\1$""")
+SAFE_FILTER_PATTERN = re.compile(r"\|\s*safe\s*$")
+
+# 已编译模板缓存 {路径: (修改时间, 代码对象)}
+_cache = {}
+
+
+class TemplateSyntaxError(ValueError):
+    """
+    模板语法错误，消息中包含模板名称和行号
+    """
+
+
+class RenderTimeout(TimeoutError):
+    """
+    渲染超过了时间预算
+    """
+
+
+def escape(value):
+    """
+    HTML转义，None输出为空字符串
+    """
+    if value is None:
+        return ""
+    return html.escape(str(value), quote=True)
+
+
+def _tokens(source):
+    """
+    将模板拆分为 (类型, 内容, 行号) 序列，并处理去除空白的标记
+    """
+    tokens = []
+    line = 1
+    trim_next = False
+    for part in TOKEN_PATTERN.split(source):
+        if not part:
+            continue
+        if part[:2] in ("{{", "{%", "{#"):
+            inner = part[2:-2]
+            if inner.startswith("-"):
+                inner = inner[1:]
+                if tokens and tokens[-1][0] == "text":
+                    tokens[-1] = ("text", tokens[-1][1].rstrip(), tokens[-1][2])
+            trim_next = inner.endswith("-")
+            if trim_next:
+                inner = inner[:-1]
+            if part[:2] != "{#":
+                tokens.append(("expr" if part[:2] == "{{" else "stmt", inner.strip(), line))
+        else:
+            text = part.lstrip() if trim_next else part
+            trim_next = False
+            if text:
+                tokens.append(("text", text, line))
+        line += part.count("\n")
+    return tokens
+
+
+def compile_template(source, name="<template>"):
+    """
+    将模板编译为生成器函数的代码对象
+
+    参数:
+    source (str): 模板内容
+    name (str): 模板名称，用于错误信息
+
+    返回:
+    types.CodeType: 无参数生成器函数的代码对象，上下文通过函数的全局命名空间传入
+    """
+    lines = ["def _render():", "    if False:", "        yield ''"]
+    stack = []
+
+    def emit(code):
+        lines.append("    " * (len(stack) + 1) + code)
+
+    for kind, content, line in _tokens(source):
+        where = f"{name} 第{line}行"
+        if kind == "text":
+            emit(f"yield {content!r}")
+        elif kind == "expr":
+            if not content:
+                raise TemplateSyntaxError(f"{where}: 空表达式")
+            if SAFE_FILTER_PATTERN.search(content):
+                emit(f"yield str({SAFE_FILTER_PATTERN.sub('', content)})")
+            else:
+                emit(f"yield _escape({content})")
+        else:
+            keyword = content.split(None, 1)[0] if content else ""
+            if keyword == "if":
+                emit(f"if {content[2:].strip()}:")
+                stack.append(("if", line))
+                emit("pass")
+            elif keyword == "else" and stack and stack[-1][0] == "for":
+                # 与Jinja2相同，for的else分支在循环没有执行时输出
+                stack.pop()
+                emit(f"if _empty{len(stack)}:")
+                stack.append(("for-else", line))
+                emit("pass")
+            elif keyword in ("elif", "else"):
+                if not stack or stack[-1][0] not in ("if", "else"):
+                    raise TemplateSyntaxError(f"{where}: {keyword} 没有对应的 if")
+                if stack[-1][0] == "else":
+                    raise TemplateSyntaxError(f"{where}: else 之后不能再有 {keyword}")
+                stack.pop()
+                emit(f"elif {content[4:].strip()}:" if keyword == "elif" else "else:")
+                stack.append(("if" if keyword == "elif" else "else", line))
+                emit("pass")
+            elif keyword == "endif":
+                if not stack or stack[-1][0] not in ("if", "else"):
+                    raise TemplateSyntaxError(f"{where}: endif 没有对应的 if")
+                stack.pop()
+            elif keyword == "for":
+                match = FOR_PATTERN.match(content)
+                if not match:
+                    raise TemplateSyntaxError(f"{where}: for 语句格式错误")
+                emit(f"_empty{len(stack)} = True")
+                emit(f"for {match.group(1)} in {match.group(2)}:")
+                stack.append(("for", line))
+                emit(f"_empty{len(stack) - 1} = False")
+            elif keyword == "endfor":
+                if not stack or stack[-1][0] not in ("for", "for-else"):
+                    raise TemplateSyntaxError(f"{where}: endfor 没有对应的 for")
+                stack.pop()
+            elif keyword == "set":
+                match = SET_PATTERN.match(content)
+                if not match:
+                    raise TemplateSyntaxError(f"{where}: set 语句格式错误")
+                emit(f"{match.group(1)} = {match.group(2)}")
+            elif keyword == "include":
+                match = INCLUDE_PATTERN.match(content)
+                if not match:
+                    raise TemplateSyntaxError(f"{where}: include 语句格式错误")
+                emit(f"yield from _include({match.group(2)!r}, {{**globals(), **locals()}})")
+            else:
+                raise TemplateSyntaxError(f"{where}: 不支持的语句 {keyword or content!r}")
+
+    if stack:
+        block, line = stack[-1]
+        raise TemplateSyntaxError(f"{name} 第{line}行: {block} 没有结束")
+
+    python_source = "\n".join(lines)
+    try:
+        module = compile(python_source, f"<template {name}>", "exec")
+    except SyntaxError as e:
+        raise TemplateSyntaxError(f"{name}: 表达式语法错误: {e.msg} ({e.text.strip() if e.text else ''})") from None
+    namespace = {}
+    exec(module, namespace)
+    return namespace["_render"].__code__
+
+
+def load_template(name, directory=TEMPLATE_DIR):
+    """
+    读取并编译模板，模板文件未修改时直接使用缓存
+
+    返回:
+    types.CodeType: 编译后的代码对象
+    """
+    path = os.path.join(directory, name)
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        code = compile_template(f.read(), name)
+    _cache[path] = (mtime, code)
+    return code
+
+
+def render(name, context, directory=TEMPLATE_DIR):
+    """
+    渲染模板
+
+    参数:
+    name (str): 模板名称(相对于模板目录)
+    context (dict): 模板变量
+    directory (str): 模板目录
+
+    返回:
+    generator: 逐块产出的HTML字符串
+    """
+    def include(child, namespace):
+        return types.FunctionType(load_template(child, directory), namespace)()
+
+    namespace = {"__builtins__": builtins, "_escape": escape, "_include": include}
+    namespace.update(context)
+    return types.FunctionType(load_template(name, directory), namespace)()
+
+
+def render_to_string(name, context, directory=TEMPLATE_DIR):
+    """
+    渲染模板并返回完整字符串
+    """
+    return "".join(render(name, context, directory))
+
+
+def render_to_file(name, path, context, directory=TEMPLATE_DIR, deadline=None):
+    """
+    将模板渲染结果流式写入文件
+
+    先写入临时文件，渲染完成后再替换目标文件，渲染出错或超时时保留原有页面
+
+    参数:
+    name (str): 模板名称
+    path (str): 输出文件路径
+    context (dict): 模板变量
+    directory (str): 模板目录
+    deadline (float, optional): time.monotonic()截止时间，超过时抛出RenderTimeout
+
+    返回:
+    int: 写入的字符数
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    written = 0
+    try:
+        with open(temp_path, "w", encoding="utf-8", buffering=1 << 16) as f:
+            for count, chunk in enumerate(render(name, context, directory)):
+                f.write(chunk)
+                written += len(chunk)
+                # 每1024块检查一次，避免每块都读取时钟
+                if deadline is not None and not count & 1023 and time.monotonic() > deadline:
+                    raise RenderTimeout(f"渲染 {name} 超过时间预算，已写入 {written} 个字符")
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+    return written
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="渲染模板(用于调试)")
+    parser.add_argument("template", help="模板名称，例如 simple.html")
+    parser.add_argument("--context", help="JSON格式的模板变量文件")
+    parser.add_argument("--directory", default=TEMPLATE_DIR, help="模板目录")
+
+    args = parser.parse_args()
+
+    context = {}
+    if args.context:
+        with open(args.context, "r", encoding="utf-8") as f:
+            context = json.load(f)
+    for chunk in render(args.template, context, args.directory):
+        sys.stdout.write(chunk)
@@ -0,0 +1,161 @@
+// 节点和订阅搜索客户端: 按需加载 search/ 目录下的索引分片，搜索全部在浏览器中完成
+// 分词和分片规则与 search_index.py 一致
+(function () {
+    const base = document.currentScript.src.replace(/[^/]*$/, '');
+    const TOKEN_PATTERN = /[a-z0-9]+|[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]+/g;
+    const LIMIT = 50;
+    const cache = {};
+    let manifest = null;
+
+    function load(path, etag) {
+        if (!cache[path]) {
+            cache[path] = fetch(base + path + '?v=' + etag).then(response => {
+                if (!response.ok) {
+                    throw new Error(path + ': ' + response.status);
+                }
+                return response.json();
+            });
+        }
+        return cache[path];
+    }
+
+    let crcTable = null;
+    function crc32(text) {
+        if (!crcTable) {
+            crcTable = [];
+            for (let n = 0; n < 256; n++) {
+                let c = n;
+                for (let k = 0; k < 8; k++) {
+                    c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+                }
+                crcTable.push(c >>> 0);
+            }
+        }
+        let crc = 0xFFFFFFFF;
+        new TextEncoder().encode(text).forEach(byte => {
+            crc = crcTable[(crc ^ byte) & 0xFF] ^ (crc >>> 8);
+        });
+        return (crc ^ 0xFFFFFFFF) >>> 0;
+    }
+
+    function shardKey(term) {
+        return term.charCodeAt(0) < 128 ? term[0] : 'x' + (crc32(term) % manifest.hashed_shards).toString(16);
+    }
+
+    // ASCII词按前缀匹配，中日韩文字按单字或相邻两字精确匹配
+    function queryTerms(query) {
+        const conditions = [];
+        (query.toLowerCase().match(TOKEN_PATTERN) || []).forEach(run => {
+            const chars = Array.from(run);
+            if (run.charCodeAt(0) < 128) {
+                conditions.push([run, true]);
+            } else if (chars.length === 1) {
+                conditions.push([run, false]);
+            } else {
+                for (let i = 0; i < chars.length - 1; i++) {
+                    conditions.push([chars[i] + chars[i + 1], false]);
+                }
+            }
+        });
+        return conditions;
+    }
+
+    function matchIds(shard, term, prefix) {
+        const ids = new Set();
+        Object.keys(shard).forEach(candidate => {
+            if (candidate === term || (prefix && candidate.startsWith(term))) {
+                let id = 0;
+                shard[candidate].forEach(delta => {
+                    id += delta;
+                    ids.add(id);
+                });
+            }
+        });
+        return ids;
+    }
+
+    async function search(query) {
+        manifest = manifest || await fetch(base + 'index.json', {cache: 'no-cache'}).then(response => response.json());
+        const conditions = queryTerms(query);
+        if (!conditions.length) {
+            return {total: 0, records: []};
+        }
+        let matched = null;
+        for (const [term, prefix] of conditions) {
+            const key = shardKey(term);
+            const shard = manifest.terms[key] ? await load('terms/' + key + '.json', manifest.terms[key]) : {};
+            const ids = matchIds(shard, term, prefix);
+            matched = matched ? new Set([...matched].filter(id => ids.has(id))) : ids;
+            if (!matched.size) {
+                break;
+            }
+        }
+        // 最近加入索引的文档在前
+        const ids = [...matched].sort((a, b) => b - a).slice(0, LIMIT);
+        const records = await Promise.all(ids.map(async id => {
+            const number = Math.floor(id / manifest.doc_shard_size);
+            const shard = await load('docs/' + number + '.json', manifest.docs[number]);
+            return shard[id % manifest.doc_shard_size];
+        }));
+        return {total: matched.size, records: records.filter(Boolean)};
+    }
+
+    function escapeHtml(value) {
+        return String(value == null ? '' : value).replace(/[&<>"']/g, c => ({
+            '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+        })[c]);
+    }
+
+    function link(url, label) {
+        return url ? '<a href="' + escapeHtml(url) + '" target="_blank" class="me-2">' + label + '</a>' : '';
+    }
+
+    // 文档数组: 节点 ["n", 名称, 协议, 地址:端口, 地区, 来源, 最后出现日期]，
+    // 每日订阅 ["d", 标题, 日期, Clash链接, V2Ray链接]，来源订阅 ["s", 来源, 更新时间, 订阅链接]
+    function renderRecord(record) {
+        if (record[0] === 'n') {
+            return '<div class="list-group-item"><div class="d-flex justify-content-between">'
+                + '<span class="text-truncate me-2">' + escapeHtml(record[1]) + '</span>'
+                + '<span class="badge bg-primary">' + escapeHtml(record[2]) + '</span></div>'
+                + '<small class="text-muted">' + [record[4], record[3], record[5], '最后出现 ' + record[6]]
+                    .filter(Boolean).map(escapeHtml).join(' · ') + '</small></div>';
+        }
+        if (record[0] === 'd') {
+            return '<div class="list-group-item"><i class="bi bi-calendar-date me-2 text-primary"></i>'
+                + '<a href="#card-' + escapeHtml(record[2]) + '" class="me-2">' + escapeHtml(record[1]) + '</a>'
+                + link(record[3], 'Clash') + link(record[4], 'V2Ray') + '</div>';
+        }
+        return '<div class="list-group-item"><i class="bi bi-link-45deg me-2 text-success"></i>'
+            + '<a href="#' + escapeHtml(record[1]) + '" class="me-2">' + escapeHtml(record[1]) + '</a>'
+            + link(record[3], '订阅链接') + '<small class="text-muted">' + escapeHtml(record[2] || '') + '</small></div>';
+    }
+
+    const input = document.getElementById('search-input');
+    const status = document.getElementById('search-status');
+    const results = document.getElementById('search-results');
+    let timer = null;
+    let latest = 0;
+
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const query = input.value.trim();
+            const current = ++latest;
+            if (!query) {
+                status.textContent = '';
+                results.innerHTML = '';
+                return;
+            }
+            search(query).then(found => {
+                if (current !== latest) {
+                    return;
+                }
+                status.textContent = found.total ? '找到 ' + found.total + ' 个结果'
+                    + (found.total > found.records.length ? '，显示最近的 ' + found.records.length + ' 个' : '') : '没有匹配的结果';
+                results.innerHTML = found.records.map(renderRecord).join('');
+            }).catch(() => {
+                status.textContent = '搜索索引加载失败，请稍后重试';
+            });
+        }, 150);
+    });
+})();
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+UDP/QUIC存活探测
+hysteria/hysteria2/tuic节点基于QUIC，TCP探测无法判断其是否存活。
+这里发送一个使用保留版本号(0x?a?a?a?a)的QUIC Initial数据报(填充到1200字节)，
+按RFC 9000第6节，QUIC服务器收到不支持版本的Initial时必须回复版本协商(Version Negotiation)包，
+收到版本协商即说明端口上有QUIC服务在运行，整个过程不需要完成握手，也不需要TLS
+
+结果分类:
+- 收到版本协商: 存活
+- ICMP端口不可达: refused
+- 超时: no response(UDP被过滤、节点离线，或hysteria2启用了salamander混淆)
+- 收到其他数据: invalid response
+"""
+
+import os
+import time
+import random
+import socket
+import asyncio
+import logging
+
+logger = logging.getLogger("udp_prober")
+
+DEFAULT_TIMEOUT = 3.0
+# 客户端Initial数据报的最小长度(RFC 9000 第14.1节)，服务器对更短的数据报可以不回复
+MIN_INITIAL_SIZE = 1200
+CONNECTION_ID_LENGTH = 8
+# 超时前重发一次，降低UDP丢包造成的误判
+RETRANSMITS = 1
+
+
+def grease_version():
+    """
+    生成保留给版本协商使用的版本号，形如0x?a?a?a?a
+    """
+    return (random.getrandbits(32) & 0xF0F0F0F0) | 0x0A0A0A0A
+
+
+def build_initial(dcid, scid, version=None):
+    """
+    构造一个QUIC长包头Initial数据报
+
+    服务器只解析与版本无关的字段(版本号和两个连接ID)，因此包体可以是随机字节
+
+    参数:
+    dcid (bytes): 目标连接ID
+    scid (bytes): 源连接ID
+    version (int, optional): 版本号，默认为随机的保留版本号
+
+    返回:
+    bytes: 至少1200字节的数据报
+    """
+    version = grease_version() if version is None else version
+    # 长包头(0x80) | 固定位(0x40) | Initial类型(0x00) | 4字节包序号(0x03)
+    header = (bytes([0xC3]) + version.to_bytes(4, "big")
+              + bytes([len(dcid)]) + dcid + bytes([len(scid)]) + scid
+              + b"\x00")  # token长度为0
+    payload_length = MIN_INITIAL_SIZE - len(header) - 2
+    # 长度字段使用2字节变长整数编码(前缀0b01)
+    header += (0x4000 | payload_length).to_bytes(2, "big")
+    return header + os.urandom(payload_length)
+
+
+def parse_version_negotiation(data, dcid, scid):
+    """
+    解析版本协商包
+
+    参数:
+    data (bytes): 收到的数据报
+    dcid (bytes): 我们发送的目标连接ID(应出现在回复的源连接ID中)
+    scid (bytes): 我们发送的源连接ID(应出现在回复的目标连接ID中)
+
+    返回:
+    list: 服务器支持的版本号列表，不是对应的版本协商包时返回None
+    """
+    if len(data) < 7 or not data[0] & 0x80 or data[1:5] != b"\x00\x00\x00\x00":
+        return None
+    offset = 5
+    dcid_length = data[offset]
+    reply_dcid = data[offset + 1:offset + 1 + dcid_length]
+    offset += 1 + dcid_length
+    if offset >= len(data):
+        return None
+    scid_length = data[offset]
+    reply_scid = data[offset + 1:offset + 1 + scid_length]
+    offset += 1 + scid_length
+    if reply_dcid != scid or reply_scid != dcid:
+        return None
+    versions = [int.from_bytes(data[i:i + 4], "big") for i in range(offset, len(data) - 3, 4)]
+    return versions
+
+
+class _ProbeProtocol(asyncio.DatagramProtocol):
+    def __init__(self, future):
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+async def probe_quic(host, port, timeout=DEFAULT_TIMEOUT):
+    """
+    探测QUIC服务是否存活
+
+    参数:
+    host (str): 服务器地址
+    port (int): 端口
+    timeout (float): 超时时间(秒)
+
+    返回:
+    tuple: (是否存活, 往返耗时毫秒, 错误信息；存活时为服务器支持的版本列表)
+    """
+    loop = asyncio.get_running_loop()
+    dcid = os.urandom(CONNECTION_ID_LENGTH)
+    scid = os.urandom(CONNECTION_ID_LENGTH)
+    datagram = build_initial(dcid, scid)
+    future = loop.create_future()
+    try:
+        transport, _ = await asyncio.wait_for(
+            loop.create_datagram_endpoint(lambda: _ProbeProtocol(future), remote_addr=(host, port)), timeout)
+    except (asyncio.TimeoutError, OSError, UnicodeError, ValueError) as e:
+        return False, None, "timeout" if isinstance(e, asyncio.TimeoutError) else (getattr(e, "strerror", None) or str(e))
+
+    try:
+        start = time.perf_counter()
+        interval = timeout / (RETRANSMITS + 1)
+        data = None
+        for _ in range(RETRANSMITS + 1):
+            transport.sendto(datagram)
+            try:
+                data = await asyncio.wait_for(asyncio.shield(future), interval)
+                break
+            except asyncio.TimeoutError:
+                continue
+        if data is None:
+            future.cancel()
+            return False, None, "no response"
+        latency = round((time.perf_counter() - start) * 1000, 1)
+    except ConnectionRefusedError:
+        return False, None, "refused"
+    except OSError as e:
+        return False, None, e.strerror or str(e)
+    finally:
+        transport.close()
+
+    versions = parse_version_negotiation(data, dcid, scid)
+    if versions is None:
+        return False, None, "invalid response"
+    return True, latency, ",".join(f"0x{version:08x}" for version in versions)
+
+
+class VersionNegotiationServer(asyncio.DatagramProtocol):
+    """
+    本地替身: 对足够长的长包头数据报回复版本协商，模拟QUIC服务器
+    """
+
+    def __init__(self, versions=(0x00000001,)):
+        self.versions = versions
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < MIN_INITIAL_SIZE or not data[0] & 0x80:
+            return
+        dcid_length = data[5]
+        dcid = data[6:6 + dcid_length]
+        scid_length = data[6 + dcid_length]
+        scid = data[7 + dcid_length:7 + dcid_length + scid_length]
+        reply = (bytes([0x80 | random.getrandbits(7)]) + b"\x00\x00\x00\x00"
+                 + bytes([len(scid)]) + scid + bytes([len(dcid)]) + dcid
+                 + b"".join(version.to_bytes(4, "big") for version in self.versions))
+        self.transport.sendto(reply, addr)
+
+
+class SilentServer(asyncio.DatagramProtocol):
+    """
+    本地替身: 接收数据报但不回复，模拟启用了混淆或过滤了探测的节点
+    """
+
+
+class EchoServer(asyncio.DatagramProtocol):
+    """
+    本地替身: 原样返回数据报，模拟端口上运行的不是QUIC服务
+    """
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(data, addr)
+
+
+async def serve(protocol_factory, host="127.0.0.1", port=0):
+    """
+    启动本地UDP替身服务器
+
+    返回:
+    tuple: (transport, 端口)
+    """
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(protocol_factory, local_addr=(host, port))
+    return transport, transport.get_extra_info("sockname")[1]
+
+
+def closed_udp_port(host="127.0.0.1"):
+    """
+    获取一个当前没有被监听的UDP端口
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="QUIC版本协商存活探测")
+    parser.add_argument("targets", nargs="*", metavar="HOST:PORT", help="探测目标")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="超时时间(秒)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="在本地端口运行回复版本协商的替身服务器")
+
+    args = parser.parse_args()
+
+    async def run():
+        if args.serve is not None:
+            _, port = await serve(VersionNegotiationServer, "0.0.0.0", args.serve)
+            logger.info(f"QUIC替身服务器已在UDP端口 {port} 运行")
+            await asyncio.Event().wait()
+        results = await asyncio.gather(*(probe_quic(target.rpartition(":")[0], int(target.rpartition(":")[2]),
+                                                    args.timeout) for target in args.targets))
+        for target, (ok, latency, info) in zip(args.targets, results):
+            print(f"- {target}: {'存活' if ok else '不可用'} {latency or '-'} 毫秒 {info}")
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
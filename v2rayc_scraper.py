@@ -7,13 +7,14 @@ v2rayc.github.io 订阅链接爬虫
 """
 
 import requests
-from bs4 import BeautifulSoup
 import re
 import json
 import os
 import logging
 from datetime import datetime
 import time
+from html_backend import make_soup, tags_filter
+from link_extractor import compile_extractor, extract, merge_sections, suffix_rule
 
 # 配置日志
 logging.basicConfig(
@@ -36,6 +37,23 @@ GITHUB_RAW_MIRRORS = [
     "https://cdn.jsdelivr.net/gh"
 ]
 
+# README中的订阅链接，导入时编译为一个交替正则，单次扫描按扩展名分类
+README_EXTRACTOR = compile_extractor([
+    suffix_rule(r"https?://v2rayc\.github\.io/uploads/\d+/\d+/[^.\s]+", [
+        ("clash", r"\.yaml"),
+        ("v2ray", r"\.txt"),
+        ("singbox", r"\.json")
+    ])
+])
+
+# 标题、更新时间和日期只取第一个匹配，单独用search在首次命中时即停止
+TITLE_PATTERN = re.compile(r'(\d+月\d+日.*?免费节点.*?订阅链接)')
+UPDATE_TIME_PATTERN = re.compile(r'更新时间\s*(20\d{2}-\d{2}-\d{2}\s*\d{2}:\d{2}:\d{2})')
+DATE_PATTERN = re.compile(r'(\d{4})[-/](\d{2})[-/](\d{2})|(\d{8})')
+
+# 仓库页面中只构建id为readme的元素
+README_FILTER = tags_filter(id="readme")
+
 def scrape_v2rayc():
     """
     爬取 v2rayc.github.io 网站的订阅链接
@@ -93,8 +111,8 @@ def scrape_v2rayc():
                 response = requests.get(github_url, headers=headers, timeout=15)
                 response.raise_for_status()
                 
-                # 使用BeautifulSoup解析HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # 只构建README所在的元素
+                soup = make_soup(response.text, parse_only=README_FILTER)
                 readme_element = soup.find(id="readme")
                 if readme_element:
                     readme_content = readme_element.get_text()
@@ -111,19 +129,19 @@ def scrape_v2rayc():
             f.write(readme_content)
         logger.info("已保存README内容到debug_v2rayc_readme.txt文件")
         
+        # 单次扫描README，按命名分组分类所有匹配
+        sections = extract(README_EXTRACTOR, readme_content)
+        
         # 提取标题和日期信息
-        title_pattern = re.compile(r'(\d+月\d+日.*?免费节点.*?订阅链接)')
-        title_match = title_pattern.search(readme_content)
+        title_match = TITLE_PATTERN.search(readme_content)
         title = title_match.group(1) if title_match else "v2rayc.github.io免费节点订阅"
         
         # 提取更新时间
-        update_time_pattern = re.compile(r'更新时间\s*(20\d{2}-\d{2}-\d{2}\s*\d{2}:\d{2}:\d{2})')
-        update_time_match = update_time_pattern.search(readme_content)
+        update_time_match = UPDATE_TIME_PATTERN.search(readme_content)
         update_time = update_time_match.group(1) if update_time_match else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # 提取日期信息（从链接或标题中）
-        date_pattern = re.compile(r'(\d{4})[-/](\d{2})[-/](\d{2})|(\d{8})')
-        date_match = date_pattern.search(readme_content)
+        date_match = DATE_PATTERN.search(readme_content)
         if date_match:
             if date_match.group(4):  # 形如20250404
                 date_str = date_match.group(4)
@@ -135,32 +153,19 @@ def scrape_v2rayc():
         else:
             date_str = datetime.now().strftime("%Y%m%d")
         
-        # 提取Clash订阅链接
-        clash_links = []
-        clash_pattern = re.compile(r'https?://v2rayc\.github\.io/uploads/\d+/\d+/[^.\s]+\.yaml')
-        clash_matches = clash_pattern.findall(readme_content)
-        clash_links.extend(clash_matches)
-        
-        # 提取V2ray订阅链接
-        v2ray_links = []
-        v2ray_pattern = re.compile(r'https?://v2rayc\.github\.io/uploads/\d+/\d+/[^.\s]+\.txt')
-        v2ray_matches = v2ray_pattern.findall(readme_content)
-        v2ray_links.extend(v2ray_matches)
-        
-        # 提取Sing-box订阅链接
-        singbox_links = []
-        singbox_pattern = re.compile(r'https?://v2rayc\.github\.io/uploads/\d+/\d+/[^.\s]+\.json')
-        singbox_matches = singbox_pattern.findall(readme_content)
-        singbox_links.extend(singbox_matches)
+        # 提取Clash/V2ray/Sing-box订阅链接
+        clash_links = merge_sections(sections, "clash")
+        v2ray_links = merge_sections(sections, "v2ray")
+        singbox_links = merge_sections(sections, "singbox")
         
         # 整理结果
         result = {
             "title": title,
             "date": date_str,
             "update_time": update_time,
-            "clash_links": list(set(clash_links)),
-            "v2ray_links": list(set(v2ray_links)),
-            "singbox_links": list(set(singbox_links)),
+            "clash_links": list(clash_links),
+            "v2ray_links": list(v2ray_links),
+            "singbox_links": list(singbox_links),
             "scrape_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "source_url": github_url
         }